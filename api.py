@@ -0,0 +1,195 @@
+"""
+HTTP forecasting API
+
+A small ASGI service that exposes the forecasting functions in `model.py`
+to other systems without going through the Streamlit UI.
+
+Endpoints (all POST bodies are JSON unless noted):
+- GET  /health
+- POST /forecast             {"series": [...] | [[...], ...], "periods": 30, "method": "moving_average"}
+- POST /forecast/confidence  same as /forecast plus "confidence_level": 0.95 | 0.99
+- POST /trend                {"series": [...] | [[...], ...]}
+
+Series may also be sent as an Arrow IPC stream
+(Content-Type: application/vnd.apache.arrow.stream), one column per series,
+with periods/method/confidence_level passed as query parameters.
+
+Forecasts are the deterministic batch forecasts of `forecast_batch`, i.e.
+`simple_forecast` without its random variation. CPU work runs in a process
+pool so the event loop stays responsive, and concurrent requests arriving
+within a few milliseconds are micro-batched into one vectorized call by
+`batching.ForecastBatcher`.
+
+Run locally:
+    uvicorn api:app --host 127.0.0.1 --port 8000
+
+or test in-process with `starlette.testclient.TestClient(create_app())`.
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+
+import numpy as np
+
+from batching import ForecastBatcher
+
+try:
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+except ImportError as e:
+    raise ImportError("The forecasting API requires starlette: pip install starlette uvicorn") from e
+
+METHODS = ['moving_average', 'exponential', 'linear_trend', 'holt_winters', 'holt_winters_multiplicative']
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+MAX_PERIODS = 3650
+
+class RequestError(ValueError):
+    """Invalid request payload; reported to the client as HTTP 400"""
+
+def _parse_series(raw):
+    """Accept one series or a list of series; returns a list of float arrays"""
+    if not isinstance(raw, list) or len(raw) == 0:
+        raise RequestError("'series' must be a non-empty list of numbers or of lists of numbers")
+    rows = raw if isinstance(raw[0], list) else [raw]
+    try:
+        return [np.asarray([np.nan if value is None else value for value in row], dtype=float) for row in rows]
+    except (TypeError, ValueError):
+        raise RequestError("'series' values must be numbers")
+
+def _arrow_series(body):
+    """Read an Arrow IPC stream; every column is one series"""
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise RequestError(f"Invalid Arrow stream: {e}")
+    return [
+        column.to_numpy(zero_copy_only=False).astype(float)
+        for column in table.columns
+    ]
+
+async def _read_request(request):
+    """Series and options from a JSON body or an Arrow stream with query parameters"""
+    content_type = request.headers.get('content-type', '')
+    if content_type.startswith(ARROW_CONTENT_TYPE):
+        series = _arrow_series(await request.body())
+        options = dict(request.query_params)
+    else:
+        try:
+            options = await request.json()
+        except ValueError:
+            raise RequestError("Body must be JSON or an Arrow IPC stream")
+        if not isinstance(options, dict):
+            raise RequestError("JSON body must be an object")
+        series = _parse_series(options.get('series'))
+    return series, options
+
+def _integer_param(options, name, default):
+    """An integer option: a JSON integer, or digits in a query parameter; floats and booleans are rejected"""
+    value = options.get(name, default)
+    if isinstance(value, str):
+        try:
+            value = int(value.strip())
+        except ValueError:
+            pass
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise RequestError(f"'{name}' must be an integer")
+    return value
+
+def _forecast_params(options, with_confidence):
+    periods = _integer_param(options, 'periods', 30)
+    if not 1 <= periods <= MAX_PERIODS:
+        raise RequestError(f"'periods' must be between 1 and {MAX_PERIODS}")
+
+    method = options.get('method', 'moving_average')
+    if method not in METHODS:
+        raise RequestError(f"'method' must be one of {METHODS}")
+
+    confidence_level = 0.95
+    if with_confidence:
+        try:
+            confidence_level = float(options.get('confidence_level', 0.95))
+        except (TypeError, ValueError):
+            raise RequestError("'confidence_level' must be 0.95 or 0.99")
+        if confidence_level not in (0.95, 0.99):
+            raise RequestError("'confidence_level' must be 0.95 or 0.99")
+
+    return periods, method, confidence_level
+
+def _to_json(result, keys):
+    return {key: np.asarray(result[key]).tolist() for key in keys}
+
+def create_app(workers=None, max_wait_ms=5, max_batch_size=256):
+    """
+    Build the ASGI application
+
+    Parameters:
+    - workers: size of the process pool for CPU work (default: CPU count)
+    - max_wait_ms: how long to collect concurrent requests into one batch
+    - max_batch_size: series count that flushes a batch immediately
+    """
+    state = {}
+
+    @asynccontextmanager
+    async def lifespan(app):
+        executor = ProcessPoolExecutor(max_workers=workers)
+        state['batcher'] = ForecastBatcher(max_wait_ms / 1000, max_batch_size, executor=executor)
+        try:
+            yield
+        finally:
+            state['batcher'].close()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def submit(kind, params, series):
+        return await asyncio.wrap_future(state['batcher'].submit(kind, params, series))
+
+    def endpoint(handler):
+        async def wrapped(request):
+            try:
+                return JSONResponse(await handler(request))
+            except RequestError as e:
+                return JSONResponse({'error': str(e)}, status_code=400)
+        return wrapped
+
+    async def health(request):
+        return JSONResponse({'status': 'ok'})
+
+    @endpoint
+    async def forecast(request):
+        series, options = await _read_request(request)
+        params = _forecast_params(options, with_confidence=False)
+        result = await submit('forecast', params, series)
+        return _to_json(result, ['forecast'])
+
+    @endpoint
+    async def forecast_confidence(request):
+        series, options = await _read_request(request)
+        params = _forecast_params(options, with_confidence=True)
+        result = await submit('forecast', params, series)
+        response = _to_json(result, ['forecast', 'upper_bound', 'lower_bound'])
+        response['confidence_level'] = params[2]
+        return response
+
+    @endpoint
+    async def trend(request):
+        series, _ = await _read_request(request)
+        result = await submit('trend', (), series)
+        response = _to_json(result, ['trend', 'slope', 'intercept', 'change_rate'])
+        # NaN is not valid JSON; series too short for a trend have no intercept
+        response['intercept'] = [None if np.isnan(value) else value for value in response['intercept']]
+        return response
+
+    return Starlette(
+        routes=[
+            Route('/health', health, methods=['GET']),
+            Route('/forecast', forecast, methods=['POST']),
+            Route('/forecast/confidence', forecast_confidence, methods=['POST']),
+            Route('/trend', trend, methods=['POST']),
+        ],
+        lifespan=lifespan
+    )
+
+app = create_app(workers=int(os.environ['MARKET_MAVEN_API_WORKERS']) if os.environ.get('MARKET_MAVEN_API_WORKERS') else None)
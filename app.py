@@ -7,8 +7,24 @@ from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import io
 import base64
-from data_utils import preprocess_dynamic, detect_columns
-from model import simple_forecast
+from data_utils import (
+    preprocess_dynamic, detect_columns, pivot_series, load_data,
+    excel_sheet_names, read_excel_fast, read_compressed, read_csv_chunked, load_files,
+    StreamingValidator, COMPRESSED_EXTENSIONS, MMAP_EXTENSIONS, load_prepared_sketch
+)
+from model import simple_forecast, trend_analysis_batch
+from batching import ForecastBatcher
+from instrumentation import (
+    track, instrument, summarize, to_json_lines, to_prometheus, write_metrics_file,
+    set_memory_tracing, memory_tracing, reset as reset_metrics
+)
+from profiling import profiling_requested, RerunProfiler
+from analytics import get_backend, LARGE_DATA_ROWS
+from dataset_registry import DatasetRegistry, content_id
+from sketches import DatasetSketch
+from dataset_store import DatasetStore
+from filter_index import FilterIndex, FILTER_COLUMNS
+import os
 
 # Configure page
 st.set_page_config(
@@ -18,7 +34,178 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Partial reruns: st.fragment on Streamlit 1.37+, st.experimental_fragment on 1.33-1.36,
+# and plain full-script reruns on older versions
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+@st.cache_resource
+def get_forecast_batcher():
+    """One forecast batcher shared by all sessions of this server process"""
+    return ForecastBatcher()
+
+@st.cache_resource
+def get_dataset_registry():
+    """Parsed uploads shared by all sessions of this server process"""
+    max_mb = int(os.environ.get('MARKET_MAVEN_DATASET_CACHE_MB', 4096))
+    return DatasetRegistry(max_bytes=max_mb * 2**20)
+
+@st.cache_resource
+def get_startup_dataset(filepath):
+    """
+    Dataset named by MARKET_MAVEN_DATA_FILE and its sketch, loaded once per server process
+    
+    Prepared files are only memory-mapped, not read; their sketch is the one
+    `save_prepared` wrote next to them (None without one: KPIs are then
+    computed exactly). Other files are sketched while they are parsed.
+    """
+    if filepath.endswith(MMAP_EXTENSIONS):
+        return load_data(filepath), load_prepared_sketch(filepath)
+    sketch = DatasetSketch()
+    df = load_data(filepath, validator=StreamingValidator(sketch=sketch))
+    return df, sketch
+
+@st.cache_resource
+def get_dataset_store(root):
+    """Dataset store named by MARKET_MAVEN_STORE, shared by all sessions of this server process"""
+    return DatasetStore(root)
+
+@st.cache_resource(max_entries=8)
+def read_store(root, version, start=None, end=None):
+    """
+    Rows of one version of the store, read once per server process
+    
+    With a window only the partitions overlapping it are read. The sketch
+    covers the whole history, so it is only returned without a window.
+    """
+    store = get_dataset_store(root)
+    df = store.read(start=start, end=end)
+    return df, (store.sketch() if start is None and end is None else None)
+
+@st.cache_resource(max_entries=8)
+def get_store_backend(root, version, start=None, end=None):
+    return get_dataset_store(root).backend(start, end)
+
+@st.cache_resource
+def get_store_versions():
+    """Version of each store whose reads are cached, shared by all sessions"""
+    return {}
+
+def evict_old_store_versions(store):
+    """Drop cached reads, backends and filter indexes of earlier versions once the store has grown"""
+    versions = get_store_versions()
+    if versions.get(store.root, store.version) != store.version:
+        read_store.clear()
+        get_store_backend.clear()
+        # Only datasets without an index from ingestion (the store, the startup file) are in this cache
+        build_filter_index.clear()
+    versions[store.root] = store.version
+
+def use_store_dataset(store, start=None, end=None):
+    """Make the store's history, or the window [start, end] of it, this session's dataset"""
+    evict_old_store_versions(store)
+    df, sketch = read_store(store.root, store.version, start, end)
+    st.session_state.user_df = df.copy(deep=False)
+    st.session_state.dataset_sketch = sketch
+    st.session_state.dataset_id = f"store:{store.version}:{start}:{end}"
+    st.session_state.store_window = (start, end)
+    st.session_state.file_uploaded = True
+
+def recent_store_window(store):
+    """
+    (start, end) of the last MARKET_MAVEN_STORE_DAYS days (default 90) of the store's history
+
+    New sessions start with this window so they read only the latest
+    partitions; (None, None), the whole history, when the history is no
+    longer than that or the variable is 0.
+    """
+    days = int(os.environ.get('MARKET_MAVEN_STORE_DAYS', 90))
+    date_range = store.date_range()
+    if date_range is None or days <= 0:
+        return None, None
+    start = date_range[1] - pd.Timedelta(days=days - 1)
+    if start <= date_range[0]:
+        return None, None
+    return start.date(), date_range[1].date()
+
+def use_store_batch(store, batch_id):
+    """
+    Show the store over the days of one of its batches, e.g. an upload just appended
+
+    Reads only the partitions of those days rather than the whole history.
+    Returns False, leaving the session alone, when the batch has no dates.
+    """
+    date_range = store.date_range(batch_id)
+    if date_range is None:
+        return False
+    use_store_dataset(store, date_range[0].date(), date_range[1].date())
+    return True
+
+@st.cache_resource(max_entries=4)
+def build_analytics_backend(dataset_id, n_rows, _df):
+    """DuckDB backend of a large dataset, built once per server process rather than on every rerun"""
+    return get_backend(_df)
+
+def get_analytics_backend(df):
+    """The store's precomputed aggregates when the session shows the store, otherwise a backend on df"""
+    store_root = os.environ.get('MARKET_MAVEN_STORE')
+    dataset_id = st.session_state.get('dataset_id')
+    if store_root and str(dataset_id or '').startswith('store:'):
+        store = get_dataset_store(store_root)
+        start, end = st.session_state.get('store_window', (None, None))
+        return get_store_backend(store.root, store.version, start, end)
+    # Building the DuckDB backend converts the whole frame to Arrow; pandas needs no setup
+    if dataset_id and len(df) >= LARGE_DATA_ROWS:
+        return build_analytics_backend(dataset_id, len(df), df)
+    return get_backend(df)
+
+def filter_columns(df, product_col=None):
+    """Categorical columns offered as Analytics filters"""
+    columns = [col for col in FILTER_COLUMNS if col in df.columns]
+    if product_col and product_col in df.columns and product_col not in columns:
+        columns.append(product_col)
+    return columns
+
+@st.cache_resource(max_entries=8)
+def build_filter_index(dataset_id, _df, date_col=None, target_col=None, product_col=None):
+    """Filter index of a dataset without one from ingestion, built once per server process"""
+    return FilterIndex(_df, filter_columns(_df, product_col), date_col, target_col)
+
+def get_filter_index(df, date_col=None, target_col=None, product_col=None):
+    """The session dataset's filter index: the one built at upload, or a cached one"""
+    dataset_id = st.session_state.get('dataset_id')
+    index = get_dataset_registry().metadata(dataset_id).get('filter_index') if dataset_id else None
+    if index is None or index.n_rows != len(df) or (index.date_col, index.target_col) != (date_col, target_col):
+        index = build_filter_index(dataset_id, df, date_col, target_col, product_col)
+    return index
+
+def show_store_window(store):
+    """Sidebar date range of the store's history to work on; only matching partitions are read"""
+    date_range = store.date_range()
+    if date_range is None:
+        return
+    first, last = date_range[0].date(), date_range[1].date()
+    # No key: the picker starts over from the session's window whenever that is changed elsewhere
+    start, end = st.session_state.get('store_window', (None, None))
+    window = st.date_input(
+        "History window", value=(start or first, end or last), min_value=first, max_value=last,
+        help="Analytics and forecasts use only this date range; only the partitions overlapping it are read"
+    )
+    # The widget returns a single date while the second one is being picked
+    if not isinstance(window, (tuple, list)) or len(window) != 2:
+        return
+    start, end = window
+    if (start, end) == (first, last):
+        start = end = None
+    if (start, end) != st.session_state.get('store_window', (None, None)):
+        use_store_dataset(store, start, end)
+    if start is not None or end is not None:
+        parts = store.plan(start, end)
+        rows = sum(part['rows'] for part in parts)
+        st.caption(f"Reading {len(parts):,} of {len(store.manifest['parts']):,} partitions "
+                   f"({rows / max(store.rows, 1):.1%} of the rows)")
+
 # Custom CSS for professional styling with dark theme support
+@instrument('app.load_custom_css')
 def load_custom_css():
     # Initialize theme in session state
     if 'dark_theme' not in st.session_state:
@@ -748,6 +935,7 @@ def load_custom_css():
     </style>
     """, unsafe_allow_html=True)
 
+@instrument('app.display_header')
 def display_header():
     # Theme toggle button
     theme_icon = "🌙" if not st.session_state.dark_theme else "☀️"
@@ -777,6 +965,7 @@ def display_metric_card(title, value, subtitle=""):
     </div>
     """, unsafe_allow_html=True)
 
+@instrument('app.create_professional_chart')
 def create_professional_chart(data, chart_type, title, x_col=None, y_col=None, color_col=None):
     """Create professional-looking charts with consistent styling"""
     
@@ -876,7 +1065,37 @@ def create_professional_chart(data, chart_type, title, x_col=None, y_col=None, c
     
     return fig
 
+@instrument('app.rerun')
 def main():
+    profiler = None
+    if profiling_requested(st.query_params):
+        profiler = RerunProfiler()
+        if not profiler.start():
+            profiler = None
+    
+    # The profiler holds a process-wide lock; it must be released however the
+    # rerun ends, including st.rerun() and exceptions on the page
+    page = None
+    try:
+        page = render_app()
+    finally:
+        if profiler is not None:
+            profile = profiler.stop()
+            if page is not None:
+                st.session_state.setdefault('profiles', {})[page] = profile
+    
+    with st.sidebar:
+        show_debug_panel()
+        if profiling_requested(st.query_params):
+            show_profile_panel(page)
+    
+    # Optional metrics file for scraping, e.g. metrics.prom for the node-exporter textfile collector
+    metrics_file = os.environ.get('MARKET_MAVEN_METRICS_FILE')
+    if metrics_file:
+        write_metrics_file(metrics_file)
+
+def render_app():
+    """Sidebar and the selected page; returns the page"""
     load_custom_css()
     
     # Initialize session state
@@ -885,8 +1104,30 @@ def main():
     if 'file_uploaded' not in st.session_state:
         st.session_state.file_uploaded = False
     
+    # Optional dataset available without uploading; prepared .arrow files are memory-mapped
+    data_file = os.environ.get('MARKET_MAVEN_DATA_FILE')
+    if data_file and st.session_state.user_df is None:
+        df, sketch = get_startup_dataset(data_file)
+        st.session_state.user_df = df.copy(deep=False)
+        st.session_state.dataset_sketch = sketch
+        st.session_state.dataset_id = f"file:{data_file}"
+        st.session_state.file_uploaded = True
+    
+    # Or the recent history of the dataset store, when one is configured; the sidebar's
+    # History window reads more of it on request
+    store_root = os.environ.get('MARKET_MAVEN_STORE')
+    if store_root:
+        # Picks up appends from other processes, e.g. `dataset_store.py append` run by cron;
+        # sessions showing an earlier version move to the latest one, keeping their window
+        store = get_dataset_store(store_root).refresh()
+        shown_id = str(st.session_state.get('dataset_id', ''))
+        if st.session_state.user_df is None and store.rows:
+            use_store_dataset(store, *recent_store_window(store))
+        elif shown_id.startswith('store:') and not shown_id.startswith(f"store:{store.version}:"):
+            use_store_dataset(store, *st.session_state.store_window)
+    
     # Sidebar navigation with mobile enhancements
-    with st.sidebar:
+    with st.sidebar, track('app.sidebar'):
         # Mobile-friendly navigation hint
         st.markdown("""
         <div style="background: rgba(102, 126, 234, 0.1); padding: 0.75rem; border-radius: 8px; margin-bottom: 1rem; border-left: 4px solid #667eea;">
@@ -905,13 +1146,26 @@ def main():
         
         st.markdown("---")
         
+        store_root = os.environ.get('MARKET_MAVEN_STORE')
+        if store_root and str(st.session_state.get('dataset_id', '')).startswith('store:'):
+            show_store_window(get_dataset_store(store_root))
+        
         if st.session_state.file_uploaded:
             st.markdown("### 📋 Data Summary")
             df = st.session_state.user_df
             st.metric("Total Records", len(df))
             st.metric("Columns", len(df.columns))
+            # Sketched during ingestion, so these don't scan the data on every rerun
+            sketch = st.session_state.get('dataset_sketch')
             if 'Total' in df.columns:
-                st.metric("Avg Sales", f"${df['Total'].mean():.2f}")
+                totals = sketch.describe('Total') if sketch is not None else None
+                if totals is not None:
+                    st.metric("Avg Sales", f"${totals['mean']:.2f}")
+                    st.metric("Median Sale", f"≈ ${sketch.quantile('Total', 0.5):.2f}")
+                else:
+                    st.metric("Avg Sales", f"${df['Total'].mean():.2f}")
+            if sketch is not None and sketch.nunique('Invoice ID') is not None:
+                st.metric("Invoices", f"≈ {sketch.nunique('Invoice ID'):,}")
     
     # Main content
     display_header()
@@ -928,7 +1182,86 @@ def main():
         show_analytics_page()
     elif page == "ℹ️ About":
         show_about_page()
+    
+    return page
+
+def render_chart(fig):
+    """Send a Plotly figure to the browser, timed as its own stage"""
+    with track('app.render_chart'):
+        st.plotly_chart(fig, use_container_width=True)
+
+@fragment
+def show_debug_panel():
+    """Collapsible per-stage timing and memory metrics for this server process"""
+    with st.expander("🛠️ Performance Debug", expanded=False):
+        trace_memory = st.checkbox(
+            "Trace peak memory",
+            value=memory_tracing(),
+            help="Uses tracemalloc; slows allocation-heavy stages while enabled"
+        )
+        if trace_memory != memory_tracing():
+            set_memory_tracing(trace_memory)
+        
+        registry = get_dataset_registry()
+        st.caption(
+            f"Shared datasets: {len(registry.summary())}, "
+            f"{registry.total_bytes() / 2**20:,.1f} MB "
+            f"({registry.stats['hits']} reused, {registry.stats['loads']} parsed)"
+        )
+        
+        totals = summarize()
+        if not totals:
+            st.caption("No stages recorded yet.")
+            return
+        
+        stats = pd.DataFrame([
+            {
+                'Stage': stage,
+                'Calls': values['count'],
+                'Wall (ms)': values['wall_seconds'] / values['count'] * 1000,
+                'CPU (ms)': values['cpu_seconds'] / values['count'] * 1000,
+                'Max wall (ms)': values['max_wall_seconds'] * 1000,
+                'Peak mem (MB)': (values['max_peak_memory_bytes'] / 2**20
+                                  if values['max_peak_memory_bytes'] is not None else None)
+            }
+            for stage, values in totals.items()
+        ]).sort_values('Wall (ms)', ascending=False)
+        st.caption("Mean per call since server start, all sessions")
+        st.dataframe(stats.round(2), use_container_width=True, hide_index=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("📥 JSON", to_json_lines(), file_name="metrics.jsonl", mime="application/json")
+        with col2:
+            st.download_button("📥 Prometheus", to_prometheus(), file_name="metrics.prom", mime="text/plain")
+        
+        if st.button("Reset metrics"):
+            reset_metrics()
 
+def show_profile_panel(page):
+    """Hotspots of the latest profiled rerun of the current page"""
+    with st.expander("🔬 Profile", expanded=True):
+        profile = st.session_state.get('profiles', {}).get(page)
+        if profile is None:
+            st.caption("Another session is being profiled; rerun to profile this page.")
+            return
+        
+        st.caption(f"Latest rerun of {page}: {profile['wall_seconds'] * 1000:.0f} ms")
+        hotspots = pd.DataFrame(profile['hotspots'])
+        hotspots['own_ms'] = hotspots.pop('own_seconds') * 1000
+        hotspots['cumulative_ms'] = hotspots.pop('cumulative_seconds') * 1000
+        st.dataframe(hotspots.round(1), use_container_width=True, hide_index=True)
+        
+        page_name = page.split(' ', 1)[-1].lower().replace(' ', '_')
+        st.download_button(
+            "📥 Download .prof",
+            profile['prof'],
+            file_name=f"market_maven_{page_name}.prof",
+            mime="application/octet-stream",
+            help="Open with snakeviz or python -m pstats"
+        )
+
+@instrument('app.show_home_page')
 def show_home_page():
     col1, col2, col3 = st.columns(3)
     
@@ -965,31 +1298,128 @@ def show_home_page():
     Ready to transform your sales strategy? Start by uploading your data!
     """)
 
+def parse_uploaded_file(uploaded_file, validator, sheet_name=0, on_chunk=None):
+    """Parse one uploaded CSV, workbook, Parquet file or compressed export, validating it on the way"""
+    name = uploaded_file.name
+    if name.lower().endswith(COMPRESSED_EXTENSIONS):
+        return read_compressed(uploaded_file, name, sheet_name, validator=validator, on_chunk=on_chunk)
+    if name.endswith('.csv'):
+        return read_csv_chunked(uploaded_file, validator=validator, on_chunk=on_chunk)
+    if name.endswith('.parquet'):
+        df = pd.read_parquet(uploaded_file)
+    else:
+        df = read_excel_fast(uploaded_file, sheet_name)
+    validator.update(df)
+    return df
+
+@instrument('app.show_upload_page')
 def show_upload_page():
     st.markdown("## 📁 Upload Your Sales Data")
     
-    uploaded_file = st.file_uploader(
-        "Choose your sales data file",
-        type=['csv', 'xlsx'],
-        help="Upload CSV or Excel files containing your sales data"
+    uploaded_files = st.file_uploader(
+        "Choose your sales data files",
+        type=['csv', 'xlsx', 'parquet', 'gz', 'zip', 'zst', 'bz2', 'xz'],
+        accept_multiple_files=True,
+        help="Upload CSV, Excel or Parquet files containing your sales data. "
+             "Several files with the same columns, e.g. one export per branch, are combined; "
+             "compressed exports (.csv.gz, .zip, .zst) are decompressed while parsing"
     )
     
-    if uploaded_file is not None:
+    if uploaded_files:
         try:
-            # Show loading animation
-            with st.spinner('Processing your data...'):
-                if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(uploaded_file)
+            sheet_name = None
+            if len(uploaded_files) == 1 and uploaded_files[0].name.endswith('.xlsx'):
+                sheets = excel_sheet_names(uploaded_files[0])
+                sheet_name = sheets[0] if len(sheets) == 1 else st.selectbox("Sheet", sheets)
+            
+            progress = st.empty()
+            
+            def show_progress(rows, validator):
+                # Problems found so far are shown while the rest is still parsing
+                errors, warnings = validator.report()
+                issues = f" · {len(errors) + len(warnings)} issue(s) found so far" if errors or warnings else ""
+                progress.caption(f"Parsed {rows:,} rows{issues}")
+            
+            def parse_uploads():
+                # Distinct counts and quantiles are sketched while parsing; with
+                # several files, per-file sketches are merged
+                sketch = DatasetSketch()
+                validator = StreamingValidator(sketch=sketch)
+                if len(uploaded_files) == 1:
+                    df = parse_uploaded_file(uploaded_files[0], validator, sheet_name or 0, show_progress)
+                    errors, warnings = validator.report()
                 else:
-                    df = pd.read_excel(uploaded_file)
+                    df, errors, warnings = load_files(
+                        uploaded_files, loader=parse_uploaded_file, sketch=sketch,
+                        names=[uploaded_file.name for uploaded_file in uploaded_files]
+                    )
+                    if errors:
+                        raise ValueError("; ".join(errors))
+                # Kept with the shared dataset so later sessions get the same report, sketch
+                # and the bitmaps and cube behind the Analytics filters
+                metadata = {'validation': (errors, warnings), 'sketch': sketch}
+                if not errors:
+                    date_col, target_col, product_col, _ = detect_columns(df)
+                    metadata['filter_index'] = FilterIndex(df, filter_columns(df, product_col), date_col, target_col)
+                return df, metadata
+            
+            # Identical uploads from any session are parsed and stored once
+            if len(uploaded_files) == 1:
+                content = uploaded_files[0].getvalue()
+            else:
+                content = "\n".join(content_id(uploaded_file.getvalue()) for uploaded_file in uploaded_files).encode()
             
-            st.markdown('<div class="success-box">✅ File uploaded successfully!</div>', 
+            # Show loading animation
+            with st.spinner('Processing your data...'), track('app.parse_upload'):
+                registry = get_dataset_registry()
+                dataset_id, df = registry.get_or_load(
+                    content, parse_uploads,
+                    name=", ".join(uploaded_file.name for uploaded_file in uploaded_files),
+                    variant=sheet_name
+                )
+            progress.empty()
+            
+            metadata = registry.metadata(dataset_id)
+            errors, warnings = metadata.get('validation', ([], []))
+            for warning in warnings:
+                st.warning(warning)
+            if errors:
+                for error in errors:
+                    st.error(error)
+                return
+            
+            st.markdown(f'<div class="success-box">✅ {len(uploaded_files)} file(s) uploaded successfully!</div>', 
                        unsafe_allow_html=True)
             
             # Store in session state
+            shown_id = str(st.session_state.get('dataset_id', ''))
             st.session_state.user_df = df
+            st.session_state.dataset_id = dataset_id
+            st.session_state.dataset_sketch = metadata.get('sketch')
             st.session_state.file_uploaded = True
             
+            # Appending only processes the new rows; aggregates of the history are updated, not rebuilt
+            store_root = os.environ.get('MARKET_MAVEN_STORE')
+            if store_root:
+                store = get_dataset_store(store_root)
+                # The session moves to the store over this upload's days, not its whole history;
+                # the sidebar's History window widens it
+                if store.has_batch(dataset_id):
+                    if shown_id.startswith(f"store:{store.version}:"):
+                        use_store_dataset(store, *st.session_state.store_window)
+                    else:
+                        use_store_batch(store, dataset_id)
+                    st.info(f"This upload is part of the dataset store ({store.rows:,} rows); "
+                            f"widen the History window in the sidebar to see more of it")
+                elif st.button("➕ Append to dataset store", help=f"Add these rows to the history in {store_root}"):
+                    try:
+                        with st.spinner('Appending to the dataset store...'), track('app.store_append'):
+                            added = store.append(df, batch_id=dataset_id)
+                        use_store_batch(store, dataset_id)
+                        st.success(f"Appended {added:,} rows; the store now has {store.rows:,} rows")
+                    except ValueError as e:
+                        st.error(f"Can't append to the dataset store: {e}")
+            
             # Display data preview
             st.markdown("### 📋 Data Preview")
             
@@ -1027,7 +1457,7 @@ def show_upload_page():
                         st.markdown(f"• {col}")
                 
                 with col2:
-                    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+                    categorical_cols = df.select_dtypes(include=['object', 'str']).columns.tolist()
                     st.markdown(f"**Categorical Columns ({len(categorical_cols)}):**")
                     for col in categorical_cols[:10]:  # Show first 10
                         st.markdown(f"• {col}")
@@ -1049,6 +1479,7 @@ def show_upload_page():
         **Supported formats:** CSV, Excel (.xlsx)
         """)
 
+@instrument('app.show_forecast_page')
 def show_forecast_page():
     if not st.session_state.file_uploaded:
         st.markdown('<div class="warning-box">⚠️ Please upload your data first!</div>', 
@@ -1065,52 +1496,78 @@ def show_forecast_page():
                    unsafe_allow_html=True)
         return
     
-    # Forecast configuration
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.markdown("### ⚙️ Forecast Settings")
-        period_options = {
-            'Next 7 days': 7,
-            'Next 30 days': 30,
-            'Next 90 days': 90,
-            'Next 6 months': 180,
-            'Custom period': 0
-        }
-        
-        selected_period = st.selectbox(
-            "Forecast Period",
-            list(period_options.keys())
-        )
+    forecast_panel(df, date_col, target_col, product_col, external_cols)
+
+@fragment
+@instrument('app.forecast_panel')
+def forecast_panel(df, date_col, target_col, product_col, external_cols):
+    """
+    Forecast settings and results
+
+    The settings sit in a form, so changing them sends nothing to the server
+    until the forecast is requested, and the panel is a fragment, so that
+    request reruns only this panel instead of the whole page.
+    """
+    with st.form("forecast_settings"):
+        # Forecast configuration
+        col1, col2 = st.columns(2)
         
-        if selected_period == 'Custom period':
+        with col1:
+            st.markdown("### ⚙️ Forecast Settings")
+            period_options = {
+                'Next 7 days': 7,
+                'Next 30 days': 30,
+                'Next 90 days': 90,
+                'Next 6 months': 180,
+                'Custom period': 0
+            }
+            
+            selected_period = st.selectbox(
+                "Forecast Period",
+                list(period_options.keys())
+            )
+            
+            # Always shown: widgets inside a form can't appear in response to other widgets
             custom_days = st.number_input(
-                'Enter number of days',
+                'Custom number of days',
                 min_value=1,
                 max_value=365,
-                value=30
+                value=30,
+                help="Used when the forecast period is 'Custom period'"
             )
-            forecast_days = custom_days
-        else:
-            forecast_days = period_options[selected_period]
-    
-    with col2:
-        st.markdown("### 📊 Model Settings")
-        confidence_level = st.slider(
-            "Confidence Level",
-            min_value=80,
-            max_value=99,
-            value=95,
-            help="Confidence interval for predictions"
-        )
+            
+            if selected_period == 'Custom period':
+                forecast_days = custom_days
+            else:
+                forecast_days = period_options[selected_period]
         
-        smoothing = st.selectbox(
-            "Smoothing Method",
-            ["Moving Average", "Exponential", "Linear Trend"]
-        )
+        with col2:
+            st.markdown("### 📊 Model Settings")
+            confidence_level = st.slider(
+                "Confidence Level",
+                min_value=80,
+                max_value=99,
+                value=95,
+                help="Confidence interval for predictions"
+            )
+            
+            smoothing_methods = {
+                'Moving Average': 'moving_average',
+                'Exponential': 'exponential',
+                'Linear Trend': 'linear_trend',
+                'Holt-Winters': 'holt_winters',
+                'Holt-Winters (Multiplicative)': 'holt_winters_multiplicative'
+            }
+            
+            smoothing = st.selectbox(
+                "Smoothing Method",
+                list(smoothing_methods.keys())
+            )
+        
+        # Generate forecast button
+        submitted = st.form_submit_button("🔮 Generate Forecast", type="primary")
     
-    # Generate forecast button
-    if st.button("🔮 Generate Forecast", type="primary"):
+    if submitted:
         with st.spinner('Generating forecast...'):
             try:
                 # Preprocess data
@@ -1119,7 +1576,11 @@ def show_forecast_page():
                 )
                 
                 # Generate forecast
-                forecast_data = simple_forecast(y, forecast_days, method=smoothing.lower())
+                forecast_data = simple_forecast(
+                    y, forecast_days,
+                    method=smoothing_methods[smoothing],
+                    batcher=get_forecast_batcher()
+                )
                 
                 # Store forecast in session state
                 st.session_state.forecast = forecast_data
@@ -1136,6 +1597,7 @@ def show_forecast_page():
                 st.markdown(f'<div class="warning-box">❌ Error generating forecast: {str(e)}</div>', 
                            unsafe_allow_html=True)
 
+@instrument('app.display_forecast_results')
 def display_forecast_results(forecast_data, target_col, forecast_days):
     st.markdown("## 📊 Forecast Results")
     
@@ -1239,7 +1701,7 @@ def display_forecast_results(forecast_data, target_col, forecast_days):
         linecolor=line_color
     )
     
-    st.plotly_chart(fig, use_container_width=True)
+    render_chart(fig)
     st.markdown('</div>', unsafe_allow_html=True)
     
     # Download forecast
@@ -1252,6 +1714,7 @@ def display_forecast_results(forecast_data, target_col, forecast_days):
         type="secondary"
     )
 
+@instrument('app.show_insights_page')
 def show_insights_page():
     if not st.session_state.file_uploaded:
         st.markdown('<div class="warning-box">⚠️ Please upload your data first!</div>', 
@@ -1270,7 +1733,7 @@ def show_insights_page():
     target_col = st.session_state.target_col
     
     # Generate insights
-    insights = generate_business_insights(df, forecast_data, target_col)
+    insights = generate_business_insights(df, forecast_data, target_col, get_analytics_backend(df))
     
     # Display enhanced insights with Streamlit components
     for insight in insights:
@@ -1311,7 +1774,50 @@ def show_insights_page():
                     st.markdown(f"• {item}")
             
             st.markdown("---")
+    
+    # Segment trends
+    segment_trends = compute_segment_trends(df, target_col)
+    if segment_trends is not None and len(segment_trends) > 0:
+        st.markdown("### 📈 Fastest Growing / Declining Segments")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("**🚀 Fastest Growing**")
+            growing = segment_trends[segment_trends['Change Rate (%)'] > 0]
+            st.dataframe(growing.head(10), use_container_width=True, hide_index=True)
+        with col2:
+            st.markdown("**📉 Fastest Declining**")
+            declining = segment_trends[segment_trends['Change Rate (%)'] < 0]
+            st.dataframe(declining.iloc[::-1].head(10), use_container_width=True, hide_index=True)
 
+@instrument('app.compute_segment_trends')
+def compute_segment_trends(df, target_col):
+    """Daily sales trend for every product/branch segment, sorted by change rate"""
+    date_col, _, product_col, _ = detect_columns(df)
+    segment_cols = [col for col in df.columns 
+                    if col == product_col or any(keyword in col.lower() for keyword in ['branch', 'store', 'region'])]
+    
+    if not date_col or not target_col or not segment_cols:
+        return None
+    
+    series = pivot_series(df, segment_cols, date_col, target_col)
+    if series.empty:
+        return None
+    
+    trends = trend_analysis_batch(series.to_numpy())
+    
+    segments = series.index.to_frame(index=False)
+    segment_names = segments.astype(str).agg(' / '.join, axis=1)
+    result = pd.DataFrame({
+        'Segment': segment_names,
+        'Trend': trends['trend'],
+        'Slope ($/day)': np.round(trends['slope'], 2),
+        'Change Rate (%)': np.round(trends['change_rate'], 2)
+    })
+    
+    return result.sort_values('Change Rate (%)', ascending=False, ignore_index=True)
+
+@instrument('app.show_analytics_page')
 def show_analytics_page():
     if not st.session_state.file_uploaded:
         st.markdown('<div class="warning-box">⚠️ Please upload your data first!</div>', 
@@ -1323,40 +1829,71 @@ def show_analytics_page():
     df = st.session_state.user_df
     date_col, target_col, product_col, external_cols = detect_columns(df)
     
+    sketch = st.session_state.get('dataset_sketch')
+    index = get_filter_index(df, date_col, target_col, product_col)
+    filters, start, end = show_analytics_filters(index)
+    filtered = any(filters.values()) or start is not None or end is not None
+    if not filtered:
+        summary = summarize_sales(df, date_col, target_col, product_col, sketch, get_analytics_backend(df))
+    else:
+        # The sketch and the store's aggregates describe all rows; filtered views are
+        # answered from the index's cube without touching the rows
+        with track('app.filter_count'):
+            matches = index.count(filters, start, end)
+        st.caption(f"Showing {matches:,} of {index.n_rows:,} rows matching the filters")
+        if matches == 0:
+            st.info("No rows match the filters")
+            return
+        sketch = None
+        summary = summarize_sales(df, date_col, target_col, product_col, backend=index.backend(df, filters, start, end))
+        summary['transactions'] = matches
+    
     # Analytics overview
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_sales = df[target_col].sum() if target_col else 0
-        display_metric_card("Total Sales", f"${total_sales:,.2f}")
+        display_metric_card("Total Sales", f"${summary['total_sales']:,.2f}")
     
     with col2:
-        avg_sales = df[target_col].mean() if target_col else 0
-        display_metric_card("Average Sale", f"${avg_sales:.2f}")
+        display_metric_card("Average Sale", f"${summary['avg_sales']:.2f}")
     
     with col3:
-        num_transactions = len(df)
-        display_metric_card("Transactions", f"{num_transactions:,}")
+        display_metric_card("Transactions", f"{summary['transactions']:,}")
     
     with col4:
-        if product_col and product_col in df.columns:
-            unique_products = df[product_col].nunique()
-            display_metric_card("Unique Products", f"{unique_products}")
+        if summary['unique_products'] is not None:
+            display_metric_card("Unique Products", f"{summary['unique_products']}")
+    
+    # Distribution from the ingestion sketch; approximate, but instant on any size
+    if sketch is not None and target_col and sketch.quantile(target_col, 0.5) is not None:
+        p50, p90 = sketch.quantile(target_col, [0.5, 0.9])
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            display_metric_card("Median Sale", f"≈ ${p50:,.2f}")
+        with col2:
+            display_metric_card("90th Percentile Sale", f"≈ ${p90:,.2f}")
+        with col3:
+            if sketch.quantile('Rating', 0.5) is not None:
+                display_metric_card("Median Rating", f"≈ {sketch.quantile('Rating', 0.5):.1f}")
+        with col4:
+            if sketch.nunique('Invoice ID') is not None:
+                display_metric_card("Invoices", f"≈ {sketch.nunique('Invoice ID'):,}")
     
     # Charts section
     st.markdown("### 📈 Performance Analytics")
     
-    if product_col and product_col in df.columns and target_col:
+    product_sales = summary['product_sales']
+    if product_sales is not None:
         col1, col2 = st.columns(2)
         
         with col1:
             # Top products by sales
-            product_sales = df.groupby(product_col)[target_col].sum().sort_values(ascending=False).head(10)
+            top_products = product_sales.head(10)
             fig = create_professional_chart(
-                pd.DataFrame({'Product': product_sales.index, 'Sales': product_sales.values}),
+                pd.DataFrame({'Product': top_products.index, 'Sales': top_products.values}),
                 'bar', 'Top 10 Products by Sales', 'Product', 'Sales'
             )
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
         
         with col2:
             # Sales distribution pie chart
@@ -1364,21 +1901,97 @@ def show_analytics_page():
                 pd.DataFrame({'Product': product_sales.head(5).index, 'Sales': product_sales.head(5).values}),
                 'pie', 'Sales Distribution (Top 5)', 'Product', 'Sales'
             )
-            st.plotly_chart(fig, use_container_width=True)
+            render_chart(fig)
     
     # Time series analysis
-    if date_col and date_col in df.columns and target_col:
+    if summary['daily_sales'] is not None:
         st.markdown("### 📅 Time Series Analysis")
         
-        df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-        daily_sales = df.groupby(df[date_col].dt.date)[target_col].sum().reset_index()
-        daily_sales.columns = ['Date', 'Sales']
-        
         fig = create_professional_chart(
-            daily_sales, 'line', 'Daily Sales Trend', 'Date', 'Sales'
+            summary['daily_sales'], 'line', 'Daily Sales Trend', 'Date', 'Sales'
         )
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(fig)
+    
+    # Drill-down across the categorical columns, cross-filtered by the filters above
+    if target_col and index.values:
+        st.markdown("### 🧭 Drill-down")
+        show_drill_down(index, df, filters, start, end)
+
+def show_analytics_filters(index):
+    """Filter widgets for the indexed columns and the date range; returns (filters, start, end)"""
+    filters = {}
+    start = end = None
+    with st.expander("🔎 Filters", expanded=False):
+        columns = st.columns(3)
+        for i, col in enumerate(index.values):
+            with columns[i % 3]:
+                filters[col] = st.multiselect(col, index.values[col], key=f"filter_{col}")
+        
+        date_range = index.date_range()
+        if date_range is not None:
+            first, last = date_range[0].date(), date_range[1].date()
+            window = st.date_input(
+                "Date range", value=(first, last), min_value=first, max_value=last, key='filter_dates'
+            )
+            # The widget returns a single date while the second one is being picked
+            if isinstance(window, (tuple, list)) and len(window) == 2 and tuple(window) != (first, last):
+                start, end = window
+    
+    return filters, start, end
+
+def show_drill_down(index, df, filters, start, end):
+    """
+    Sales per value of every indexed column, cross-filtered
+    
+    Each chart applies all filters except its own column's, so it shows
+    where the current selection could be widened or narrowed. Totals come
+    from the index's cube, so redrawing all charts doesn't scan the rows.
+    """
+    columns = st.columns(3)
+    for i, col in enumerate(index.values):
+        others = {other: values for other, values in filters.items() if other != col}
+        with track('app.drill_down'):
+            sales = index.backend(df, others, start, end).group_sum(col, index.target_col)
+        with columns[i % 3]:
+            fig = create_professional_chart(
+                pd.DataFrame({col: sales.index, 'Sales': sales.to_numpy()}), 'bar', f'Sales by {col}', col, 'Sales'
+            )
+            render_chart(fig)
+
+@instrument('app.summarize_sales')
+def summarize_sales(df, date_col, target_col, product_col, sketch=None, backend=None):
+    """
+    Aggregations behind the Analytics dashboard, on pandas or DuckDB depending on size
+    
+    Totals and the distinct product count come from the ingestion sketch
+    when there is one; only the groupings scan the data (or the dataset
+    store's aggregates when `backend` is the store's).
+    """
+    backend = backend or get_backend(df)
+    totals = {}
+    if target_col:
+        totals = (sketch.describe(target_col) if sketch is not None else None) or backend.describe(target_col)
+    summary = {
+        'total_sales': totals.get('sum', 0),
+        'avg_sales': totals.get('mean', 0),
+        'transactions': len(df),
+        'unique_products': None,
+        'product_sales': None,
+        'daily_sales': None
+    }
+    
+    if product_col and product_col in df.columns:
+        unique_products = sketch.nunique(product_col) if sketch is not None else None
+        summary['unique_products'] = unique_products if unique_products is not None else backend.nunique(product_col)
+        if target_col:
+            summary['product_sales'] = backend.group_sum(product_col, target_col)
+    
+    if date_col and date_col in df.columns and target_col:
+        summary['daily_sales'] = backend.daily_sum(date_col, target_col)
+    
+    return summary
 
+@instrument('app.show_about_page')
 def show_about_page():
     st.markdown("""
     ## ℹ️ About Market Maven
@@ -1412,13 +2025,16 @@ def show_about_page():
     *Built with ❤️ for modern businesses*
     """)
 
-def generate_business_insights(df, forecast_data, target_col):
+@instrument('app.generate_business_insights')
+def generate_business_insights(df, forecast_data, target_col, backend=None):
     """Generate comprehensive business insights based on data and forecast"""
     insights = []
+    backend = backend or get_backend(df)
+    totals = backend.describe(target_col) if target_col else {}
     
     # Forecast performance insight
     avg_forecast = np.mean(forecast_data)
-    current_avg = df[target_col].mean() if target_col else 0
+    current_avg = totals.get('mean', 0)
     
     if avg_forecast > current_avg * 1.1:
         insights.append({
@@ -1452,7 +2068,7 @@ def generate_business_insights(df, forecast_data, target_col):
     date_col, _, product_col, _ = detect_columns(df)
     
     if product_col and product_col in df.columns:
-        product_sales = df.groupby(product_col)[target_col].sum().sort_values(ascending=False)
+        product_sales = backend.group_sum(product_col, target_col)
         top_product = product_sales.index[0]
         top_sales = product_sales.iloc[0]
         total_sales = product_sales.sum()
@@ -1481,8 +2097,8 @@ def generate_business_insights(df, forecast_data, target_col):
     
     # Sales velocity insights
     if target_col:
-        sales_std = df[target_col].std()
-        sales_mean = df[target_col].mean()
+        sales_std = totals['std']
+        sales_mean = totals['mean']
         cv = sales_std / sales_mean if sales_mean > 0 else 0
         
         if cv > 0.5:
@@ -1497,8 +2113,7 @@ def generate_business_insights(df, forecast_data, target_col):
     
     # Seasonal insights
     if date_col and date_col in df.columns:
-        df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-        monthly_sales = df.groupby(df[date_col].dt.month)[target_col].mean()
+        monthly_sales = backend.monthly_mean(date_col, target_col)
         
         if len(monthly_sales) > 1:
             best_month = monthly_sales.idxmax()
@@ -0,0 +1,168 @@
+"""
+Request micro-batching for concurrent forecast calls
+
+Many sessions pressing "Generate Forecast" at the same time would each run
+their own forecast. `ForecastBatcher` instead collects the requests that
+arrive within a few milliseconds, stacks their series into one padded 2-D
+array, runs a single vectorized forecast and hands each caller its rows.
+
+It is thread-based, so Streamlit sessions (one thread each) can share one
+instance, and async code can await it with `asyncio.wrap_future`.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from model import pad_series, forecast_with_confidence_batch, trend_analysis_batch
+
+def run_batch(kind, params, Y):
+    """Run one vectorized call for a batch; top-level so process pools can run it"""
+    if kind == 'trend':
+        return trend_analysis_batch(Y)
+    periods, method, confidence_level = params
+    return forecast_with_confidence_batch(Y, periods, confidence_level=confidence_level, method=method)
+
+class ForecastBatcher:
+    """
+    Collect concurrent forecast requests and run them as one batch
+
+    Parameters:
+    - max_wait: seconds to keep collecting after the first request of a batch
+    - max_batch_size: number of series that dispatches a batch immediately
+    - executor: optional executor (e.g. a process pool) for the vectorized
+      call; by default it runs on the dispatcher thread
+
+    Requests only share a batch when their kind and parameters match.
+    A request waits at most `max_wait` plus one batch computation, which
+    keeps tail latency bounded while throughput grows with concurrency.
+    """
+
+    def __init__(self, max_wait=0.005, max_batch_size=256, executor=None):
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self.executor = executor
+        self.stats = {'requests': 0, 'series': 0, 'batches': 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, kind, params, series_list):
+        """
+        Queue series for a batched call; returns a concurrent Future
+
+        - kind: 'forecast' with params (periods, method, confidence_level),
+          or 'trend' with params ()
+        - series_list: list of 1-D arrays, one per series
+
+        The Future resolves to the result dict of the batch call restricted
+        to this request's rows.
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((kind, params, list(series_list), future))
+        return future
+
+    def forecast(self, series, periods, method='moving_average', timeout=None):
+        """Blocking forecast for one series, batched with concurrent callers"""
+        result = self.submit('forecast', (periods, method, 0.95), [series]).result(timeout)
+        return result['forecast'][0]
+
+    def close(self):
+        """Stop the dispatcher thread after the queued requests are served"""
+        with self._lock:
+            if self._thread is not None:
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch_loop, name='forecast-batcher', daemon=True)
+                self._thread.start()
+
+    def _collect(self, first):
+        """Gather requests arriving within max_wait of the first one"""
+        items = [first]
+        n_series = len(first[2])
+        deadline = time.monotonic() + self.max_wait
+        stop = False
+
+        while n_series < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                stop = True
+                break
+            items.append(item)
+            n_series += len(item[2])
+
+        return items, stop
+
+    def _dispatch_loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            items, stop = self._collect(first)
+
+            groups = {}
+            for kind, params, series_list, future in items:
+                groups.setdefault((kind, params), []).append((series_list, future))
+            for (kind, params), batch in groups.items():
+                self._run(kind, params, batch)
+
+            if stop:
+                return
+
+    def _run(self, kind, params, batch):
+        series = [row for series_list, _ in batch for row in series_list]
+        self.stats['requests'] += len(batch)
+        self.stats['series'] += len(series)
+        self.stats['batches'] += 1
+
+        try:
+            Y = pad_series(series)
+            if self.executor is None:
+                self._scatter(batch, run_batch(kind, params, Y))
+            else:
+                pending = self.executor.submit(run_batch, kind, params, Y)
+                pending.add_done_callback(lambda done: self._scatter_future(batch, done))
+        except Exception as e:
+            self._fail(batch, e)
+
+    def _scatter_future(self, batch, done):
+        try:
+            result = done.result()
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        self._scatter(batch, result)
+
+    @staticmethod
+    def _scatter(batch, result):
+        start = 0
+        for series_list, future in batch:
+            stop = start + len(series_list)
+            if future.running() or future.set_running_or_notify_cancel():
+                future.set_result({
+                    name: values[start:stop] if isinstance(values, np.ndarray) else values
+                    for name, values in result.items()
+                })
+            start = stop
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future in batch:
+            if future.done():
+                continue
+            if future.running() or future.set_running_or_notify_cancel():
+                future.set_exception(error)
@@ -0,0 +1,4 @@
+"""Benchmark suite for the data and model hot paths; see benchmarks/run.py"""
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark or setup that isn't run at this size; recorded as skipped"""
@@ -0,0 +1,24 @@
+"""Benchmarks for the aggregations behind the Insights and Analytics pages"""
+import numpy as np
+
+from data_utils import detect_columns
+from benchmarks.datasets import make_sales_frame
+
+class PageAggregations:
+    def setup(self, n_rows):
+        # Imported lazily: importing app configures the Streamlit page
+        import app
+        self.app = app
+        self.df = make_sales_frame(n_rows)
+        self.columns = detect_columns(self.df)
+        self.forecast = np.full(30, self.df['Total'].mean())
+
+    def time_generate_business_insights(self, n_rows):
+        self.app.generate_business_insights(self.df, self.forecast, 'Total')
+
+    def time_summarize_sales(self, n_rows):
+        date_col, target_col, product_col, _ = self.columns
+        self.app.summarize_sales(self.df, date_col, target_col, product_col)
+
+    def time_compute_segment_trends(self, n_rows):
+        self.app.compute_segment_trends(self.df, 'Total')
@@ -0,0 +1,44 @@
+"""Benchmarks for data_utils: loading, column detection and preprocessing"""
+import os
+import tempfile
+
+from data_utils import load_data, detect_columns, preprocess_dynamic, pivot_series, validate_data
+from benchmarks.datasets import make_sales_frame
+
+class LoadData:
+    def setup(self, n_rows):
+        df = make_sales_frame(n_rows)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, 'sales.csv')
+        self.parquet_path = os.path.join(self.tmpdir.name, 'sales.parquet')
+        df.to_csv(self.csv_path, index=False)
+        df.to_parquet(self.parquet_path, index=False)
+
+    def teardown(self, n_rows):
+        self.tmpdir.cleanup()
+
+    def time_load_csv(self, n_rows):
+        load_data(self.csv_path)
+
+    def time_load_parquet(self, n_rows):
+        load_data(self.parquet_path)
+
+class Preprocess:
+    def setup(self, n_rows):
+        self.df = make_sales_frame(n_rows)
+        self.columns = detect_columns(self.df)
+
+    def time_detect_columns(self, n_rows):
+        detect_columns(self.df)
+
+    def time_validate_data(self, n_rows):
+        validate_data(self.df)
+
+    def time_preprocess_ordinal(self, n_rows):
+        preprocess_dynamic(self.df, *self.columns)
+
+    def time_preprocess_auto(self, n_rows):
+        preprocess_dynamic(self.df, *self.columns, encoding='auto')
+
+    def time_pivot_series(self, n_rows):
+        pivot_series(self.df, ['Product line', 'Branch'], 'Date', 'Total')
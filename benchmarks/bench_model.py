@@ -0,0 +1,53 @@
+"""Benchmarks for model: single-series and batched forecasting"""
+from data_utils import detect_columns, preprocess_dynamic, pivot_series
+from model import simple_forecast, forecast_with_confidence, forecast_batch, trend_analysis_batch
+from benchmarks import SkipBenchmark
+from benchmarks.datasets import make_sales_frame
+
+class SimpleForecast:
+    # The Forecast page passes the row-level target, one value per transaction.
+    # Exponential and Holt-Winters step through it in Python, so cap the size.
+    max_rows = {'exponential': 1_000_000, 'holt_winters': 100_000, 'holt_winters_multiplicative': 100_000}
+
+    def setup(self, n_rows):
+        df = make_sales_frame(n_rows)
+        _, self.y, _, _ = preprocess_dynamic(df, *detect_columns(df))
+
+    def _forecast(self, n_rows, method):
+        if n_rows > self.max_rows.get(method, n_rows):
+            raise SkipBenchmark(f"{method} is not run above {self.max_rows[method]:,} rows")
+        simple_forecast(self.y, 30, method=method)
+
+    def time_moving_average(self, n_rows):
+        self._forecast(n_rows, 'moving_average')
+
+    def time_exponential(self, n_rows):
+        self._forecast(n_rows, 'exponential')
+
+    def time_linear_trend(self, n_rows):
+        self._forecast(n_rows, 'linear_trend')
+
+    def time_holt_winters(self, n_rows):
+        self._forecast(n_rows, 'holt_winters')
+
+    def time_holt_winters_multiplicative(self, n_rows):
+        self._forecast(n_rows, 'holt_winters_multiplicative')
+
+    def time_forecast_with_confidence(self, n_rows):
+        forecast_with_confidence(self.y, 30)
+
+class BatchForecast:
+    """Daily series per product line and branch, as the CLI and API forecast them"""
+
+    def setup(self, n_rows):
+        df = make_sales_frame(n_rows)
+        self.Y = pivot_series(df, ['Product line', 'Branch'], 'Date', 'Total').to_numpy()
+
+    def time_forecast_batch_moving_average(self, n_rows):
+        forecast_batch(self.Y, 30, method='moving_average')
+
+    def time_forecast_batch_holt_winters(self, n_rows):
+        forecast_batch(self.Y, 30, method='holt_winters')
+
+    def time_trend_analysis_batch(self, n_rows):
+        trend_analysis_batch(self.Y)
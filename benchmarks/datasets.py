@@ -0,0 +1,6 @@
+"""Synthetic datasets with the schema of the bundled supermarket_sales.csv"""
+from synthetic_data import generate_sales
+
+def make_sales_frame(n_rows, seed=0):
+    """A year of realistic transactions from synthetic_data.generate_sales"""
+    return generate_sales(n_rows, seed=seed)
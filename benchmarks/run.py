@@ -0,0 +1,173 @@
+"""
+Run the benchmark suite and store the timings as JSON
+
+Every `bench_*.py` module in this directory holds suite classes in the
+style of asv: `setup(n_rows)` / `teardown(n_rows)` prepare data outside the
+timed region, and each `time_*(n_rows)` method is one benchmark. A
+benchmark raising benchmarks.SkipBenchmark is recorded as skipped at that
+size; a setup raising it skips the whole suite at that size.
+
+Usage:
+    python -m benchmarks.run --sizes 10 10000 1000000
+    python -m benchmarks.run --filter forecast --output before.json
+    python -m benchmarks.run --compare before.json after.json
+"""
+import argparse
+import importlib
+import inspect
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import SkipBenchmark
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+DEFAULT_SIZES = [10, 10_000, 1_000_000]
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def discover():
+    """(module name, class) pairs of every suite"""
+    suites = []
+    for path in sorted(BENCH_DIR.glob('bench_*.py')):
+        module = importlib.import_module(f'benchmarks.{path.stem}')
+        for name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ == module.__name__ and any(attr.startswith('time_') for attr in dir(cls)):
+                suites.append((path.stem, cls))
+    return suites
+
+def time_call(func, n_rows, repeat, min_time):
+    """Per-call timings; fast calls are looped so each sample lasts about min_time"""
+    started = time.perf_counter()
+    func(n_rows)
+    first = time.perf_counter() - started
+    number = max(1, int(min_time / first)) if first > 0 else 1000
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func(n_rows)
+        samples.append((time.perf_counter() - started) / number)
+    return samples
+
+def run(sizes, pattern=None, repeat=5, min_time=0.05):
+    results = {}
+    for module_name, cls in discover():
+        benchmarks = sorted(attr for attr in dir(cls) if attr.startswith('time_'))
+        benchmarks = [
+            attr for attr in benchmarks
+            if not pattern or pattern in f'{module_name}.{cls.__name__}.{attr}'
+        ]
+        if not benchmarks:
+            continue
+
+        for n_rows in sizes:
+            suite = cls()
+            try:
+                if hasattr(suite, 'setup'):
+                    suite.setup(n_rows)
+            except SkipBenchmark:
+                continue
+
+            try:
+                for attr in benchmarks:
+                    key = f'{module_name}.{cls.__name__}.{attr}'
+                    entry = results.setdefault(key, {})
+                    try:
+                        samples = time_call(getattr(suite, attr), n_rows, repeat, min_time)
+                    except SkipBenchmark as e:
+                        entry[str(n_rows)] = {'skipped': str(e)}
+                        print(f'{key} [{n_rows:,} rows]: skipped')
+                        continue
+                    entry[str(n_rows)] = {
+                        'min': min(samples),
+                        'median': statistics.median(samples),
+                        'mean': statistics.fmean(samples),
+                        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+                        'repeat': len(samples)
+                    }
+                    print(f'{key} [{n_rows:,} rows]: {statistics.median(samples) * 1000:.3f} ms')
+            finally:
+                if hasattr(suite, 'teardown'):
+                    suite.teardown(n_rows)
+    return results
+
+def compare(base_path, new_path, threshold=1.1):
+    """Print median ratios new/base; returns the number of regressions"""
+    with open(base_path) as f:
+        base = json.load(f)['results']
+    with open(new_path) as f:
+        new = json.load(f)['results']
+
+    regressions = 0
+    for key in sorted(set(base) & set(new)):
+        for size in sorted(set(base[key]) & set(new[key]), key=int):
+            before, after = base[key][size], new[key][size]
+            if 'median' not in before or 'median' not in after:
+                continue
+            ratio = after['median'] / before['median'] if before['median'] else float('inf')
+            flag = ''
+            if ratio > threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            elif ratio < 1 / threshold:
+                flag = '  improved'
+            print(f"{key} [{int(size):,} rows]: {before['median'] * 1000:.3f} -> "
+                  f"{after['median'] * 1000:.3f} ms ({ratio:.2f}x){flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Market Maven benchmark suite")
+    parser.add_argument('--sizes', type=float, nargs='+', default=DEFAULT_SIZES,
+                        help="Dataset sizes in rows, e.g. 10 1e4 1e7 (default: 10 10000 1000000)")
+    parser.add_argument('--filter', dest='pattern',
+                        help="Only run benchmarks whose name contains this text")
+    parser.add_argument('--repeat', type=int, default=5, help="Samples per benchmark (default: 5)")
+    parser.add_argument('--output', help="JSON results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                        help="Compare two results files instead of running")
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help="Slowdown ratio reported as a regression (default: 1.1)")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*args.compare, threshold=args.threshold) else 0
+
+    sys.path.insert(0, str(REPO_DIR))
+    sizes = [int(size) for size in args.sizes]
+    commit = _git_commit()
+    results = run(sizes, args.pattern, args.repeat)
+
+    output = args.output or str(BENCH_DIR / 'results' / f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'sizes': sizes,
+            'results': results
+        }, f, indent=2)
+    print(f'Results written to {output}')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Compressed sets of row numbers in the style of roaring bitmaps
+
+Row numbers are split into chunks of 65,536. Each chunk is stored in
+whichever container is smaller for it:
+
+- an array container: the sorted row numbers, for chunks with at most
+  4,096 rows in the set
+- a bitmap container: 1,024 64-bit words, one bit per row of the chunk
+
+Containers of the same kind are kept together in numpy arrays, so `&`,
+`|` and membership tests run chunk-parallel in numpy instead of looping
+over chunks. Intersections of dense sets are word-wise ANDs; results
+shrink back into array containers as they become sparse.
+"""
+import numpy as np
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+# Chunks with more rows than this use a bitmap container (8 KB, like 4,096 uint16s)
+ARRAY_MAX = 4096
+WORD = np.dtype('<u8')
+
+def _pack(masks):
+    """Bitmap containers from boolean rows of CHUNK_SIZE"""
+    return np.packbits(masks, axis=1, bitorder='little').view(WORD)
+
+def _unpack(keys, words):
+    """Sorted row numbers in bitmap containers"""
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.int64)
+    flat = words.ravel()
+    nonzero = np.flatnonzero(flat)
+    if len(nonzero) == 0:
+        return np.empty(0, dtype=np.int64)
+    if int(np.bitwise_count(flat[nonzero]).sum()) * 8 > flat.size * 64:
+        positions = np.flatnonzero(np.unpackbits(words.view(np.uint8), axis=1, bitorder='little'))
+        return keys[positions >> CHUNK_BITS] * CHUNK_SIZE + (positions & (CHUNK_SIZE - 1))
+
+    # Sparse words: peel off the lowest set bit of every word per round, which
+    # takes as many rounds as the fullest word has bits instead of one per bit
+    one = WORD.type(1)
+    per_chunk = CHUNK_SIZE // 64
+    bases = keys[nonzero // per_chunk] * CHUNK_SIZE + (nonzero % per_chunk) * 64
+    remaining = flat[nonzero]
+    found = []
+    while len(remaining):
+        lowest = remaining & (~remaining + one)
+        found.append(bases + np.bitwise_count(lowest - one))
+        remaining &= remaining - one
+        left = np.flatnonzero(remaining)
+        bases, remaining = bases[left], remaining[left]
+    return np.sort(np.concatenate(found))
+
+def _find(keys, chunks):
+    """Index of each chunk's container in sorted keys, and whether it exists"""
+    positions = np.minimum(np.searchsorted(keys, chunks), max(len(keys) - 1, 0))
+    found = keys[positions] == chunks if len(keys) else np.zeros(len(chunks), dtype=bool)
+    return positions, found
+
+class RowBitmap:
+    """
+    Set of row numbers with array and bitmap containers per 65,536-row chunk
+
+    Build one with `from_mask` or `from_rows`; combine with `&`, `|` and `-`.
+    """
+
+    def __init__(self, keys=None, words=None, rows=None):
+        # Sorted chunk numbers of the bitmap containers and their words
+        self.keys = keys if keys is not None else np.empty(0, dtype=np.int64)
+        self.words = words if words is not None else np.empty((0, CHUNK_SIZE // 64), dtype=WORD)
+        # The array containers, stored together as sorted row numbers
+        self.rows = rows if rows is not None else np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """Rows where a boolean array is True"""
+        mask = np.asarray(mask, dtype=bool)
+        n_chunks = -(-len(mask) // CHUNK_SIZE)
+        padded = np.zeros(n_chunks * CHUNK_SIZE, dtype=bool)
+        padded[:len(mask)] = mask
+        chunks = padded.reshape(n_chunks, CHUNK_SIZE)
+
+        dense = np.count_nonzero(chunks, axis=1) > ARRAY_MAX
+        keys = np.flatnonzero(dense)
+        sparse = chunks.copy()
+        sparse[dense] = False
+        return cls(keys, _pack(chunks[dense]), np.flatnonzero(sparse.ravel()))
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Set of sorted, distinct row numbers"""
+        return cls._normalized(rows=np.asarray(rows, dtype=np.int64))
+
+    @classmethod
+    def _normalized(cls, keys=None, words=None, rows=None):
+        """Move each chunk into the right container and drop empty ones"""
+        bitmap = cls(keys, words, rows)
+        counts = np.bitwise_count(bitmap.words).sum(axis=1)
+        demote = counts <= ARRAY_MAX
+        # Empty containers (e.g. from ANDing disjoint bitmaps) are dropped, not unpacked
+        unpack = demote & (counts > 0)
+
+        chunks, sizes = np.unique(bitmap.rows >> CHUNK_BITS, return_counts=True)
+        promote = sizes > ARRAY_MAX
+        if not demote.any() and not promote.any():
+            return bitmap
+
+        rows = bitmap.rows
+        if demote.any():
+            rows = np.sort(np.concatenate([rows, _unpack(bitmap.keys[unpack], bitmap.words[unpack])]))
+        keys, words = bitmap.keys[~demote], bitmap.words[~demote]
+
+        if promote.any():
+            promoted = np.isin(rows >> CHUNK_BITS, chunks[promote])
+            masks = np.zeros((int(promote.sum()), CHUNK_SIZE), dtype=bool)
+            moved = rows[promoted]
+            masks[np.searchsorted(chunks[promote], moved >> CHUNK_BITS), moved & (CHUNK_SIZE - 1)] = True
+            keys = np.concatenate([keys, chunks[promote]])
+            words = np.concatenate([words, _pack(masks)])
+            order = np.argsort(keys)
+            keys, words, rows = keys[order], words[order], rows[~promoted]
+        return cls(keys, words, rows)
+
+    def __len__(self):
+        return int(np.bitwise_count(self.words).sum()) + len(self.rows)
+
+    def contains(self, rows):
+        """Boolean array: which of `rows` are in the set"""
+        rows = np.asarray(rows, dtype=np.int64)
+        positions, dense = _find(self.keys, rows >> CHUNK_BITS)
+        offsets = rows & (CHUNK_SIZE - 1)
+        result = np.zeros(len(rows), dtype=bool)
+        if dense.any():
+            words = self.words[positions[dense], offsets[dense] >> 6]
+            result[dense] = (words >> (offsets[dense] & 63).astype(WORD)) & WORD.type(1) == 1
+        _, found = _find(self.rows, rows[~dense])
+        result[~dense] = found
+        return result
+
+    def to_rows(self):
+        """Sorted row numbers in the set"""
+        if len(self.keys) == 0:
+            return self.rows
+        return np.sort(np.concatenate([self.rows, _unpack(self.keys, self.words)]))
+
+    def __and__(self, other):
+        keys, mine, theirs = np.intersect1d(self.keys, other.keys, assume_unique=True, return_indices=True)
+        words = self.words[mine] & other.words[theirs]
+        # Array rows are looked up in the other set; those in chunks that are
+        # arrays on both sides come from this side only
+        _, in_my_bitmaps = _find(self.keys, other.rows >> CHUNK_BITS)
+        theirs_in_mine = other.rows[in_my_bitmaps]
+        rows = np.concatenate([
+            self.rows[other.contains(self.rows)],
+            theirs_in_mine[self.contains(theirs_in_mine)]
+        ])
+        return self._normalized(keys, words, np.sort(rows))
+
+    def __sub__(self, other):
+        """Rows in this set but not in `other`"""
+        words = self.words.copy()
+        positions, shared = _find(other.keys, self.keys)
+        words[shared] &= ~other.words[positions[shared]]
+        # Their array rows in chunks that are bitmaps here clear bits
+        positions, dense = _find(self.keys, other.rows >> CHUNK_BITS)
+        offsets = other.rows[dense] & (CHUNK_SIZE - 1)
+        np.bitwise_and.at(words, (positions[dense], offsets >> 6), ~(WORD.type(1) << (offsets & 63).astype(WORD)))
+        return self._normalized(self.keys, words, self.rows[~other.contains(self.rows)])
+
+    def __or__(self, other):
+        keys = np.union1d(self.keys, other.keys)
+        words = np.zeros((len(keys), CHUNK_SIZE // 64), dtype=WORD)
+        words[np.searchsorted(keys, self.keys)] |= self.words
+        words[np.searchsorted(keys, other.keys)] |= other.words
+
+        # Array rows in chunks that are bitmaps on either side become bits
+        rows = np.union1d(self.rows, other.rows)
+        positions, dense = _find(keys, rows >> CHUNK_BITS)
+        offsets = rows[dense] & (CHUNK_SIZE - 1)
+        np.bitwise_or.at(words, (positions[dense], offsets >> 6), WORD.type(1) << (offsets & 63).astype(WORD))
+        return self._normalized(keys, words, rows[~dense])
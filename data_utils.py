@@ -1,15 +1,493 @@
+import glob
+import os
+import threading
+
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.preprocessing import LabelEncoder
+import joblib
+
+from instrumentation import instrument
+from sketches import DatasetSketch
+
+MMAP_EXTENSIONS = ('.arrow', '.feather', '.ipc', '.npy')
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz', '.zip', '.zst', '.zstd')
+CSV_CHUNK_ROWS = 250_000
+# Formats whose readers release the GIL, so several files parse faster in threads
+PARALLEL_EXTENSIONS = ('.parquet',) + MMAP_EXTENSIONS
+
+@instrument()
+def load_data(filepath, sheet_name=0, workers=None, validator=None):
+    """
+    Load data from CSV, Parquet, Excel or a prepared Arrow/Feather/NumPy file
 
-def load_data(filepath):
-    """Load data from CSV or Excel file"""
+    Arrow IPC (.arrow, .feather, .ipc) and .npy files are memory-mapped: see
+    `load_mmap`. For workbooks, `sheet_name` selects the sheet by name or
+    position; see `read_excel_fast`. Compressed files (.csv.gz, .zip, .zst,
+    ...) are decompressed on the fly; see `read_compressed`.
+    
+    `filepath` may also be a list of paths, a glob such as 'exports/*.csv'
+    or a directory: the files are loaded in parallel and concatenated by
+    `load_files`, and ValueError is raised if their schemas differ.
+    
+    A `StreamingValidator` passed as `validator` sees the data as it is
+    parsed (chunk by chunk for CSV), so its report is ready when loading
+    returns without another pass over the data.
+    """
+    if not isinstance(filepath, str) or _is_multi_path(filepath):
+        df, errors, _ = load_files(expand_paths(filepath), workers=workers, validator=validator,
+                                   loader=lambda path, file_validator: load_data(path, sheet_name,
+                                                                                 validator=file_validator))
+        if errors:
+            raise ValueError("; ".join(errors))
+        return df
+    
+    if filepath.endswith(COMPRESSED_EXTENSIONS):
+        with open(filepath, 'rb') as f:
+            return read_compressed(f, filepath, sheet_name, validator=validator)
     if filepath.endswith('.csv'):
-        df = pd.read_csv(filepath)
+        if validator is not None:
+            return read_csv_chunked(filepath, validator=validator)
+        return pd.read_csv(filepath)
+    
+    if filepath.endswith('.parquet'):
+        df = pd.read_parquet(filepath)
+    elif filepath.endswith(MMAP_EXTENSIONS):
+        df = load_mmap(filepath)
     else:
-        df = pd.read_excel(filepath)
+        df = read_excel_fast(filepath, sheet_name)
+    if validator is not None:
+        validator.update(df)
     return df
 
+def _is_pattern(path):
+    """Glob characters in a path that isn't an existing file, e.g. 'sales [2024].csv' is a file"""
+    return any(char in path for char in '*?[') and not os.path.isfile(path)
+
+def _is_multi_path(filepath):
+    return _is_pattern(filepath) or os.path.isdir(filepath)
+
+def expand_paths(patterns):
+    """Files matching paths, globs or directories (every file inside), sorted and without duplicates"""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            matches = glob.glob(pattern) if _is_pattern(pattern) else [pattern]
+        paths.extend(sorted(path for path in matches if not os.path.isdir(path)))
+    return list(dict.fromkeys(paths))
+
+def check_schemas(frames, names):
+    """
+    Compare the columns of several frames meant to be concatenated
+    
+    Returns (errors, warnings): missing or extra columns relative to the
+    first frame are errors; a column that is numeric in some frames and not
+    in others is a warning, since concatenating makes it text.
+    """
+    errors = []
+    warnings = []
+    if not frames:
+        return errors, warnings
+    
+    reference = list(frames[0].columns)
+    for df, name in zip(frames[1:], names[1:]):
+        missing = [col for col in reference if col not in df.columns]
+        extra = [col for col in df.columns if col not in reference]
+        if missing or extra:
+            errors.append(
+                f"{name}: columns differ from {names[0]}"
+                + (f"; missing {missing}" if missing else "")
+                + (f"; unexpected {extra}" if extra else "")
+            )
+    
+    for col in reference:
+        kinds = {
+            pd.api.types.is_numeric_dtype(df[col])
+            for df in frames if col in df.columns and df[col].notna().any()
+        }
+        if len(kinds) > 1:
+            warnings.append(f"Column '{col}' is numeric in some files but not in others")
+    
+    return errors, warnings
+
+def load_files(sources, workers=None, loader=None, names=None, validator=None, sketch=None):
+    """
+    Load several files concurrently and concatenate them into one dataset
+    
+    Parameters:
+    - sources: paths, or any objects `loader` accepts (e.g. uploaded files)
+    - workers: number of threads; by default up to 8 for Parquet and
+      Arrow files, whose readers release the GIL, and 1 otherwise: the
+      pandas CSV and Excel parsers hold the GIL, so threads only add
+      contention (processes lose more pickling the frames back)
+    - loader: function `loader(source, validator)` parsing one source into
+      a DataFrame and feeding it to the validator (default: load_data)
+    - names: labels for messages (default: str of each source)
+    - validator: StreamingValidator shared by all files, so e.g. an invoice
+      id repeated in two files is reported; its messages are left to the
+      caller. By default each file gets its own and the messages are
+      returned prefixed with the file name.
+    - sketch: DatasetSketch receiving the merged sketches of the files
+      when each file gets its own validator
+    
+    Each file is validated while it is parsed and the files' columns are
+    compared with `check_schemas`. Returns (df, errors, warnings); df is
+    None when there are errors. Columns are ordered like the first file and
+    concatenation reuses the parsed buffers where the dtypes allow (Arrow
+    string columns are chained rather than copied).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    sources = list(sources)
+    loader = loader or (lambda source, file_validator: load_data(source, validator=file_validator))
+    names = names or [str(source) for source in sources]
+    if not sources:
+        return None, ["No files to load"], []
+    validators = [
+        validator or StreamingValidator(sketch=DatasetSketch() if sketch is not None else None)
+        for _ in sources
+    ]
+    
+    if workers is None:
+        parallel = all(name.lower().endswith(PARALLEL_EXTENSIONS) for name in names)
+        workers = min(8, len(sources), os.cpu_count() or 1) if parallel else 1
+    if workers > 1 and len(sources) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(loader, sources, validators))
+    else:
+        frames = [loader(source, file_validator) for source, file_validator in zip(sources, validators)]
+    
+    errors = []
+    warnings = []
+    if validator is None:
+        for file_validator, name in zip(validators, names):
+            if sketch is not None:
+                sketch.merge(file_validator.sketch)
+            file_errors, file_warnings = file_validator.report()
+            errors.extend(f"{name}: {message}" for message in file_errors)
+            warnings.extend(f"{name}: {message}" for message in file_warnings)
+    
+    schema_errors, schema_warnings = check_schemas(frames, names)
+    errors.extend(schema_errors)
+    warnings.extend(schema_warnings)
+    if errors:
+        return None, errors, warnings
+    
+    columns = list(frames[0].columns)
+    df = pd.concat([frame[columns] for frame in frames], ignore_index=True)
+    return df, errors, warnings
+
+def open_decompressed(source, name):
+    """
+    Stream the decompressed content of a compressed file object
+    
+    Returns (stream, inner_name): a file-like object yielding decompressed
+    bytes as it is read, and the name without the compression extension
+    (for .zip, the name of the first file in the archive). Files that aren't
+    compressed are returned as is. .zst needs the zstandard package.
+    """
+    lower = name.lower()
+    if lower.endswith('.gz'):
+        import gzip
+        return gzip.GzipFile(fileobj=source, mode='rb'), name[:-3]
+    if lower.endswith('.bz2'):
+        import bz2
+        return bz2.BZ2File(source, mode='rb'), name[:-4]
+    if lower.endswith('.xz'):
+        import lzma
+        return lzma.LZMAFile(source, mode='rb'), name[:-3]
+    if lower.endswith(('.zst', '.zstd')):
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError("Reading .zst files requires zstandard: pip install zstandard") from e
+        return zstandard.ZstdDecompressor().stream_reader(source), name.rsplit('.', 1)[0]
+    if lower.endswith('.zip'):
+        import zipfile
+        archive = zipfile.ZipFile(source)
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith('__MACOSX/')
+        ]
+        if not members:
+            raise ValueError(f"{name} contains no files")
+        return archive.open(members[0]), members[0].filename
+    return source, name
+
+def read_csv_chunked(source, chunk_rows=CSV_CHUNK_ROWS, validator=None, on_chunk=None):
+    """
+    Parse a CSV `chunk_rows` rows at a time and concatenate the chunks
+    
+    Each chunk is passed to `validator.update` as soon as it is parsed, and
+    then `on_chunk(rows_so_far, validator)` is called, e.g. to show progress
+    and the problems found so far before the whole file is parsed.
+    """
+    chunks = []
+    rows = 0
+    for chunk in pd.read_csv(source, chunksize=chunk_rows):
+        chunks.append(chunk)
+        rows += len(chunk)
+        if validator is not None:
+            validator.update(chunk)
+        if on_chunk is not None:
+            on_chunk(rows, validator)
+    
+    if not chunks:
+        df = pd.DataFrame()
+        if validator is not None:
+            validator.update(df)
+        return df
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+def read_compressed(source, name, sheet_name=0, chunk_rows=CSV_CHUNK_ROWS, validator=None, on_chunk=None):
+    """
+    Parse a compressed CSV or workbook without decompressing it up front
+    
+    CSV content is decompressed as the parser reads it and parsed
+    `chunk_rows` rows at a time with `read_csv_chunked`, so neither the
+    decompressed file nor the parser's buffers for the whole file are ever
+    held in memory. Workbooks need random access, so a compressed .xlsx is
+    decompressed into memory before parsing.
+    """
+    stream, inner_name = open_decompressed(source, name)
+    try:
+        if inner_name.lower().endswith(('.xlsx', '.xlsm', '.xls')):
+            import io
+            df = read_excel_fast(io.BytesIO(stream.read()), sheet_name)
+            if validator is not None:
+                validator.update(df)
+            return df
+        return read_csv_chunked(stream, chunk_rows, validator, on_chunk)
+    finally:
+        stream.close()
+
+def _has_calamine():
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def excel_sheet_names(source):
+    """Sheet names of a workbook given as a path or file-like object, without parsing the cells"""
+    if _has_calamine():
+        from python_calamine import CalamineWorkbook
+        if isinstance(source, str):
+            return CalamineWorkbook.from_path(source).sheet_names
+        source.seek(0)
+        return CalamineWorkbook.from_filelike(source).sheet_names
+    
+    import openpyxl
+    
+    if not isinstance(source, str):
+        source.seek(0)
+    workbook = openpyxl.load_workbook(source, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+def read_excel_fast(source, sheet_name=0):
+    """
+    Read one sheet of an Excel workbook as quickly as the installed engines allow
+
+    Uses the Rust calamine engine when python-calamine is installed (pandas
+    2.2+), otherwise streams rows with openpyxl in read-only mode instead of
+    building the full openpyxl object model. The first row is the header.
+    `sheet_name` is a sheet name or 0-based position.
+    """
+    if not isinstance(source, str):
+        source.seek(0)
+    
+    if _has_calamine():
+        from python_calamine import CalamineWorkbook
+        
+        if isinstance(source, str):
+            workbook = CalamineWorkbook.from_path(source)
+        else:
+            workbook = CalamineWorkbook.from_filelike(source)
+        if isinstance(sheet_name, int):
+            worksheet = workbook.get_sheet_by_index(sheet_name)
+        else:
+            worksheet = workbook.get_sheet_by_name(sheet_name)
+        rows = worksheet.to_python(skip_empty_area=False)
+    else:
+        import openpyxl
+        
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            if isinstance(sheet_name, int):
+                worksheet = workbook.worksheets[sheet_name]
+            else:
+                worksheet = workbook[sheet_name]
+            rows = list(worksheet.iter_rows(values_only=True))
+        finally:
+            workbook.close()
+    
+    header = rows[0] if rows else ()
+    columns = [f"Unnamed: {i}" if name in (None, '') else str(name) for i, name in enumerate(header)]
+    df = pd.DataFrame(rows[1:]).reindex(columns=range(len(columns)))
+    df.columns = columns
+    
+    # Empty cells come back as '' (calamine) or None (openpyxl); like pandas, treat both as missing
+    df = df.replace('', None).infer_objects()
+    
+    # Like pandas, drop trailing empty rows and trailing empty columns without a header
+    filled_rows = np.flatnonzero(df.notna().any(axis=1).to_numpy())
+    df = df.iloc[:filled_rows[-1] + 1 if len(filled_rows) else 0]
+    while len(df.columns) and str(df.columns[-1]).startswith('Unnamed: ') and df.iloc[:, -1].isna().all():
+        df = df.iloc[:, :-1]
+    
+    # calamine returns date and datetime objects where openpyxl and pandas give datetime64 columns
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) in ('date', 'datetime'):
+            df[col] = pd.to_datetime(df[col]).astype('datetime64[us]')
+    
+    # Excel stores every number as a float; restore integer columns like pandas does
+    if len(df):
+        for col in df.select_dtypes(include='float').columns:
+            values = df[col].to_numpy()
+            if not np.isnan(values).any() and np.array_equal(values, np.round(values)):
+                df[col] = values.astype(np.int64)
+    return df
+
+def load_mmap(filepath):
+    """
+    Open a prepared Arrow IPC/Feather or NumPy file through a memory map
+
+    Numeric columns without nulls and string columns (Arrow-backed in
+    pandas 3, the minimum version) are used in place, so opening is
+    near-instant whatever the file size, pages are read on first access,
+    and processes opening the same file share the OS page cache instead of
+    holding private copies. Those columns are read-only: in-place edits
+    raise, replacing a whole column works.
+    Compressed or multi-chunk Arrow files still work but are decompressed
+    or concatenated into memory; write files with `save_prepared`.
+
+    .npy files hold a structured array (one column per field) or a 1-D/2-D
+    numeric array (columns named "0", "1", ...).
+    """
+    if filepath.endswith('.npy'):
+        array = np.load(filepath, mmap_mode='r')
+        if array.dtype.names:
+            return pd.DataFrame({name: array[name] for name in array.dtype.names}, copy=False)
+        if array.ndim == 1:
+            array = array[:, None]
+        return pd.DataFrame(array, columns=[str(i) for i in range(array.shape[1])], copy=False)
+    
+    import pyarrow as pa
+    
+    table = pa.ipc.open_file(pa.memory_map(filepath, 'r')).read_all()
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        if (column.num_chunks == 1 and column.null_count == 0 and
+                (pa.types.is_integer(column.type) or pa.types.is_floating(column.type))):
+            columns[name] = column.chunk(0).to_numpy(zero_copy_only=True)
+        else:
+            columns[name] = column.to_pandas()
+    return pd.DataFrame(columns, copy=False)
+
+def save_prepared(df, filepath, sketch=None):
+    """
+    Write an uncompressed, single-chunk Arrow IPC file that `load_mmap` can map without copies
+    
+    The dataset's `DatasetSketch` (built here unless given) is saved next
+    to it, so opening the file never needs a pass over the data; see
+    `load_prepared_sketch`.
+    """
+    import pyarrow as pa
+    
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    with pa.OSFile(filepath, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=max(len(table), 1))
+    joblib.dump(sketch if sketch is not None else DatasetSketch().update(df), prepared_sketch_path(filepath))
+
+def prepared_sketch_path(filepath):
+    return f"{filepath}.sketch.joblib"
+
+def load_prepared_sketch(filepath):
+    """The sketch `save_prepared` wrote for a file, or None if missing or older than the file"""
+    path = prepared_sketch_path(filepath)
+    if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(filepath):
+        return None
+    return joblib.load(path)
+
+# Tried in order when a format can't be guessed from the first value
+DATE_FORMATS = [
+    '%m/%d/%Y', '%Y-%m-%d', '%d/%m/%Y', '%Y/%m/%d', '%m-%d-%Y', '%d-%m-%Y', '%d.%m.%Y',
+    '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d/%Y %H:%M:%S'
+]
+TIME_FORMATS = ['%H:%M', '%H:%M:%S', '%I:%M %p', '%I:%M:%S %p']
+
+def _guess_format(value):
+    try:
+        from pandas.tseries.api import guess_datetime_format
+    except ImportError:
+        from pandas._libs.tslibs.parsing import guess_datetime_format
+    return guess_datetime_format(value)
+
+def infer_date_format(values, candidates=DATE_FORMATS, sample_size=1000):
+    """
+    Explicit strptime format for date strings, or None if none fits
+
+    Like `pd.to_datetime`, the format is guessed from the first value; if
+    that fails, the first candidate parsing the whole sample is used.
+    """
+    sample = pd.Series(values[:sample_size], dtype=object).dropna().astype(str)
+    if sample.empty:
+        return None
+    
+    guessed = _guess_format(sample.iloc[0])
+    for date_format in ([guessed] if guessed else []) + list(candidates):
+        if pd.to_datetime(sample, format=date_format, errors='coerce').notna().all():
+            return date_format
+    return None
+
+def _parse_unique(values, date_format, candidates):
+    """Parse each distinct value once; returns datetime64 values aligned with `values`"""
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+    date_format = date_format or infer_date_format(uniques, candidates)
+    if date_format:
+        parsed = pd.to_datetime(uniques, format=date_format, errors='coerce')
+    else:
+        parsed = pd.to_datetime(uniques, errors='coerce')
+    # Code -1 (missing value) becomes NaT
+    return parsed.array.take(codes, allow_fill=True)
+
+def parse_dates(values, time_values=None, date_format=None):
+    """
+    Parse a date column, optionally combined with a separate time column
+    
+    Each distinct string is parsed once with an explicit format inferred from
+    the data, then mapped back to the rows, so a few hundred distinct dates
+    over millions of rows cost a few hundred parses. Unparseable values
+    become NaT, as with `pd.to_datetime(..., errors='coerce')`.
+    
+    Parameters:
+    - values: Series of date strings (datetime columns are returned as is)
+    - time_values: optional Series of times of day such as '13:08' added to the dates
+    - date_format: explicit format, skipping inference
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values) or not (
+            pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+        dates = pd.to_datetime(values, errors='coerce')
+    else:
+        dates = pd.Series(_parse_unique(values, date_format, DATE_FORMATS), index=values.index, name=values.name)
+    
+    if time_values is not None:
+        times = pd.Series(_parse_unique(pd.Series(time_values), None, TIME_FORMATS))
+        dates = dates + (times - times.dt.normalize()).array
+    return dates
+
+@instrument()
 def detect_columns(df):
     """Automatically detect important columns in the dataset"""
     date_col = None
@@ -43,56 +521,250 @@ def detect_columns(df):
     
     return date_col, target_col, product_col, external_cols
 
-def preprocess_dynamic(df, date_col, target_col, product_col, external_cols):
-    """Preprocess data dynamically based on detected columns"""
-    df = df.copy()
+class CategoricalEncoder:
+    """
+    Encode one categorical column for modelling
     
-    # Handle date columns
-    if date_col and date_col in df.columns:
-        try:
-            df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
-            df['Year'] = df[date_col].dt.year
-            df['Month'] = df[date_col].dt.month
-            df['DayOfWeek'] = df[date_col].dt.dayofweek
-            df['Quarter'] = df[date_col].dt.quarter
-        except:
-            pass
-    
-    # Handle categorical columns
-    label_encoders = {}
-    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
-    
-    for col in categorical_cols:
-        if col not in [target_col, date_col] and not col.lower().endswith('id'):
+    Strategies:
+    - 'ordinal': integer codes in a single dense column (-1 for unseen values)
+    - 'onehot': sparse CSR indicator matrix, one column per fitted category
+    - 'hash': sparse CSR matrix of `n_features` hashed buckets, suited to
+      high-cardinality columns since no category list is stored
+    
+    Values are factorized once and only the distinct values are looked up or
+    hashed, so wide catalogs are encoded without a per-row object scan.
+    """
+    
+    def __init__(self, strategy='ordinal', n_features=256):
+        if strategy not in ('ordinal', 'onehot', 'hash'):
+            raise ValueError(f"Unknown encoding strategy: {strategy}")
+        self.strategy = strategy
+        self.n_features = n_features
+        self.categories_ = None
+    
+    @property
+    def is_sparse(self):
+        return self.strategy != 'ordinal'
+    
+    def fit(self, values):
+        """Learn the category list (not needed for hashing)"""
+        if self.strategy != 'hash':
+            _, uniques = pd.factorize(values, sort=False)
+            self.categories_ = pd.Index(uniques)
+        return self
+    
+    def transform(self, values):
+        """Encode values; returns a 1-D code array or a CSR matrix"""
+        codes, uniques = pd.factorize(values, sort=False)
+        
+        if self.strategy == 'hash':
+            lookup = (pd.util.hash_array(np.asarray(uniques, dtype=object)) % np.uint64(self.n_features)).astype(np.int64)
+            n_columns = self.n_features
+        else:
+            # Map the distinct values onto the fitted categories
+            lookup = self.categories_.get_indexer(uniques)
+            n_columns = len(self.categories_)
+        
+        # Missing values (code -1) pick up the trailing -1
+        columns = np.append(lookup, -1)[codes]
+        if self.strategy == 'ordinal':
+            return columns
+        
+        valid = columns >= 0
+        rows = np.flatnonzero(valid)
+        data = np.ones(len(rows), dtype=np.float32)
+        return sparse.csr_matrix((data, (rows, columns[valid])), shape=(len(values), n_columns))
+    
+    def fit_transform(self, values):
+        return self.fit(values).transform(values)
+    
+    def feature_names(self, col):
+        """Output column names for this encoder"""
+        if self.strategy == 'ordinal':
+            return [col]
+        if self.strategy == 'hash':
+            return [f"{col}__hash_{i}" for i in range(self.n_features)]
+        return [f"{col}={value}" for value in self.categories_]
+
+def make_encoder(values, encoding='ordinal', max_onehot_categories=50, hash_features=256):
+    """Pick an encoder for a column; 'auto' one-hot encodes small columns and hashes large ones"""
+    if encoding == 'auto':
+        n_categories = values.nunique(dropna=True)
+        encoding = 'onehot' if n_categories <= max_onehot_categories else 'hash'
+    return CategoricalEncoder(encoding, n_features=hash_features)
+
+class PreprocessingPipeline:
+    """
+    Fitted preprocessing that keeps training and scoring consistent
+    
+    `fit` derives the schema once: the feature columns, the date parts and
+    one fitted `CategoricalEncoder` per categorical column. `transform` then
+    encodes any new batch against that cached state in a single pass, without
+    copying the input frame; unseen categories become -1 (ordinal) or
+    all-zero rows (one-hot), and missing columns are filled with 0.
+    Use `save`/`load` to reuse a fitted pipeline across runs.
+    """
+    
+    DATE_PARTS = ['Year', 'Month', 'DayOfWeek', 'Quarter']
+    
+    def __init__(self, date_col=None, target_col=None, product_col=None, external_cols=None,
+                 encoding='ordinal', max_onehot_categories=50, hash_features=256):
+        self.date_col = date_col
+        self.target_col = target_col
+        self.product_col = product_col
+        self.external_cols = list(external_cols or [])
+        self.encoding = encoding
+        self.max_onehot_categories = max_onehot_categories
+        self.hash_features = hash_features
+        self.encoders = {}
+        self.dense_cols = []
+        self.feature_cols = []
+    
+    @classmethod
+    def from_data(cls, df, **kwargs):
+        """Create a pipeline for the columns `detect_columns` finds in df"""
+        date_col, target_col, product_col, external_cols = detect_columns(df)
+        return cls(date_col, target_col, product_col, external_cols, **kwargs)
+    
+    def _is_candidate(self, col):
+        return col not in [self.target_col, self.date_col] and not col.lower().endswith('id')
+    
+    @instrument()
+    def fit(self, df, encoders=None):
+        """Derive the feature schema and fit the categorical encoders"""
+        self.encoders = {}
+        
+        if encoders is not None:
+            categorical_cols = [col for col in encoders if col in df.columns]
+        else:
+            categorical_cols = [col for col in df.select_dtypes(include=['object', 'str']).columns
+                                if self._is_candidate(col)]
+        
+        for col in categorical_cols:
             try:
-                # Use pandas factorize for simple encoding
-                df[col], unique_vals = pd.factorize(df[col])
-                label_encoders[col] = unique_vals
+                if encoders is not None:
+                    self.encoders[col] = encoders[col]
+                else:
+                    self.encoders[col] = make_encoder(
+                        df[col], self.encoding, self.max_onehot_categories, self.hash_features
+                    ).fit(df[col])
             except:
                 pass
+        
+        # Dense features keep the input column order, with date parts appended
+        self.dense_cols = []
+        for col in df.columns:
+            encoder = self.encoders.get(col)
+            if encoder is not None:
+                if not encoder.is_sparse:
+                    self.dense_cols.append(col)
+            elif self._is_candidate(col) and pd.api.types.is_numeric_dtype(df[col]):
+                self.dense_cols.append(col)
+        
+        if self.date_col and self.date_col in df.columns:
+            self.dense_cols.extend(part for part in self.DATE_PARTS if part not in self.dense_cols)
+        
+        self.feature_cols = list(self.dense_cols)
+        for col, encoder in self.encoders.items():
+            if encoder.is_sparse:
+                self.feature_cols.extend(encoder.feature_names(col))
+        
+        return self
     
-    # Select feature columns
-    feature_cols = []
-    for col in df.columns:
-        if (col != target_col and 
-            col != date_col and 
-            not col.lower().endswith('id') and
-            pd.api.types.is_numeric_dtype(df[col])):
-            feature_cols.append(col)
-    
-    # Handle missing values
-    df = df.fillna(0)
-    
-    # Prepare features and target
-    if feature_cols:
-        X = df[feature_cols]
-    else:
-        X = pd.DataFrame()
+    def _date_parts(self, df):
+        if not self.date_col or self.date_col not in df.columns:
+            return {}
+        dates = parse_dates(df[self.date_col])
+        return {
+            'Year': dates.dt.year,
+            'Month': dates.dt.month,
+            'DayOfWeek': dates.dt.dayofweek,
+            'Quarter': dates.dt.quarter
+        }
     
-    y = df[target_col] if target_col and target_col in df.columns else pd.Series()
+    @instrument()
+    def transform(self, df):
+        """Encode a batch with the fitted state; returns (X, y)"""
+        date_parts = self._date_parts(df)
+        
+        dense = {}
+        for col in self.dense_cols:
+            encoder = self.encoders.get(col)
+            if encoder is not None:
+                values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+                dense[col] = encoder.transform(values)
+            elif col in date_parts and col not in df.columns:
+                dense[col] = date_parts[col]
+            elif col in df.columns:
+                dense[col] = df[col]
+            else:
+                dense[col] = 0
+        
+        dense_df = pd.DataFrame(dense, index=df.index, columns=self.dense_cols).fillna(0)
+        
+        sparse_blocks = []
+        for col, encoder in self.encoders.items():
+            if encoder.is_sparse:
+                values = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+                sparse_blocks.append(encoder.transform(values))
+        
+        # Prepare features and target
+        if sparse_blocks:
+            blocks = [sparse.csr_matrix(dense_df.to_numpy(dtype=np.float64))] if self.dense_cols else []
+            X = sparse.hstack(blocks + sparse_blocks, format='csr')
+        elif self.dense_cols:
+            X = dense_df
+        else:
+            X = pd.DataFrame()
+        
+        if self.target_col and self.target_col in df.columns:
+            y = df[self.target_col].fillna(0)
+        else:
+            y = pd.Series()
+        
+        return X, y
     
-    return X, y, label_encoders, feature_cols
+    def fit_transform(self, df, encoders=None):
+        return self.fit(df, encoders=encoders).transform(df)
+    
+    def save(self, filepath):
+        """Save fitted pipeline"""
+        joblib.dump(self, filepath)
+    
+    @staticmethod
+    def load(filepath):
+        """Load saved pipeline"""
+        return joblib.load(filepath)
 
+@instrument()
+def preprocess_dynamic(df, date_col, target_col, product_col, external_cols,
+                       encoding='ordinal', max_onehot_categories=50, hash_features=256,
+                       encoders=None):
+    """
+    Preprocess data dynamically based on detected columns
+    
+    Parameters:
+    - encoding: categorical encoding ('ordinal', 'onehot', 'hash' or 'auto')
+    - max_onehot_categories: cardinality above which 'auto' switches to hashing
+    - hash_features: number of hashed buckets per hashed column
+    - encoders: fitted encoders from a previous call, reused as-is so new
+      data is encoded consistently at predict time
+    
+    With ordinal encoding X is a DataFrame; when any column is one-hot or
+    hashed, X is a scipy CSR matrix whose columns are named by feature_cols.
+    For repeated scoring, fit a `PreprocessingPipeline` once instead.
+    """
+    pipeline = PreprocessingPipeline(
+        date_col, target_col, product_col, external_cols,
+        encoding=encoding,
+        max_onehot_categories=max_onehot_categories,
+        hash_features=hash_features
+    )
+    X, y = pipeline.fit_transform(df, encoders=encoders)
+    
+    return X, y, pipeline.encoders, pipeline.feature_cols
+
+@instrument()
 def prepare_forecast_data(df, target_col, periods=30):
     """Prepare data for forecasting"""
     if target_col not in df.columns:
@@ -108,29 +780,201 @@ def prepare_forecast_data(df, target_col, periods=30):
     
     return y
 
-def validate_data(df):
-    """Validate uploaded data"""
-    errors = []
-    warnings = []
+@instrument()
+def pivot_series(df, group_cols, date_col, target_col, freq='D', time_col=None):
+    """
+    Build one time series per group as a 2-D table
     
-    # Check if dataframe is empty
-    if df.empty:
-        errors.append("The uploaded file is empty")
-        return errors, warnings
+    Returns a DataFrame indexed by the group keys with one column per
+    `freq` period; periods without sales are filled with 0. With `time_col`,
+    times of day are combined with the dates, for sub-daily frequencies.
+    """
+    dates = parse_dates(df[date_col], df[time_col] if time_col else None)
+    valid = dates.notna()
+    periods = dates[valid].dt.to_period(freq).dt.to_timestamp()
     
-    # Check minimum rows
-    if len(df) < 10:
-        warnings.append("Dataset has fewer than 10 rows. Results may be unreliable.")
+    keys = [df.loc[valid, col] for col in group_cols] + [periods.rename(date_col)]
+    totals = df.loc[valid, target_col].groupby(keys, observed=True, sort=True).sum()
     
-    # Check for numeric columns
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    if len(numeric_cols) == 0:
-        errors.append("No numeric columns found in the data")
+    table = totals.unstack(date_col, fill_value=0)
     
-    # Check for missing values
-    missing_pct = (df.isnull().sum() / len(df)) * 100
-    high_missing = missing_pct[missing_pct > 50]
-    if len(high_missing) > 0:
-        warnings.append(f"Columns with >50% missing values: {list(high_missing.index)}")
+    if len(table.columns) > 0:
+        full_range = pd.period_range(table.columns.min(), table.columns.max(), freq=freq).to_timestamp()
+        table = table.reindex(columns=full_range, fill_value=0)
     
-    return errors, warnings
+    return table
+
+# Numeric columns whose names contain these must not be negative
+NON_NEGATIVE_KEYWORDS = ['quantity', 'price', 'total', 'sales', 'revenue', 'amount', 'cogs', 'income', 'tax']
+ID_KEYWORDS = ['invoice', 'transaction id', 'order id']
+
+class StreamingValidator:
+    """
+    Validate data chunk by chunk while it is being parsed
+    
+    Feed every parsed chunk to `update`; `report` returns (errors, warnings)
+    for everything seen so far, so problems can be shown before the parse
+    finishes, and no second pass over the data is needed.
+    
+    Parameters:
+    - id_col: column whose values must be unique; by default the first
+      column named like an invoice, transaction or order id
+    - ranges: {column: (minimum, maximum)} allowed values, either bound may
+      be None; numeric columns named like quantities, prices or totals
+      default to (0, None)
+    - sample_size: values of each text column checked for numbers mixed
+      with text
+    - sketch: optional DatasetSketch updated with every chunk, so distinct
+      counts and quantiles are built in the same pass
+    """
+    
+    def __init__(self, id_col=None, ranges=None, sample_size=1000, sketch=None):
+        self.id_col = id_col
+        self.ranges = dict(ranges or {})
+        self.sample_size = sample_size
+        self.sketch = sketch
+        self.rows = 0
+        self.columns = []
+        self.null_counts = {}
+        self.kinds = {}
+        # {column: (values that aren't numbers, values sampled)}
+        self.mixed_samples = {}
+        self.out_of_range = {}
+        self.duplicate_ids = 0
+        self._seen_runs = []
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _kind(values):
+        if pd.api.types.is_bool_dtype(values):
+            return 'boolean'
+        if pd.api.types.is_numeric_dtype(values):
+            return 'numeric'
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return 'datetime'
+        return 'text'
+    
+    def _init_columns(self, chunk):
+        self.columns = list(chunk.columns)
+        if self.id_col is None:
+            self.id_col = next(
+                (col for col in self.columns if any(keyword in str(col).lower() for keyword in ID_KEYWORDS)),
+                None
+            )
+        for col in self.columns:
+            if (col not in self.ranges and pd.api.types.is_numeric_dtype(chunk[col]) and
+                    any(keyword in str(col).lower() for keyword in NON_NEGATIVE_KEYWORDS)):
+                self.ranges[col] = (0, None)
+    
+    def update(self, chunk):
+        """Account for one parsed chunk; returns self"""
+        with self._lock:
+            if not self.columns:
+                self._init_columns(chunk)
+            self.rows += len(chunk)
+            
+            for col, count in chunk.isna().sum().items():
+                self.null_counts[col] = self.null_counts.get(col, 0) + int(count)
+            
+            for col in chunk.columns:
+                values = chunk[col]
+                if len(values) == 0 or values.isna().all():
+                    continue
+                kind = self._kind(values)
+                self.kinds.setdefault(col, set()).add(kind)
+                
+                # Mostly numeric text usually means a few malformed numbers
+                if kind == 'text' and col not in self.mixed_samples:
+                    sample = values.dropna().head(self.sample_size)
+                    numeric = pd.to_numeric(sample, errors='coerce').notna().sum()
+                    if numeric >= 0.9 * len(sample) and numeric < len(sample):
+                        self.mixed_samples[col] = (len(sample) - numeric, len(sample))
+            
+            for col, (minimum, maximum) in self.ranges.items():
+                if col not in chunk.columns or not pd.api.types.is_numeric_dtype(chunk[col]):
+                    continue
+                values = chunk[col].to_numpy()
+                bad = np.zeros(len(values), dtype=bool)
+                if minimum is not None:
+                    bad |= values < minimum
+                if maximum is not None:
+                    bad |= values > maximum
+                self.out_of_range[col] = self.out_of_range.get(col, 0) + int(bad.sum())
+            
+            if self.id_col is not None and self.id_col in chunk.columns:
+                self._check_ids(chunk[self.id_col].dropna())
+            
+            if self.sketch is not None:
+                self.sketch.update(chunk)
+        return self
+    
+    def _check_ids(self, ids):
+        # 64-bit hashes of the ids, kept sorted: 8 bytes per distinct id and
+        # exact up to hash collisions (about one in 10^11 pairs of ids)
+        hashes = np.sort(pd.util.hash_pandas_object(ids, index=False).to_numpy())
+        repeated = np.zeros(len(hashes), dtype=bool)
+        repeated[1:] = hashes[1:] == hashes[:-1]
+        for run in self._seen_runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            repeated |= run[positions] == hashes
+        self.duplicate_ids += int(repeated.sum())
+        
+        # The seen hashes are sorted runs, each at least as large as the next;
+        # a new run is merged into the smaller ones before it, so every hash is
+        # merged O(log n) times instead of re-sorting all of them per chunk.
+        # Merging two sorted runs is linear with the stable (tim)sort
+        run = hashes[~repeated]
+        if len(run) == 0:
+            return
+        while self._seen_runs and len(self._seen_runs[-1]) <= len(run):
+            run = np.concatenate([self._seen_runs.pop(), run])
+            run.sort(kind='stable')
+        self._seen_runs.append(run)
+    
+    def report(self):
+        """(errors, warnings) for all data seen so far, in the style of validate_data"""
+        errors = []
+        warnings = []
+        
+        with self._lock:
+            if self.rows == 0 or not self.columns:
+                errors.append("The uploaded file is empty")
+                return errors, warnings
+            
+            if self.rows < 10:
+                warnings.append("Dataset has fewer than 10 rows. Results may be unreliable.")
+            
+            if not any(self.kinds.get(col) == {'numeric'} for col in self.columns):
+                errors.append("No numeric columns found in the data")
+            
+            high_missing = [col for col in self.columns if self.null_counts.get(col, 0) / self.rows > 0.5]
+            if high_missing:
+                warnings.append(f"Columns with >50% missing values: {high_missing}")
+            
+            for col in self.columns:
+                kinds = self.kinds.get(col, set())
+                if len(kinds) > 1:
+                    warnings.append(f"Column '{col}' has conflicting types across the file: {sorted(kinds)}")
+                elif col in self.mixed_samples:
+                    bad, sampled = self.mixed_samples[col]
+                    warnings.append(
+                        f"Column '{col}' looks numeric but {bad} of {sampled} sampled values are not numbers"
+                    )
+            
+            for col, count in self.out_of_range.items():
+                if count:
+                    minimum, maximum = self.ranges[col]
+                    if maximum is None:
+                        warnings.append(f"Column '{col}' has {count:,} values below {minimum}")
+                    else:
+                        warnings.append(f"Column '{col}' has {count:,} values outside [{minimum}, {maximum}]")
+            
+            if self.duplicate_ids:
+                warnings.append(f"{self.duplicate_ids:,} duplicate values in '{self.id_col}'")
+        
+        return errors, warnings
+
+@instrument()
+def validate_data(df):
+    """Validate uploaded data"""
+    return StreamingValidator().update(df).report()
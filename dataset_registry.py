@@ -0,0 +1,133 @@
+"""
+Server-wide registry of uploaded datasets
+
+Every Streamlit session used to keep its own parsed copy of an upload, so
+thirty analysts opening the same export held thirty copies. The registry
+keys parsed DataFrames by a hash of the uploaded bytes: the first upload
+parses and stores the data, identical uploads from any session reuse it,
+and each session gets a shallow view that shares the column data.
+Memory grows with the number of distinct datasets, not sessions.
+
+Views must be treated as read-only. Adding or replacing columns only
+changes the session's own view, and with the copy-on-write semantics of
+pandas 3 (the minimum version) in-place edits are private too.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+def content_id(data):
+    """Stable id of a dataset's raw bytes"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+class DatasetRegistry:
+    """
+    Content-addressed store of parsed DataFrames shared by all sessions
+
+    Parameters:
+    - max_bytes: approximate memory budget; least recently used datasets
+      beyond it are dropped from the registry (sessions still holding a view
+      keep working, the memory is freed when they let go)
+    """
+
+    def __init__(self, max_bytes=4 * 2**30):
+        self.max_bytes = max_bytes
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.stats = {'hits': 0, 'loads': 0, 'evictions': 0}
+
+    def get_or_load(self, data, loader, name=None, variant=None):
+        """
+        Return (dataset_id, DataFrame view) for raw bytes, parsing them once
+
+        `loader` is called without arguments to parse the data when no session
+        has registered the same bytes before. It returns the DataFrame, or a
+        (DataFrame, metadata dict) pair to keep e.g. a validation report
+        with the dataset; see `metadata`. Concurrent uploads of the same
+        bytes wait for a single parse. `variant` distinguishes different
+        parses of the same bytes, e.g. two sheets of one workbook.
+        """
+        dataset_id = content_id(data)
+        if variant is not None:
+            dataset_id = f"{dataset_id}:{variant}"
+
+        while True:
+            with self._lock:
+                entry = self._datasets.get(dataset_id)
+                if entry is not None:
+                    self._datasets.move_to_end(dataset_id)
+                    entry['last_used'] = time.time()
+                    self.stats['hits'] += 1
+                    return dataset_id, entry['df'].copy(deep=False)
+
+                pending = self._loading.get(dataset_id)
+                if pending is None:
+                    pending = self._loading[dataset_id] = threading.Event()
+                    break
+            pending.wait()
+
+        try:
+            df = loader()
+            metadata = None
+            if isinstance(df, tuple):
+                df, metadata = df
+            self.add(dataset_id, df, name, metadata)
+        finally:
+            with self._lock:
+                self._loading.pop(dataset_id).set()
+        return dataset_id, df.copy(deep=False)
+
+    def add(self, dataset_id, df, name=None, metadata=None):
+        """Register a parsed DataFrame under an id"""
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            self._datasets[dataset_id] = {
+                'df': df,
+                'metadata': metadata or {},
+                'name': name,
+                'rows': len(df),
+                'bytes': size,
+                'created': time.time(),
+                'last_used': time.time()
+            }
+            self._datasets.move_to_end(dataset_id)
+            self.stats['loads'] += 1
+            self._evict()
+
+    def get(self, dataset_id):
+        """A view of a registered dataset, or None if unknown or evicted"""
+        with self._lock:
+            entry = self._datasets.get(dataset_id)
+            if entry is None:
+                return None
+            self._datasets.move_to_end(dataset_id)
+            entry['last_used'] = time.time()
+            return entry['df'].copy(deep=False)
+
+    def metadata(self, dataset_id):
+        """Metadata registered with a dataset (shared by all sessions, don't modify), {} if unknown"""
+        with self._lock:
+            entry = self._datasets.get(dataset_id)
+            return entry['metadata'] if entry is not None else {}
+
+    def _evict(self):
+        total = sum(entry['bytes'] for entry in self._datasets.values())
+        # Always keep the most recent dataset, even if it alone exceeds the budget
+        while total > self.max_bytes and len(self._datasets) > 1:
+            _, entry = self._datasets.popitem(last=False)
+            total -= entry['bytes']
+            self.stats['evictions'] += 1
+
+    def summary(self):
+        """One dict per registered dataset, most recently used last"""
+        with self._lock:
+            return [
+                {key: value for key, value in entry.items() if key not in ('df', 'metadata')} | {'id': dataset_id}
+                for dataset_id, entry in self._datasets.items()
+            ]
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry['bytes'] for entry in self._datasets.values())
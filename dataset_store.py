@@ -0,0 +1,521 @@
+"""
+Append-only Parquet dataset store with incrementally maintained aggregates
+
+A store is a directory holding the transactions as Parquet part files,
+the aggregates the dashboard needs and a DatasetSketch:
+
+    store/
+        manifest.json        columns, detected date/sales/product columns, parts
+        data/year=2019/month=01/part-00001.parquet ...
+        aggregates-00001.parquet  sum, sum of squares and counts per day and product
+        sketch-00001.joblib       distinct counts and quantiles (see sketches.py)
+
+`append` writes the new rows as one more part file and folds their
+aggregates and sketch into the stored ones, so a daily refresh costs time
+proportional to the new rows; history is never re-read. Appends from one
+process are serialized; the store doesn't support concurrent writers in
+several processes. Readers in other processes (the app while a cron job
+appends) pick up new versions with `refresh`; the aggregates and sketch of
+the last few versions are kept for readers that haven't refreshed yet.
+
+Rows are partitioned by the year and month of their date (and optionally
+by columns such as Branch), and the manifest records each part's first
+and last day. `read(start=..., end=...)` only opens the parts overlapping
+the window, so the last 90 days of a 10-year history read about 3% of it.
+
+    python dataset_store.py append sales_store today.csv --partition-by Branch
+    python dataset_store.py info sales_store
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data_utils import (
+    load_data, detect_columns, check_schemas, parse_dates, StreamingValidator
+)
+from dataset_registry import content_id
+from sketches import DatasetSketch
+
+MANIFEST = 'manifest.json'
+# Aggregates and sketches of the latest versions kept, so that readers holding
+# a slightly older manifest (e.g. the app while a cron job appends) can still open theirs
+KEPT_VERSIONS = 3
+
+def _write_atomic(filepath, write):
+    tmp_path = f"{filepath}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, filepath)
+
+def aggregate(df, date_col, target_col, product_col, days=None):
+    """
+    Sum, sum of squares and counts of the target per day and product
+
+    Rows with unparseable dates or no product are kept under a missing key,
+    so totals over the aggregates match totals over the rows. `days` are
+    the rows' parsed dates normalized to midnight, if already known.
+    Aggregates of separate batches are combined with `combine_aggregates`.
+    """
+    keys = {}
+    if date_col:
+        keys['day'] = days if days is not None else parse_dates(df[date_col]).dt.normalize()
+    if product_col:
+        keys['product'] = df[product_col]
+    values = df[target_col] if target_col else pd.Series(np.nan, index=df.index)
+
+    parts = pd.DataFrame({
+        **keys,
+        'rows': 1,
+        'count': values.notna().astype(np.int64),
+        'sum': values.fillna(0),
+        'sum_squares': values.fillna(0) ** 2
+    })
+    if not keys:
+        return parts[['rows', 'count', 'sum', 'sum_squares']].sum().to_frame().T
+    return parts.groupby(list(keys), dropna=False, sort=False).sum().reset_index()
+
+def combine_aggregates(aggregates):
+    """Merge aggregate tables of separate batches into one"""
+    aggregates = [table for table in aggregates if table is not None and len(table)]
+    if not aggregates:
+        return None
+    combined = pd.concat(aggregates, ignore_index=True)
+    keys = [col for col in ('day', 'product') if col in combined.columns]
+    if not keys:
+        return combined.sum().to_frame().T
+    return combined.groupby(keys, dropna=False, sort=True).sum().reset_index()
+
+class DatasetStore:
+    """
+    A directory of Parquet parts plus aggregates and a sketch kept up to date by `append`
+
+    Parameters:
+    - root: the store's directory; created on the first append
+    - date_col, target_col, product_col: columns the aggregates are keyed
+      on; detected from the first batch with `detect_columns` when omitted
+    - partition_cols: columns to partition by below year and month, e.g.
+      ['Branch']; only used when the store is created
+    """
+
+    def __init__(self, root, date_col=None, target_col=None, product_col=None, partition_cols=None):
+        self.root = root
+        self._lock = threading.RLock()
+        self._manifest_stamp = None
+        self.manifest = self._read_manifest() or {
+            'columns': None,
+            'dtypes': None,
+            'date_col': date_col,
+            'target_col': target_col,
+            'product_col': product_col,
+            'partition_cols': list(partition_cols or []),
+            'rows': 0,
+            'version': 0,
+            'parts': []
+        }
+
+    def _path(self, *names):
+        return os.path.join(self.root, *names)
+
+    def _read_manifest(self):
+        try:
+            with open(self._path(MANIFEST)) as f:
+                stat = os.fstat(f.fileno())
+                self._manifest_stamp = (stat.st_ino, stat.st_mtime_ns)
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """Re-read the manifest if another process appended since it was read; returns self"""
+        try:
+            stat = os.stat(self._path(MANIFEST))
+        except FileNotFoundError:
+            return self
+        if (stat.st_ino, stat.st_mtime_ns) != self._manifest_stamp:
+            with self._lock:
+                manifest = self._read_manifest()
+                if manifest is not None and manifest['version'] >= self.version:
+                    self.manifest = manifest
+        return self
+
+    @property
+    def rows(self):
+        return self.manifest['rows']
+
+    @property
+    def version(self):
+        """Increases with every append; use it to cache reads"""
+        return self.manifest['version']
+
+    def has_batch(self, batch_id):
+        return any(part.get('batch_id') == batch_id for part in self.manifest['parts'])
+
+    def append(self, df, batch_id=None):
+        """
+        Add rows and update the aggregates and sketch with them
+
+        `batch_id` (e.g. the content id of an uploaded file) makes appends
+        idempotent: a batch already in the store is skipped. Raises
+        ValueError if the columns differ from the store's. Returns the
+        number of rows added.
+        """
+        self.refresh()
+        with self._lock:
+            if batch_id is not None and self.has_batch(batch_id):
+                return 0
+            if len(df) == 0:
+                return 0
+
+            manifest = dict(self.manifest)
+            if manifest['columns'] is None:
+                date_col, target_col, product_col, _ = detect_columns(df)
+                manifest['columns'] = [str(col) for col in df.columns]
+                manifest['date_col'] = manifest['date_col'] or date_col
+                manifest['target_col'] = manifest['target_col'] or target_col
+                manifest['product_col'] = manifest['product_col'] or product_col
+                manifest['dtypes'] = {str(col): str(dtype) for col, dtype in df.dtypes.items()}
+            else:
+                errors, _ = check_schemas([pd.DataFrame(columns=manifest['columns']), df], ['the store', 'new data'])
+                if errors:
+                    raise ValueError("; ".join(errors))
+                df = self._conform(df[manifest['columns']], manifest['dtypes'])
+
+            # Everything is written under new names and the manifest is
+            # replaced last: a crash leaves unreferenced files, never a
+            # manifest whose aggregates count rows it doesn't list
+            version = manifest['version'] + 1
+            days = parse_dates(df[manifest['date_col']]).dt.normalize() if manifest['date_col'] else None
+            parts = self._write_parts(df, days, manifest, version, batch_id)
+
+            new_aggregates = aggregate(df, manifest['date_col'], manifest['target_col'], manifest['product_col'], days)
+            aggregates = combine_aggregates([self.aggregates(), new_aggregates])
+            aggregates.to_parquet(self._path(f"aggregates-{version:05d}.parquet"), index=False)
+
+            sketch = self.sketch() or DatasetSketch()
+            sketch.merge(DatasetSketch().update(df))
+            joblib.dump(sketch, self._path(f"sketch-{version:05d}.joblib"))
+
+            manifest['parts'] = manifest['parts'] + parts
+            manifest['rows'] += len(df)
+            manifest['version'] = version
+
+            def write_manifest(path):
+                with open(path, 'w') as f:
+                    json.dump(manifest, f, indent=2)
+            _write_atomic(self._path(MANIFEST), write_manifest)
+            self.manifest = manifest
+
+            expired = version - KEPT_VERSIONS
+            if expired > 0:
+                for name in (f"aggregates-{expired:05d}.parquet", f"sketch-{expired:05d}.joblib"):
+                    try:
+                        os.remove(self._path(name))
+                    except FileNotFoundError:
+                        pass
+            return len(df)
+
+    def _write_parts(self, df, days, manifest, version, batch_id):
+        """Write one file per year, month and partition value; returns their manifest entries"""
+        if days is None:
+            groups = [((), df, None)]
+        else:
+            keys = [days.dt.year.rename('year'), days.dt.month.rename('month')]
+            keys += [df[col] for col in manifest.get('partition_cols', [])]
+            grouped = df.groupby(keys, dropna=False, sort=True)
+            # One reordering of the rows, then every partition is a slice of it
+            codes = grouped.ngroup().to_numpy()
+            order = np.argsort(codes, kind='stable')
+            ordered, ordered_days = df.take(order), days.take(order)
+            bounds = np.searchsorted(codes[order], np.arange(grouped.ngroups + 1))
+            groups = [
+                (key, ordered.iloc[bounds[i]:bounds[i + 1]], ordered_days.iloc[bounds[i]:bounds[i + 1]])
+                for i, key in enumerate(grouped.groups)
+            ]
+
+        parts = []
+        for key, rows, row_days in groups:
+            directory = []
+            if days is not None:
+                year, month, *values = key
+                # Rows without a parseable date go to year=unknown/month=unknown
+                directory = [f"year={int(year)}", f"month={int(month):02d}"] if pd.notna(year) else ['year=unknown', 'month=unknown']
+                directory += [
+                    f"{quote(str(col), safe='')}={quote(str(value), safe='')}"
+                    for col, value in zip(manifest.get('partition_cols', []), values)
+                ]
+            os.makedirs(self._path('data', *directory), exist_ok=True)
+            file = '/'.join(directory + [f"part-{version:05d}.parquet"])
+            rows.to_parquet(self._path('data', file), index=False)
+
+            part = {'file': file, 'rows': len(rows), 'batch_id': batch_id}
+            if row_days is not None and row_days.notna().any():
+                part['first_day'] = row_days.min().strftime('%Y-%m-%d')
+                part['last_day'] = row_days.max().strftime('%Y-%m-%d')
+            if days is not None:
+                part['partition'] = {
+                    str(col): (None if pd.isna(value) else str(value))
+                    for col, value in zip(manifest.get('partition_cols', []), values)
+                }
+            parts.append(part)
+        return parts
+
+    @staticmethod
+    def _conform(df, dtypes):
+        """Cast new rows to the store's column types where they differ"""
+        for col in df.columns:
+            dtype = dtypes.get(str(col))
+            if dtype is not None and str(df[col].dtype) != dtype:
+                try:
+                    df = df.assign(**{col: df[col].astype(dtype)})
+                except (TypeError, ValueError) as e:
+                    raise ValueError(f"Column '{col}' can't be stored as {dtype}: {e}") from e
+        return df
+
+    def date_range(self, batch_id=None):
+        """(first day, last day) of the stored rows, or of one batch of them, as Timestamps, or None"""
+        days = [
+            (part['first_day'], part['last_day']) for part in self.manifest['parts']
+            if 'first_day' in part and (batch_id is None or part.get('batch_id') == batch_id)
+        ]
+        if not days:
+            return None
+        return pd.Timestamp(min(first for first, _ in days)), pd.Timestamp(max(last for _, last in days))
+
+    def plan(self, start=None, end=None, where=None):
+        """
+        Parts a read of the window [start, end] (whole days) has to open
+
+        Parts are pruned on their first and last day and, with `where`
+        ({partition column: allowed values}), on their partition values.
+        Without a window every part qualifies, including rows whose date
+        couldn't be parsed. Parts written before the store was partitioned
+        have no day range and are always read.
+        """
+        if not self.manifest['date_col']:
+            start = end = None
+        start = pd.Timestamp(start).normalize() if start is not None else None
+        end = pd.Timestamp(end).normalize() if end is not None else None
+        where = {str(col): {str(value) for value in values} for col, values in (where or {}).items()}
+
+        selected = []
+        for part in self.manifest['parts']:
+            if (start is not None or end is not None) and 'first_day' not in part:
+                # Rows without a date can't be in a window; unpartitioned parts might
+                if 'partition' in part:
+                    continue
+            elif start is not None or end is not None:
+                if start is not None and pd.Timestamp(part['last_day']) < start:
+                    continue
+                if end is not None and pd.Timestamp(part['first_day']) > end:
+                    continue
+            partition = part.get('partition', {})
+            if any(col in partition and partition[col] not in values for col, values in where.items()):
+                continue
+            selected.append(part)
+        return selected
+
+    def read(self, columns=None, start=None, end=None, where=None):
+        """
+        Rows as one DataFrame (empty if nothing matches or was appended yet)
+
+        `start` and `end` restrict the rows to a window of whole days and
+        `where` to values of partition columns; only the parts that can hold
+        matching rows are read, see `plan`.
+        """
+        parts = self.plan(start, end, where)
+        if not parts:
+            return pd.DataFrame(columns=columns or self.manifest['columns'] or [])
+
+        date_col = self.manifest['date_col']
+        if not date_col:
+            start = end = None
+        # Unpartitioned parts need their rows filtered on the partition columns too
+        where = {
+            col: values for col, values in (where or {}).items()
+            if any(col not in part.get('partition', {}) for part in parts)
+        }
+        read_columns = columns
+        if columns is not None:
+            needed = ([date_col] if start is not None or end is not None else []) + list(where)
+            read_columns = list(dict.fromkeys(list(columns) + needed))
+        # Columns are stored in the files; don't let pyarrow add them again from the key=value paths
+        df = pd.read_parquet([self._path('data', part['file']) for part in parts], columns=read_columns,
+                             partitioning=None)
+
+        # Without a window every row is returned, dated or not. Parts entirely
+        # inside a window need no row filter; boundary parts do
+        windowed = start is not None or end is not None
+        start = pd.Timestamp(start).normalize() if start is not None else None
+        end = pd.Timestamp(end).normalize() if end is not None else None
+        inside = all(
+            'first_day' in part and
+            (start is None or pd.Timestamp(part['first_day']) >= start) and
+            (end is None or pd.Timestamp(part['last_day']) <= end)
+            for part in parts
+        )
+        if windowed and not inside:
+            days = parse_dates(df[date_col]).dt.normalize()
+            mask = days.notna()
+            if start is not None:
+                mask &= days >= start
+            if end is not None:
+                mask &= days <= end
+            df = df[mask.to_numpy()].reset_index(drop=True)
+        for col, values in where.items():
+            df = df[df[col].astype(str).isin([str(value) for value in values]).to_numpy()].reset_index(drop=True)
+        return df[columns] if columns is not None else df
+
+    def _load_version_file(self, name, load):
+        """Load this version's aggregates or sketch; if appends elsewhere expired it, load the latest"""
+        try:
+            return load(self._path(name.format(version=self.version)))
+        except FileNotFoundError:
+            self.refresh()
+            return load(self._path(name.format(version=self.version)))
+
+    def aggregates(self):
+        """Per day and product sums and counts, or None for an empty store"""
+        if not self.manifest['parts']:
+            return None
+        return self._load_version_file("aggregates-{version:05d}.parquet", pd.read_parquet)
+
+    def sketch(self):
+        """DatasetSketch of all rows, or None for an empty store"""
+        if not self.manifest['parts']:
+            return None
+        return self._load_version_file("sketch-{version:05d}.joblib", joblib.load)
+
+    def backend(self, start=None, end=None):
+        """Analytics backend answering from the stored aggregates, optionally of a window; see StoreBackend"""
+        return StoreBackend(self, start, end)
+
+class StoreBackend:
+    """
+    Analytics backend (same methods as analytics.PandasBackend) on a store's aggregates
+
+    Questions about the store's own date, sales and product columns are
+    answered from the aggregates, which have one row per day and product
+    rather than per transaction. Anything else reads the rows (of the window
+    [start, end] only, when given) and uses the regular backend.
+    """
+
+    name = 'store'
+
+    def __init__(self, store, start=None, end=None):
+        self.store = store
+        self.manifest = store.manifest
+        self.start = start
+        self.end = end
+        self.table = store.aggregates()
+        if self.table is not None and (start is not None or end is not None):
+            days = self.table['day']
+            mask = days.notna()
+            if start is not None:
+                mask &= days >= pd.Timestamp(start).normalize()
+            if end is not None:
+                mask &= days <= pd.Timestamp(end).normalize()
+            self.table = self.table[mask].reset_index(drop=True)
+        self._fallback = None
+
+    def fallback(self):
+        if self._fallback is None:
+            from analytics import get_backend
+            self._fallback = get_backend(self.store.read(start=self.start, end=self.end))
+        return self._fallback
+
+    def _answers(self, date_col=None, target_col=None, product_col=None):
+        return (
+            self.table is not None and
+            (date_col is None or (date_col == self.manifest['date_col'] and 'day' in self.table)) and
+            (target_col is None or target_col == self.manifest['target_col']) and
+            (product_col is None or (product_col == self.manifest['product_col'] and 'product' in self.table))
+        )
+
+    def columns(self):
+        return list(self.manifest['columns'] or [])
+
+    def describe(self, target_col):
+        if not self._answers(target_col=target_col):
+            return self.fallback().describe(target_col)
+        rows, count, total, total_squares = self.table[['rows', 'count', 'sum', 'sum_squares']].sum()
+        std = np.sqrt(max((total_squares - total ** 2 / count) / (count - 1), 0)) if count > 1 else np.nan
+        return {
+            'count': int(rows),
+            'sum': total,
+            'mean': total / count if count else np.nan,
+            'std': std
+        }
+
+    def nunique(self, col):
+        if not self._answers(product_col=col):
+            return self.fallback().nunique(col)
+        return self.table['product'].nunique()
+
+    def group_sum(self, group_col, target_col):
+        if not self._answers(target_col=target_col, product_col=group_col):
+            return self.fallback().group_sum(group_col, target_col)
+        sums = self.table.groupby('product')['sum'].sum().sort_values(ascending=False)
+        return sums.rename(target_col).rename_axis(group_col)
+
+    def daily_sum(self, date_col, target_col):
+        if not self._answers(date_col=date_col, target_col=target_col):
+            return self.fallback().daily_sum(date_col, target_col)
+        daily_sales = self.table.groupby('day')['sum'].sum()
+        return pd.DataFrame({'Date': daily_sales.index.date, 'Sales': daily_sales.to_numpy()})
+
+    def monthly_mean(self, date_col, target_col):
+        if not self._answers(date_col=date_col, target_col=target_col):
+            return self.fallback().monthly_mean(date_col, target_col)
+        totals = self.table.groupby(self.table['day'].dt.month)[['sum', 'count']].sum()
+        return (totals['sum'] / totals['count']).rename(target_col).rename_axis(date_col)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain a Parquet dataset store")
+    commands = parser.add_subparsers(dest='command', required=True)
+    append = commands.add_parser('append', help="Append files to a store, creating it if needed")
+    append.add_argument('store', help="Store directory")
+    append.add_argument('input', nargs='+', help="Files to append, e.g. today's export")
+    append.add_argument('--partition-by', nargs='*', default=[], metavar='COLUMN',
+                        help="Columns to partition by below year/month, e.g. Branch (new stores only)")
+    info = commands.add_parser('info', help="Show a store's size and columns")
+    info.add_argument('store', help="Store directory")
+    args = parser.parse_args(argv)
+
+    store = DatasetStore(args.store, partition_cols=getattr(args, 'partition_by', None))
+    if args.command == 'info':
+        print(json.dumps({key: value for key, value in store.manifest.items() if key != 'parts'}, indent=2))
+        date_range = store.date_range()
+        print(f"{len(store.manifest['parts'])} part(s)" +
+              (f", {date_range[0]:%Y-%m-%d} to {date_range[1]:%Y-%m-%d}" if date_range else ""))
+        return 0
+
+    for path in args.input:
+        started = time.perf_counter()
+        validator = StreamingValidator()
+        try:
+            df = load_data(path, validator=validator)
+            errors, warnings = validator.report()
+            for warning in warnings:
+                print(f"warning: {path}: {warning}", file=sys.stderr)
+            if errors:
+                raise ValueError("; ".join(errors))
+            # Identified by content, so re-running a refresh doesn't append a file twice
+            with open(path, 'rb') as f:
+                batch_id = content_id(f.read())
+            added = store.append(df, batch_id=batch_id)
+        except ValueError as e:
+            print(f"error: {path}: {e}", file=sys.stderr)
+            return 1
+        print(f"Appended {added:,} rows from {path} in {time.perf_counter() - started:.2f}s "
+              f"({store.rows:,} rows in {args.store})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
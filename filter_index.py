@@ -0,0 +1,326 @@
+"""
+Row indexes and a cube for filtering a dataset by categorical values and dates
+
+Filtering with boolean masks scans every row of every filtered column on
+each rerun. `FilterIndex` is built once per dataset, at ingest:
+
+- a RowBitmap (see `bitmaps`) of the rows of every value of each
+  categorical column; a combined filter ORs the bitmaps of the values
+  selected in a column and ANDs the columns
+- the row numbers ordered by day, for date ranges
+- a cube: row count, count, sum and sum of squares of the target per
+  combination of the categorical values and the day
+
+Totals, distinct counts and groupings of a filtered view are answered
+from the cube (`backend`), which has a few hundred cells per day rather
+than one row per transaction, so drill-downs and cross-filtered charts
+don't touch the rows at all. The matching rows themselves (`select`) are
+only needed for other questions.
+"""
+import numpy as np
+import pandas as pd
+
+from bitmaps import RowBitmap
+from data_utils import parse_dates
+
+# Columns of the supermarket schema offered as filters when present
+FILTER_COLUMNS = ['Branch', 'City', 'Product line', 'Payment', 'Customer type', 'Gender']
+
+# Day number of rows without a parseable date; below every real day
+MISSING_DAY = np.iinfo(np.int32).min
+
+def _smallest_int_dtype(n):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def _day_number(value):
+    return int(pd.Timestamp(value).normalize().to_datetime64().astype('datetime64[D]').astype(np.int64))
+
+class Cube:
+    """
+    Statistics summed per distinct combination of dimension codes
+
+    Parameters:
+    - codes: dict of dimension name to an integer array with one code per row
+    - stats: dict of statistic name to an array with one value per row
+    """
+
+    def __init__(self, codes, stats):
+        n = len(next(iter(stats.values())))
+        # Cell number per row, refined one dimension at a time so it never overflows
+        cells = np.zeros(n, dtype=np.int64)
+        n_cells = min(n, 1)
+        for values in codes.values():
+            dim_codes, uniques = pd.factorize(values)
+            cells, combined = pd.factorize(cells * len(uniques) + dim_codes)
+            n_cells = len(combined)
+
+        # Each cell's codes are those of its first row
+        first = np.empty(n_cells, dtype=np.int64)
+        first[cells[::-1]] = np.arange(n - 1, -1, -1)
+        self.codes = {dim: np.asarray(values)[first] for dim, values in codes.items()}
+        self.stats = {
+            name: np.bincount(cells, weights=values, minlength=n_cells) for name, values in stats.items()
+        }
+
+    def __len__(self):
+        return len(next(iter(self.stats.values())))
+
+    def rollup(self, dims):
+        """The cube summed over every dimension not in `dims`"""
+        return Cube({dim: self.codes[dim] for dim in dims}, self.stats)
+
+class FilterIndex:
+    """
+    Bitmaps per value of categorical columns, rows by day, and a cube of the target
+
+    Parameters:
+    - df: the dataset; row numbers are positions in it (use with df.take)
+    - columns: categorical columns to index
+    - date_col: optional date column for date ranges
+    - target_col: optional numeric column summed in the cube
+    """
+
+    def __init__(self, df, columns, date_col=None, target_col=None):
+        self.n_rows = len(df)
+        self.date_col = date_col
+        self.target_col = target_col
+        self.values = {}
+        self._bitmaps = {}
+        dims = {}
+        for col in columns:
+            codes, uniques = pd.factorize(df[col], sort=True)
+            codes = codes.astype(_smallest_int_dtype(len(uniques)))
+            # Stable sorts of small integer codes are radix sorts: rows of each value stay in order
+            rows = np.argsort(codes, kind='stable')
+            # Missing values (code -1) sort first and are never selected
+            offsets = np.searchsorted(codes[rows], np.arange(len(uniques) + 1))
+            self._bitmaps[col] = [RowBitmap.from_rows(rows[offsets[i]:offsets[i + 1]]) for i in range(len(uniques))]
+            self.values[col] = list(uniques)
+            dims[col] = codes
+
+        if date_col is not None:
+            days = parse_dates(df[date_col]).dt.normalize().to_numpy()
+            valid = ~np.isnat(days)
+            self._day_numbers = np.where(valid, days.astype('datetime64[D]').astype(np.int64), MISSING_DAY).astype(np.int32)
+            order = np.argsort(self._day_numbers[valid], kind='stable')
+            self._day_rows = np.flatnonzero(valid)[order].astype(_smallest_int_dtype(len(df)))
+            self._day_values, self._day_offsets = np.unique(self._day_numbers[valid][order], return_index=True)
+            self._day_offsets = np.append(self._day_offsets, len(order))
+            dims[date_col] = self._day_numbers
+
+        values = pd.to_numeric(df[target_col], errors='coerce') if target_col else pd.Series(np.nan, index=df.index)
+        self._cube = Cube(dims, {
+            'rows': np.ones(len(df)),
+            'count': values.notna().to_numpy(dtype=np.float64),
+            'sum': values.fillna(0).to_numpy(dtype=np.float64),
+            'sum_squares': values.fillna(0).to_numpy(dtype=np.float64) ** 2
+        })
+        # Without a date filter the much smaller cube of the categorical columns is enough
+        self._category_cube = self._cube.rollup(columns) if date_col is not None else self._cube
+
+    def date_range(self):
+        """(first, last) day of the date column, or None"""
+        if self.date_col is None or len(self._day_values) == 0:
+            return None
+        first, last = self._day_values[[0, -1]].astype('datetime64[D]')
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def counts(self, col):
+        """Rows per value of an indexed column"""
+        return {value: len(bitmap) for value, bitmap in zip(self.values[col], self._bitmaps[col])}
+
+    def _value_codes(self, col, values):
+        lookup = {value: code for code, value in enumerate(self.values[col])}
+        return [lookup[value] for value in values if value in lookup]
+
+    def bitmap(self, col, values):
+        """RowBitmap of the rows where `col` is any of `values`"""
+        bitmaps = [self._bitmaps[col][code] for code in self._value_codes(col, values)]
+        if not bitmaps:
+            return RowBitmap()
+        result = bitmaps[0]
+        for other in bitmaps[1:]:
+            result = result | other
+        return result
+
+    def rows_for(self, col, values):
+        """Sorted row numbers where `col` is any of `values`"""
+        return self.bitmap(col, values).to_rows()
+
+    def _day_bounds(self, start, end):
+        """First and last day number of [start, end], and the slice of rows by day"""
+        first = _day_number(start) if start is not None else MISSING_DAY + 1
+        last = _day_number(end) if end is not None else np.iinfo(np.int32).max
+        lo, hi = np.searchsorted(self._day_values, [first, last + 1])
+        return first, last, self._day_offsets[lo], self._day_offsets[hi]
+
+    def rows_between(self, start=None, end=None):
+        """Sorted row numbers whose date falls in [start, end] (whole days)"""
+        _, _, lo, hi = self._day_bounds(start, end)
+        return np.sort(self._day_rows[lo:hi])
+
+    def select(self, filters=None, start=None, end=None):
+        """
+        Row numbers matching every filter, or None when nothing is filtered
+
+        `filters` maps indexed columns to the allowed values; columns with
+        no values selected don't filter. `start`/`end` filter on the date
+        column. The result is sorted, ready for `df.take`.
+        """
+        bitmaps = [self.bitmap(col, values) for col, values in (filters or {}).items() if values]
+        dated = self.date_col is not None and (start is not None or end is not None)
+        if not bitmaps and not dated:
+            return None
+
+        selected = None
+        if bitmaps:
+            # ANDing the smallest sets first keeps the intermediate results small
+            bitmaps.sort(key=len)
+            selected = bitmaps[0]
+            for other in bitmaps[1:]:
+                selected = selected & other
+        if not dated:
+            return selected.to_rows()
+
+        first, last, lo, hi = self._day_bounds(start, end)
+        if selected is None:
+            return np.sort(self._day_rows[lo:hi])
+        # Collect whichever side is smaller and test its rows against the other
+        if hi - lo < len(selected):
+            rows = np.sort(self._day_rows[lo:hi])
+            return rows[selected.contains(rows)]
+        rows = selected.to_rows()
+        days = self._day_numbers[rows]
+        return rows[(days >= first) & (days <= last)]
+
+    def _cells(self, filters=None, start=None, end=None, by_day=False):
+        """The cube to answer from and a boolean mask of its cells matching the filters"""
+        dated = self.date_col is not None and (start is not None or end is not None)
+        cube = self._cube if dated or by_day else self._category_cube
+        mask = np.ones(len(cube), dtype=bool)
+        for col, values in (filters or {}).items():
+            if values:
+                # The extra False is where code -1 (missing) lands
+                allowed = np.zeros(len(self.values[col]) + 1, dtype=bool)
+                allowed[self._value_codes(col, values)] = True
+                mask &= allowed[cube.codes[col]]
+        if dated:
+            first, last, _, _ = self._day_bounds(start, end)
+            days = cube.codes[self.date_col]
+            mask &= (days >= first) & (days <= last)
+        return cube, mask
+
+    def count(self, filters=None, start=None, end=None):
+        """Number of rows matching the filters, from the cube"""
+        cube, mask = self._cells(filters, start, end)
+        return int(cube.stats['rows'][mask].sum())
+
+    def backend(self, df, filters=None, start=None, end=None):
+        """Analytics backend for the rows of `df` (the indexed dataset) matching the filters"""
+        return CubeBackend(self, df, filters, start, end)
+
+class CubeBackend:
+    """
+    Analytics backend (same methods as analytics.PandasBackend) on a FilterIndex's cube
+
+    Questions about the index's target, date and categorical columns are
+    answered from the cube cells matching the filters. Anything else
+    selects the matching rows and uses the regular backend on them.
+    """
+
+    name = 'cube'
+
+    def __init__(self, index, df, filters=None, start=None, end=None):
+        self.index = index
+        self.df = df
+        self.filters = filters
+        self.start = start
+        self.end = end
+        self._fallback = None
+        self._selected = {}
+
+    def fallback(self):
+        if self._fallback is None:
+            from analytics import get_backend
+            rows = self.index.select(self.filters, self.start, self.end)
+            self._fallback = get_backend(self.df if rows is None else self.df.take(rows))
+        return self._fallback
+
+    def _stats(self, by_day=False):
+        """Codes of the cube's cells, statistics of the matching ones, and the match mask"""
+        if by_day not in self._selected:
+            cube, mask = self.index._cells(self.filters, self.start, self.end, by_day)
+            # Cells without rows can't be told apart from values that don't occur
+            mask &= cube.stats['rows'] > 0
+            self._selected[by_day] = cube.codes, {name: values[mask] for name, values in cube.stats.items()}, mask
+        return self._selected[by_day]
+
+    def _answers(self, target_col=None, group_col=None, date_col=None):
+        return (
+            (target_col is None or target_col == self.index.target_col) and
+            (group_col is None or group_col in self.index.values) and
+            (date_col is None or date_col == self.index.date_col)
+        )
+
+    def columns(self):
+        return list(self.df.columns)
+
+    def describe(self, target_col):
+        if not self._answers(target_col=target_col):
+            return self.fallback().describe(target_col)
+        _, stats, _ = self._stats()
+        rows, count, total, total_squares = (stats[name].sum() for name in ('rows', 'count', 'sum', 'sum_squares'))
+        std = np.sqrt(max((total_squares - total ** 2 / count) / (count - 1), 0)) if count > 1 else np.nan
+        return {
+            'count': int(rows),
+            'sum': total,
+            'mean': total / count if count else np.nan,
+            'std': std
+        }
+
+    def nunique(self, col):
+        if not self._answers(group_col=col):
+            return self.fallback().nunique(col)
+        codes, _, mask = self._stats()
+        present = codes[col][mask]
+        return len(np.unique(present[present >= 0]))
+
+    def group_sum(self, group_col, target_col):
+        """Sum per group, largest first"""
+        if not self._answers(target_col=target_col, group_col=group_col):
+            return self.fallback().group_sum(group_col, target_col)
+        codes, stats, mask = self._stats()
+        groups = codes[group_col][mask]
+        present = groups >= 0
+        n_values = len(self.index.values[group_col])
+        sums = np.bincount(groups[present], weights=stats['sum'][present], minlength=n_values)
+        occurs = np.bincount(groups[present], minlength=n_values) > 0
+        values = pd.Index(self.index.values[group_col], name=group_col)[occurs]
+        return pd.Series(sums[occurs], index=values, name=target_col).sort_values(ascending=False)
+
+    def _sums_by_day(self):
+        codes, stats, mask = self._stats(by_day=True)
+        days = codes[self.index.date_col][mask]
+        valid = days != MISSING_DAY
+        unique_days, inverse = np.unique(days[valid], return_inverse=True)
+        sums = np.bincount(inverse, weights=stats['sum'][valid], minlength=len(unique_days))
+        counts = np.bincount(inverse, weights=stats['count'][valid], minlength=len(unique_days))
+        return pd.DatetimeIndex(unique_days.astype('datetime64[D]')), sums, counts
+
+    def daily_sum(self, date_col, target_col):
+        """DataFrame of Date and Sales, one row per calendar day"""
+        if not self._answers(target_col=target_col, date_col=date_col):
+            return self.fallback().daily_sum(date_col, target_col)
+        days, sums, _ = self._sums_by_day()
+        return pd.DataFrame({'Date': days.date, 'Sales': sums})
+
+    def monthly_mean(self, date_col, target_col):
+        """Mean per calendar month (1-12) across all years"""
+        if not self._answers(target_col=target_col, date_col=date_col):
+            return self.fallback().monthly_mean(date_col, target_col)
+        days, sums, counts = self._sums_by_day()
+        totals = pd.DataFrame({'sum': sums, 'count': counts}).groupby(days.month)[['sum', 'count']].sum()
+        return (totals['sum'] / totals['count']).rename(target_col).rename_axis(date_col)
@@ -0,0 +1,188 @@
+"""
+Headless batch forecasting for scheduled jobs
+
+Runs the same column detection and forecasting as the Forecast page, but
+for every product/branch series in a file at once, and writes the results
+to Parquet or CSV.
+
+Example (nightly cron):
+    python forecast_cli.py sales.parquet -o forecasts.parquet --horizon 30 \
+        --method holt_winters --group-by "Product line" --group-by Branch --workers 4
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_utils import load_data, detect_columns, pivot_series, StreamingValidator
+from model import forecast_with_confidence_batch
+
+METHODS = ['moving_average', 'exponential', 'linear_trend', 'holt_winters', 'holt_winters_multiplicative']
+
+def sheet_arg(value):
+    """Excel sheet option: digits are a 0-based sheet position, anything else a sheet name"""
+    return int(value) if value.isdigit() else value
+
+def build_parser():
+    """Command-line options"""
+    parser = argparse.ArgumentParser(
+        description="Forecast every series in a sales file without the Streamlit UI"
+    )
+    parser.add_argument('input', nargs='+',
+                        help="Sales data files, globs or directories (.csv, .xlsx, .parquet, "
+                             "memory-mapped .arrow/.feather/.npy, or compressed .csv.gz/.zip/.zst); "
+                             "several files are combined")
+    parser.add_argument('--sheet', type=sheet_arg, default=0,
+                        help="Sheet name or 0-based position of an Excel input (default: the first sheet)")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Output file; .parquet or .csv")
+    parser.add_argument('--horizon', type=int, default=30,
+                        help="Number of periods to forecast (default: 30)")
+    parser.add_argument('--method', choices=METHODS, default='moving_average',
+                        help="Forecasting method (default: moving_average)")
+    parser.add_argument('--group-by', action='append', dest='group_by',
+                        help="Column to split series by; repeat for several. "
+                             "Defaults to the detected product column")
+    parser.add_argument('--overall', action='store_true',
+                        help="Forecast a single series of total sales instead of groups")
+    parser.add_argument('--freq', default='D',
+                        help="Series frequency as a pandas period alias (default: D)")
+    parser.add_argument('--confidence', type=float, default=0.95, choices=[0.95, 0.99],
+                        help="Confidence level of the bounds (default: 0.95)")
+    parser.add_argument('--date-col', help="Override the detected date column")
+    parser.add_argument('--target-col', help="Override the detected sales column")
+    parser.add_argument('--time-col',
+                        help="Time-of-day column combined with the date, for sub-daily --freq such as h")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for forecasting (default: 1)")
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help="Series per forecasting batch (default: 1000)")
+    return parser
+
+def _forecast_chunk(args):
+    """Forecast one chunk of series; top-level so worker processes can run it"""
+    Y, horizon, confidence, method = args
+    return forecast_with_confidence_batch(Y, horizon, confidence_level=confidence, method=method)
+
+def forecast_series(series, horizon, method='moving_average', confidence=0.95,
+                    workers=1, chunk_size=1000):
+    """
+    Forecast every row of a `pivot_series` table
+
+    Rows are split into chunks of `chunk_size` series; each chunk is one
+    vectorized forecast call, run in `workers` processes.
+    Returns (forecast, lower_bound, upper_bound) arrays of shape (n_series, horizon).
+    """
+    Y = series.to_numpy(dtype=float)
+    chunks = [
+        (Y[start:start + chunk_size], horizon, confidence, method)
+        for start in range(0, len(Y), max(chunk_size, 1))
+    ]
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_forecast_chunk, chunks))
+    else:
+        results = [_forecast_chunk(chunk) for chunk in chunks]
+
+    if not results:
+        empty = np.zeros((0, horizon))
+        return empty, empty, empty
+
+    return tuple(
+        np.vstack([result[key] for result in results])
+        for key in ['forecast', 'lower_bound', 'upper_bound']
+    )
+
+def forecasts_to_frame(series, forecast, lower_bound, upper_bound, freq='D'):
+    """Long-format results: one row per series and forecast date"""
+    n_series, horizon = forecast.shape
+    last_period = pd.Period(series.columns.max(), freq=freq)
+    future_dates = pd.period_range(last_period + 1, periods=horizon, freq=freq).to_timestamp()
+
+    result = series.index.to_frame(index=False).loc[np.repeat(np.arange(n_series), horizon)]
+    result = result.reset_index(drop=True)
+    result['Date'] = np.tile(future_dates, n_series)
+    result['Forecast'] = forecast.ravel()
+    result['Lower_Bound'] = lower_bound.ravel()
+    result['Upper_Bound'] = upper_bound.ravel()
+
+    return result
+
+def write_results(df, filepath):
+    """Write results as Parquet or CSV depending on the extension"""
+    if filepath.endswith('.parquet'):
+        df.to_parquet(filepath, index=False)
+    else:
+        df.to_csv(filepath, index=False)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+
+    inputs = args.input[0] if len(args.input) == 1 else args.input
+    # Validated while parsing, so there's no second pass over the data
+    validator = StreamingValidator()
+    try:
+        df = load_data(inputs, sheet_name=args.sheet, validator=validator)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    errors, warnings = validator.report()
+    for warning in warnings:
+        print(f"warning: {warning}", file=sys.stderr)
+    if errors:
+        for error in errors:
+            print(f"error: {error}", file=sys.stderr)
+        return 1
+
+    date_col, target_col, product_col, external_cols = detect_columns(df)
+    date_col = args.date_col or date_col
+    target_col = args.target_col or target_col
+
+    if not date_col or not target_col:
+        print("error: could not detect the date and sales columns; "
+              "use --date-col and --target-col", file=sys.stderr)
+        return 1
+
+    if args.overall:
+        group_cols = []
+    else:
+        group_cols = args.group_by or ([product_col] if product_col else [])
+
+    missing = [col for col in [date_col, target_col, args.time_col] + group_cols if col and col not in df.columns]
+    if missing:
+        print(f"error: columns not found: {missing}", file=sys.stderr)
+        return 1
+
+    if group_cols:
+        series = pivot_series(df, group_cols, date_col, target_col, freq=args.freq, time_col=args.time_col)
+    else:
+        series = pivot_series(df.assign(Series='All'), ['Series'], date_col, target_col,
+                              freq=args.freq, time_col=args.time_col)
+
+    if series.empty:
+        print("error: no dated rows to forecast", file=sys.stderr)
+        return 1
+
+    forecast, lower_bound, upper_bound = forecast_series(
+        series, args.horizon,
+        method=args.method,
+        confidence=args.confidence,
+        workers=args.workers,
+        chunk_size=args.chunk_size
+    )
+
+    results = forecasts_to_frame(series, forecast, lower_bound, upper_bound, freq=args.freq)
+    write_results(results, args.output)
+
+    elapsed = time.perf_counter() - started
+    print(f"Forecast {len(series):,} series x {args.horizon} periods "
+          f"with {args.method} in {elapsed:.1f}s -> {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Per-stage timing and memory instrumentation
+
+Wrap a stage with `track("name")` (a context manager) or decorate a function
+with `@instrument()` to record its wall time, CPU time and, when memory
+tracing is on, its peak traced allocation. Records are kept in memory for
+the whole server process and can be summarized, exported as JSON lines or
+rendered in the Prometheus text exposition format.
+
+Timing is always on and costs a few microseconds per call. Peak memory uses
+tracemalloc, which slows allocation-heavy code, so it is opt-in: set
+MARKET_MAVEN_TRACE_MEMORY=1 or call `set_memory_tracing(True)`.
+Peaks are approximate when several sessions run stages concurrently.
+"""
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import ContextDecorator
+
+MAX_RECORDS = 10_000
+
+_lock = threading.Lock()
+_records = deque(maxlen=MAX_RECORDS)
+_totals = {}
+_local = threading.local()
+
+def set_memory_tracing(enabled):
+    """Turn tracemalloc-based peak memory measurement on or off"""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def memory_tracing():
+    return tracemalloc.is_tracing()
+
+class track(ContextDecorator):
+    """
+    Record wall time, CPU time and peak memory of a stage
+
+        with track('data_utils.load_data'):
+            ...
+
+    CPU time is the calling thread's, so concurrent sessions don't inflate
+    each other's numbers. Nested stages are each recorded in full.
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+
+        self.child_peak = 0
+        self.traced = tracemalloc.is_tracing()
+        if self.traced:
+            current, peak = tracemalloc.get_traced_memory()
+            # Hand the peak so far to the enclosing stage before resetting it
+            if len(stack) > 1:
+                stack[-2].child_peak = max(stack[-2].child_peak, peak)
+            self.start_memory = current
+            tracemalloc.reset_peak()
+        self.start_cpu = time.thread_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.thread_time() - self.start_cpu
+
+        peak = None
+        stack = _local.stack
+        stack.pop()
+        if self.traced and tracemalloc.is_tracing():
+            # reset_peak in nested stages hides their peaks from us; they report them upward
+            absolute_peak = max(tracemalloc.get_traced_memory()[1], self.child_peak)
+            peak = max(absolute_peak - self.start_memory, 0)
+            if stack:
+                stack[-1].child_peak = max(stack[-1].child_peak, absolute_peak)
+
+        _record(self.stage, wall, cpu, peak, failed=exc_type is not None)
+        return False
+
+def instrument(stage=None):
+    """Decorator recording every call of a function as a stage named after it"""
+    def decorator(func):
+        name = stage or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _record(stage, wall, cpu, peak, failed=False):
+    record = {
+        'stage': stage,
+        'timestamp': time.time(),
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        'peak_memory_bytes': peak,
+        'failed': failed,
+        'thread': threading.current_thread().name
+    }
+    with _lock:
+        _records.append(record)
+        totals = _totals.setdefault(stage, {
+            'count': 0, 'failures': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+            'max_wall_seconds': 0.0, 'max_peak_memory_bytes': None
+        })
+        totals['count'] += 1
+        totals['failures'] += int(failed)
+        totals['wall_seconds'] += wall
+        totals['cpu_seconds'] += cpu
+        totals['max_wall_seconds'] = max(totals['max_wall_seconds'], wall)
+        if peak is not None:
+            totals['max_peak_memory_bytes'] = max(totals['max_peak_memory_bytes'] or 0, peak)
+
+def get_records(stage_prefix=None):
+    """Most recent records (up to MAX_RECORDS), optionally filtered by stage prefix"""
+    with _lock:
+        records = list(_records)
+    if stage_prefix:
+        records = [record for record in records if record['stage'].startswith(stage_prefix)]
+    return records
+
+def summarize():
+    """Cumulative totals per stage since start-up (or the last reset)"""
+    with _lock:
+        return {stage: dict(totals) for stage, totals in _totals.items()}
+
+def reset():
+    with _lock:
+        _records.clear()
+        _totals.clear()
+
+def to_json_lines():
+    """All retained records, one JSON object per line"""
+    return ''.join(json.dumps(record) + '\n' for record in get_records())
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def to_prometheus(prefix='market_maven'):
+    """Cumulative per-stage totals in the Prometheus text exposition format"""
+    totals = summarize()
+    lines = []
+
+    def metric(name, metric_type, help_text, values):
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+        for stage, value in values:
+            lines.append(f'{prefix}_{name}{{stage="{_label(stage)}"}} {value}')
+
+    stages = sorted(totals)
+    metric('stage_calls_total', 'counter', 'Number of calls per stage.',
+           [(stage, totals[stage]['count']) for stage in stages])
+    metric('stage_failures_total', 'counter', 'Number of calls per stage that raised.',
+           [(stage, totals[stage]['failures']) for stage in stages])
+    metric('stage_wall_seconds_total', 'counter', 'Wall time spent per stage.',
+           [(stage, totals[stage]['wall_seconds']) for stage in stages])
+    metric('stage_cpu_seconds_total', 'counter', 'Thread CPU time spent per stage.',
+           [(stage, totals[stage]['cpu_seconds']) for stage in stages])
+    metric('stage_max_wall_seconds', 'gauge', 'Slowest single call per stage.',
+           [(stage, totals[stage]['max_wall_seconds']) for stage in stages])
+    metric('stage_max_peak_memory_bytes', 'gauge', 'Largest traced peak allocation per stage.',
+           [(stage, totals[stage]['max_peak_memory_bytes']) for stage in stages
+            if totals[stage]['max_peak_memory_bytes'] is not None])
+
+    return '\n'.join(lines) + '\n'
+
+def write_metrics_file(filepath):
+    """Write Prometheus text for .prom files and JSON lines otherwise, atomically"""
+    content = to_prometheus() if filepath.endswith('.prom') else to_json_lines()
+    # Sessions finishing reruns at the same time each write their own temp file
+    directory, name = os.path.split(os.path.abspath(filepath))
+    with tempfile.NamedTemporaryFile('w', dir=directory, prefix=f".{name}.", suffix='.tmp', delete=False) as f:
+        f.write(content)
+    try:
+        # Temp files are private; keep the usual permissions for scrapers
+        os.chmod(f.name, 0o644)
+        os.replace(f.name, filepath)
+    except OSError:
+        os.unlink(f.name)
+        raise
+
+if os.environ.get('MARKET_MAVEN_TRACE_MEMORY') == '1':
+    set_memory_tracing(True)
@@ -5,14 +5,20 @@ from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
 
-def simple_forecast(y, periods, method='moving_average'):
+from instrumentation import instrument
+
+@instrument()
+def simple_forecast(y, periods, method='moving_average', batcher=None):
     """
     Generate simple forecasts using statistical methods
     
     Parameters:
     - y: pandas Series of historical values
     - periods: number of periods to forecast
-    - method: forecasting method ('moving_average', 'exponential', 'linear_trend')
+    - method: forecasting method ('moving_average', 'exponential', 'linear_trend',
+      'holt_winters', 'holt_winters_multiplicative')
+    - batcher: optional `batching.ForecastBatcher`; concurrent callers sharing
+      it are computed together in one vectorized call
     """
     if len(y) == 0:
         return np.zeros(periods)
@@ -23,59 +29,281 @@ def simple_forecast(y, periods, method='moving_average'):
     if len(y) == 0:
         return np.zeros(periods)
     
+    if batcher is not None:
+        forecast_values = batcher.forecast(y.to_numpy(dtype=float), periods, method=method)
+    else:
+        forecast_values = forecast_batch(y.to_numpy(dtype=float)[np.newaxis, :], periods, method=method)[0]
+    
+    return add_variation(forecast_values, y)
+
+def add_variation(forecast_values, y):
+    """Add some realistic variation to a forecast of the cleaned series y"""
+    std_dev = y.std() * 0.1  # 10% of standard deviation
+    noise = np.random.normal(0, std_dev, len(forecast_values))
+    forecast_values = forecast_values + noise
+    forecast_values = np.maximum(forecast_values, 0)  # Keep positive
+    
+    return forecast_values
+
+def pad_series(series_list):
+    """
+    Stack series of different lengths into a right-aligned 2-D array
+    
+    Shorter series are padded with leading NaNs, the layout expected by
+    `forecast_batch`, `holt_winters_batch` and `trend_analysis_batch`.
+    """
+    arrays = [np.asarray(series, dtype=float).ravel() for series in series_list]
+    n_obs = max((len(array) for array in arrays), default=0)
+    Y = np.full((len(arrays), n_obs), np.nan)
+    for row, array in enumerate(arrays):
+        if len(array):
+            Y[row, n_obs - len(array):] = array
+    return Y
+
+@instrument()
+def forecast_batch(Y, periods, method='moving_average'):
+    """
+    Generate simple forecasts for many series at once
+    
+    Vectorized counterpart of `simple_forecast` (without the random
+    variation). `Y` is a 2-D array (n_series, n_obs) of right-aligned
+    series: shorter series are padded with leading NaNs. Returns an array
+    of shape (n_series, periods).
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n_series, n_obs = Y.shape
+    if n_obs == 0:
+        return np.zeros((n_series, periods))
+    
+    observed = ~np.isnan(Y)
+    values = np.where(observed, Y, 0.0)
+    n_valid = observed.sum(axis=1)
+    rows = np.arange(n_series)
+    steps = np.arange(periods)
+    last = values[:, -1]
+    
     if method == 'moving_average':
         # Use moving average of last N periods
-        window = min(30, len(y))
-        forecast_value = y.rolling(window=window, min_periods=1).mean().iloc[-1]
+        window = min(30, n_obs)
+        forecast_value = values[:, -window:].sum(axis=1) / np.maximum(observed[:, -window:].sum(axis=1), 1)
         
         # Add slight trend if detectable
-        if len(y) >= 2:
-            recent_trend = (y.iloc[-1] - y.iloc[-min(10, len(y))]) / min(10, len(y))
-            forecast_values = []
-            for i in range(periods):
-                forecast_values.append(forecast_value + (recent_trend * i))
-        else:
-            forecast_values = [forecast_value] * periods
-            
+        lag = np.clip(n_valid, 1, 10)
+        recent_trend = np.where(n_valid >= 2, (last - values[rows, n_obs - lag]) / lag, 0.0)
+        forecast_values = forecast_value[:, np.newaxis] + recent_trend[:, np.newaxis] * steps
+        
     elif method == 'exponential':
         # Exponential smoothing
         alpha = 0.3
-        forecast_value = y.iloc[0]
+        first = observed.argmax(axis=1)
+        forecast_value = values[rows, first]
         
-        for value in y:
-            forecast_value = alpha * value + (1 - alpha) * forecast_value
+        for t in range(n_obs):
+            forecast_value = np.where(
+                observed[:, t], alpha * values[:, t] + (1 - alpha) * forecast_value, forecast_value
+            )
         
-        # Simple exponential forecast
-        forecast_values = [forecast_value] * periods
+        forecast_values = np.repeat(forecast_value[:, np.newaxis], periods, axis=1)
+        
+    elif method in ('holt_winters', 'holt_winters_multiplicative'):
+        # Holt-Winters with parameters chosen by grid search
+        seasonal = 'multiplicative' if method == 'holt_winters_multiplicative' else 'additive'
+        forecast_values = holt_winters_batch(Y, periods, seasonal=seasonal)['forecast']
         
     elif method == 'linear_trend':
         # Linear trend forecast
-        if len(y) >= 2:
-            x = np.arange(len(y)).reshape(-1, 1)
-            model = LinearRegression()
-            model.fit(x, y)
-            
-            # Predict future periods
-            future_x = np.arange(len(y), len(y) + periods).reshape(-1, 1)
-            forecast_values = model.predict(future_x)
-        else:
-            forecast_values = [y.iloc[0]] * periods
+        slope, intercept, _ = _least_squares_batch(Y)
+        future_x = np.arange(n_obs, n_obs + periods)
+        forecast_values = np.where(
+            (n_valid >= 2)[:, np.newaxis],
+            intercept[:, np.newaxis] + slope[:, np.newaxis] * future_x,
+            last[:, np.newaxis]
+        )
     
     else:
         # Default to mean
-        forecast_values = [y.mean()] * periods
+        forecast_value = values.sum(axis=1) / np.maximum(n_valid, 1)
+        forecast_values = np.repeat(forecast_value[:, np.newaxis], periods, axis=1)
     
-    # Ensure positive values
-    forecast_values = np.maximum(forecast_values, 0)
+    # Empty series forecast zero; ensure positive values
+    forecast_values = np.where((n_valid > 0)[:, np.newaxis], forecast_values, 0.0)
+    return np.maximum(forecast_values, 0)
+
+def _least_squares_batch(Y):
+    """Closed-form least-squares slope and intercept per row, ignoring NaNs"""
+    mask = ~np.isnan(Y)
+    values = np.where(mask, Y, 0.0)
+    x = np.arange(Y.shape[1], dtype=float)
     
-    # Add some realistic variation
-    std_dev = y.std() * 0.1  # 10% of standard deviation
-    noise = np.random.normal(0, std_dev, periods)
-    forecast_values = forecast_values + noise
-    forecast_values = np.maximum(forecast_values, 0)  # Keep positive
+    n = mask.sum(axis=1)
+    sum_x = mask @ x
+    sum_xx = mask @ (x * x)
+    sum_y = values.sum(axis=1)
+    sum_xy = values @ x
     
-    return forecast_values
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x ** 2)
+        intercept = (sum_y - slope * sum_x) / n
+    
+    return slope, intercept, n
+
+def _closed_form_initial_states(segment, seasonal):
+    """Initial level, trend and seasonal indices from the first two seasons
+    
+    Fits a least-squares line to every row of `segment` (n_series, 2 * m) in
+    closed form and averages the detrended values per seasonal phase.
+    """
+    n_obs = segment.shape[1]
+    m = n_obs // 2
+    x = np.arange(n_obs, dtype=float)
+    x_centered = x - x.mean()
+    y_mean = segment.mean(axis=1, keepdims=True)
+    slope = ((segment - y_mean) * x_centered).sum(axis=1) / (x_centered ** 2).sum()
+    intercept = y_mean[:, 0] - slope * x.mean()
+    line = intercept[:, np.newaxis] + slope[:, np.newaxis] * x
+    
+    if seasonal == 'multiplicative':
+        season = (segment / np.maximum(line, 1e-6)).reshape(-1, 2, m).mean(axis=1)
+        season_mean = season.mean(axis=1, keepdims=True)
+        season = season / np.where(season_mean > 0, season_mean, 1.0)
+    else:
+        season = (segment - line).reshape(-1, 2, m).mean(axis=1)
+        season = season - season.mean(axis=1, keepdims=True)
+    
+    return intercept, slope, season
+
+# Range of multiplicative seasonal factors, relative to the level
+SEASONAL_FACTOR_BOUNDS = (0.05, 20.0)
+
+@instrument()
+def holt_winters_batch(Y, periods, season_length=7, seasonal='additive', trend=True,
+                       alphas=(0.1, 0.3, 0.5, 0.7, 0.9),
+                       betas=(0.01, 0.05, 0.1, 0.2),
+                       gammas=(0.05, 0.1, 0.3)):
+    """
+    Fit Holt-Winters exponential smoothing to a batch of series at once
+    
+    Every (alpha, beta, gamma) combination of the grid is run for every
+    series in the same vectorized state update, and each series keeps the
+    combination with the lowest in-sample squared one-step error.
+    
+    Parameters:
+    - Y: 2-D array (n_series, n_obs); leading NaNs mark series that start later
+    - periods: number of periods to forecast
+    - season_length: observations per seasonal cycle (7 for daily data)
+    - seasonal: 'additive' or 'multiplicative'
+    - trend: include an additive trend component
+    - alphas, betas, gammas: candidate level, trend and seasonal smoothing parameters
+    
+    Series with fewer than two full seasons are fitted without seasonality.
+    Multiplicative seasonality is undefined for zeros and negative values,
+    so series containing any are fitted additively instead.
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n_series, n_obs = Y.shape
+    m = max(int(season_length), 1)
+    multiplicative = seasonal == 'multiplicative'
+    grid_params = dict(season_length=season_length, trend=trend, alphas=alphas, betas=betas, gammas=gammas)
+    if multiplicative:
+        nonpositive = (np.nan_to_num(Y, nan=1.0) <= 0).any(axis=1)
+        if nonpositive.any():
+            fits = {
+                False: holt_winters_batch(Y[~nonpositive], periods, seasonal='multiplicative', **grid_params),
+                True: holt_winters_batch(Y[nonpositive], periods, seasonal='additive', **grid_params)
+            }
+            combined = {}
+            for key in fits[False]:
+                combined[key] = np.zeros((n_series,) + fits[False][key].shape[1:])
+                for selected, fit in fits.items():
+                    combined[key][nonpositive == selected] = fit[key]
+            return combined
+    
+    observed = ~np.isnan(Y)
+    n_valid = observed.sum(axis=1)
+    first = np.where(n_valid > 0, observed.argmax(axis=1), n_obs)
+    rows = np.arange(n_series)
+    has_season = n_valid >= 2 * m
+    
+    # Closed-form initial states from the first valid observations
+    offsets = np.minimum(first[:, np.newaxis] + np.arange(2 * m), n_obs - 1)
+    segment = np.nan_to_num(Y[rows[:, np.newaxis], offsets], nan=0.0)
+    level0, trend0, season0 = _closed_form_initial_states(segment, seasonal)
+    
+    start_value = segment[:, 0]
+    next_value = np.where(n_valid >= 2, segment[:, 1], start_value)
+    level0 = np.where(has_season, level0, start_value)
+    trend0 = np.where(has_season, trend0, next_value - start_value)
+    neutral = 1.0 if multiplicative else 0.0
+    season0 = np.where(has_season[:, np.newaxis], season0, neutral)
+    if not trend:
+        trend0 = np.zeros(n_series)
+    
+    # Expand the states over the parameter grid: (n_series, n_params)
+    grid = np.array(np.meshgrid(alphas, betas if trend else [0.0], gammas, indexing='ij')).reshape(3, -1)
+    alpha, beta, gamma = grid[0], grid[1], grid[2]
+    gamma = np.where(has_season[:, np.newaxis], gamma, 0.0)
+    n_params = grid.shape[1]
+    
+    level = np.repeat(level0[:, np.newaxis], n_params, axis=1)
+    slope = np.repeat(trend0[:, np.newaxis], n_params, axis=1)
+    season = np.repeat(season0[:, np.newaxis, :], n_params, axis=1)
+    sse = np.zeros((n_series, n_params))
+    
+    for t in range(int(first.min()) if n_series else n_obs, n_obs):
+        started = (t >= first)[:, np.newaxis]
+        y_t = Y[:, t][:, np.newaxis]
+        is_obs = started & observed[:, t][:, np.newaxis]
+        y_t = np.where(is_obs, y_t, 0.0)
+        
+        phase = (t - first) % m
+        s = season[rows, :, phase]
+        
+        if multiplicative:
+            prediction = (level + slope) * s
+            # Bounded level and factors keep a run of small values from
+            # dividing the level up without limit
+            new_level = np.maximum(alpha * (y_t / s) + (1 - alpha) * (level + slope), 1e-6)
+            new_season = np.clip(gamma * (y_t / new_level) + (1 - gamma) * s, *SEASONAL_FACTOR_BOUNDS)
+        else:
+            prediction = level + slope + s
+            new_level = alpha * (y_t - s) + (1 - alpha) * (level + slope)
+            new_season = gamma * (y_t - new_level) + (1 - gamma) * s
+        new_slope = beta * (new_level - level) + (1 - beta) * slope
+        
+        sse += np.where(is_obs, (y_t - prediction) ** 2, 0.0)
+        # Missing observations after the start only advance the level
+        level, slope = (
+            np.where(is_obs, new_level, np.where(started, level + slope, level)),
+            np.where(is_obs, new_slope, slope)
+        )
+        season[rows, :, phase] = np.where(is_obs, new_season, s)
+    
+    # Keep the best parameter combination per series; diverged ones never win
+    sse = np.where(np.isfinite(sse), sse, np.inf)
+    best = sse.argmin(axis=1)
+    level = level[rows, best]
+    slope = slope[rows, best]
+    season = season[rows, best]
+    
+    horizon = np.arange(1, periods + 1)
+    future_phase = (n_obs - first[:, np.newaxis] + horizon - 1) % m
+    future_season = season[rows[:, np.newaxis], future_phase]
+    base = level[:, np.newaxis] + slope[:, np.newaxis] * horizon
+    forecast = base * future_season if multiplicative else base + future_season
+    # Series where every combination diverged forecast their mean
+    mean = np.where(observed, Y, 0.0).sum(axis=1) / np.maximum(n_valid, 1)
+    forecast = np.where(np.isfinite(forecast), forecast, mean[:, np.newaxis])
+    forecast = np.where((n_valid > 0)[:, np.newaxis], forecast, 0.0)
+    
+    return {
+        'forecast': forecast,
+        'alpha': alpha[best],
+        'beta': beta[best],
+        'gamma': gamma[rows, best],
+        'sse': sse[rows, best]
+    }
 
+@instrument()
 def train_advanced_model(X, y, model_type='random_forest'):
     """Train an advanced ML model"""
     if model_type == 'random_forest':
@@ -93,6 +321,7 @@ def train_advanced_model(X, y, model_type='random_forest'):
     model.fit(X, y)
     return model
 
+@instrument()
 def evaluate_model(model, X_test, y_test):
     """Evaluate model performance"""
     predictions = model.predict(X_test)
@@ -114,6 +343,7 @@ def load_model(filepath):
     """Load saved model"""
     return joblib.load(filepath)
 
+@instrument()
 def forecast_with_confidence(y, periods, confidence_level=0.95):
     """Generate forecast with confidence intervals"""
     forecast = simple_forecast(y, periods)
@@ -135,6 +365,35 @@ def forecast_with_confidence(y, periods, confidence_level=0.95):
         'confidence_level': confidence_level
     }
 
+@instrument()
+def forecast_with_confidence_batch(Y, periods, confidence_level=0.95, method='moving_average'):
+    """Generate forecasts with confidence intervals for many series at once"""
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    forecast = forecast_batch(Y, periods, method=method)
+    
+    # Calculate confidence intervals based on historical volatility
+    observed = ~np.isnan(Y)
+    n_valid = observed.sum(axis=1)
+    values = np.where(observed, Y, 0.0)
+    y_mean = values.sum(axis=1, keepdims=True) / np.maximum(n_valid, 1)[:, np.newaxis]
+    squared_dev = np.where(observed, (values - y_mean) ** 2, 0.0).sum(axis=1)
+    std_dev = np.sqrt(squared_dev / np.maximum(n_valid - 1, 1))
+    std_dev = np.where(n_valid > 1, std_dev, 0.0)
+    z_score = 1.96 if confidence_level == 0.95 else 2.58  # 95% or 99%
+    
+    margin_of_error = (z_score * std_dev)[:, np.newaxis]
+    
+    upper_bound = forecast + margin_of_error
+    lower_bound = np.maximum(forecast - margin_of_error, 0)  # Keep positive
+    
+    return {
+        'forecast': forecast,
+        'upper_bound': upper_bound,
+        'lower_bound': lower_bound,
+        'confidence_level': confidence_level
+    }
+
+@instrument()
 def detect_seasonality(y, freq='monthly'):
     """Detect seasonal patterns in the data"""
     if len(y) < 24:  # Need at least 2 years of monthly data
@@ -159,6 +418,7 @@ def detect_seasonality(y, freq='monthly'):
     
     return seasonal_data
 
+@instrument()
 def trend_analysis(y):
     """Analyze trend in the data"""
     if len(y) < 3:
@@ -174,9 +434,49 @@ def trend_analysis(y):
     else:
         trend = 'stable'
     
+    y_mean = y.mean()
+    
+    return {
+        'trend': trend,
+        'slope': slope,
+        'intercept': intercept,
+        'change_rate': (slope / y_mean) * 100 if y_mean != 0 else 0
+    }
+
+@instrument()
+def trend_analysis_batch(Y):
+    """
+    Analyze the trend of many series at once
+    
+    Solves the least-squares line for every row of `Y` (n_series, n_obs) in
+    closed form. NaNs are ignored, so rows may have different lengths.
+    Returns the same keys as `trend_analysis` with one array entry per row;
+    intercepts are at each row's first observation, as for the unpadded series.
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    slope, intercept, n = _least_squares_batch(Y)
+    # Leading NaN padding depends on the other rows in the batch
+    leading_nans = (np.cumsum(~np.isnan(Y), axis=1) == 0).sum(axis=1)
+    intercept = intercept + slope * leading_nans
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        y_mean = np.nansum(Y, axis=1) / n
+        change_rate = np.where(y_mean != 0, (slope / y_mean) * 100, 0.0)
+    
+    sufficient = n >= 3
+    slope = np.where(sufficient, slope, 0.0)
+    intercept = np.where(sufficient, intercept, np.nan)
+    change_rate = np.where(sufficient, change_rate, 0.0)
+    
+    trend = np.select(
+        [~sufficient, slope > 0, slope < 0],
+        ['insufficient_data', 'increasing', 'decreasing'],
+        default='stable'
+    )
+    
     return {
         'trend': trend,
         'slope': slope,
         'intercept': intercept,
-        'change_rate': (slope / y.mean()) * 100 if y.mean() != 0 else 0
+        'change_rate': change_rate
     }
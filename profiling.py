@@ -0,0 +1,86 @@
+"""
+On-demand cProfile profiling of Streamlit reruns
+
+Enable it for one browser session by opening the app with `?profile=1`,
+or for every session by starting the server with MARKET_MAVEN_PROFILE=1.
+Each rerun is then run under cProfile; the sidebar shows the hottest
+functions of the latest rerun of each page and offers the raw profile as a
+.prof file for snakeviz or `python -m pstats`.
+
+cProfile can only profile one thread at a time, so when several sessions
+rerun concurrently the later ones run unprofiled rather than wait.
+"""
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import threading
+import time
+
+_active = threading.Lock()
+
+def profiling_requested(query_params=None):
+    """True when the env var or the session's `profile` query parameter asks for profiling"""
+    if os.environ.get('MARKET_MAVEN_PROFILE') == '1':
+        return True
+    return query_params is not None and query_params.get('profile') in ('1', 'true')
+
+class RerunProfiler:
+    """
+    Profile one rerun
+
+        profiler = RerunProfiler()
+        if profiler.start():
+            ...
+            result = profiler.stop()
+    """
+
+    def __init__(self):
+        self.profile = None
+        self.started = None
+
+    def start(self):
+        """Start profiling; returns False if another session holds the profiler"""
+        if not _active.acquire(blocking=False):
+            return False
+        self.profile = cProfile.Profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Another profiling tool (e.g. a debugger) is already active
+            self.profile = None
+            _active.release()
+            return False
+        self.started = time.perf_counter()
+        return True
+
+    def stop(self, limit=25):
+        """Stop profiling; returns a dict with the hotspots table and the .prof bytes"""
+        if self.profile is None:
+            return None
+        self.profile.disable()
+        elapsed = time.perf_counter() - self.started
+        _active.release()
+
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        self.profile = None
+        return {
+            'wall_seconds': elapsed,
+            'hotspots': hotspots(stats, limit),
+            'prof': marshal.dumps(stats.stats)
+        }
+
+def hotspots(stats, limit=25):
+    """Functions with the most time spent in their own code, as rows for a table"""
+    rows = []
+    for (filename, line, name), (_, calls, total_time, cumulative_time, _) in stats.stats.items():
+        rows.append({
+            'function': name,
+            'location': f"{os.path.basename(filename)}:{line}",
+            'calls': calls,
+            'own_seconds': total_time,
+            'cumulative_seconds': cumulative_time
+        })
+    rows.sort(key=lambda row: row['own_seconds'], reverse=True)
+    return rows[:limit]
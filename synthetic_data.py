@@ -0,0 +1,261 @@
+"""
+Synthetic supermarket sales for load and scale testing
+
+Generates transactions with the same columns as supermarket_sales.csv
+(Invoice ID, Branch, City, Customer type, Gender, Product line, Unit price,
+Quantity, Tax 5%, Total, Date, Time, Payment, cogs, gross margin percentage,
+gross income, Rating). Daily volume follows a configurable trend with weekly
+and yearly seasonality, and products have skewed popularity.
+
+Files are written chunk by chunk, so memory stays bounded by the chunk size
+whatever the row count:
+    python synthetic_data.py sales.parquet --rows 100000000 --chunk-size 1000000
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BRANCH_CITIES = {'A': 'Yangon', 'B': 'Mandalay', 'C': 'Naypyitaw'}
+PRODUCT_LINES = [
+    'Health and beauty', 'Electronic accessories', 'Home and lifestyle',
+    'Sports and travel', 'Food and beverages', 'Fashion accessories'
+]
+PAYMENTS = ['Ewallet', 'Cash', 'Credit card']
+# Relative weekday volume, Monday first
+WEEKLY_PROFILE = np.array([0.9, 0.85, 0.9, 0.95, 1.05, 1.25, 1.1])
+
+def product_names(n_products):
+    """The sample's product lines, extended with numbered lines beyond six"""
+    names = PRODUCT_LINES[:n_products]
+    names += [f"Product line {i}" for i in range(len(names) + 1, n_products + 1)]
+    return names
+
+def _labels(width, count):
+    """Zero-padded labels '00', '01', ... as an object array for fast lookup"""
+    return np.array([str(i).zfill(width) for i in range(count)], dtype=object)
+
+def _invoice_parts(row_numbers):
+    """Numeric parts of unique ids like the sample's 750-67-8428, for up to 10^9 rows"""
+    numbers = (row_numbers * 387_420_489 + 750_678_428) % 1_000_000_000
+    return numbers // 1_000_000, numbers // 10_000 % 100, numbers % 10_000
+
+def _invoice_ids(first, middle, last):
+    return (_labels(3, 1000)[first] + '-' +
+            _labels(2, 100)[middle] + '-' +
+            _labels(4, 10_000)[last])
+
+class SalesGenerator:
+    """
+    Vectorized generator of supermarket transactions
+
+    Parameters:
+    - start: first transaction date
+    - n_days: length of the history in days
+    - n_products: number of product lines (the sample has 6)
+    - trend: relative growth of daily volume over the whole history (0.2 = +20%)
+    - weekly_seasonality: strength of the weekday pattern (0 disables it)
+    - yearly_seasonality: amplitude of the yearly cycle, peaking in December
+    - seed: random seed; output is reproducible for the same row count and chunk size
+    """
+
+    def __init__(self, start='2019-01-01', n_days=365, n_products=6, trend=0.2,
+                 weekly_seasonality=1.0, yearly_seasonality=0.15, seed=0):
+        self.start = pd.Timestamp(start)
+        self.n_days = n_days
+        self.seed = seed
+
+        days = self.start + pd.to_timedelta(np.arange(n_days), unit='D')
+        self.day_labels = np.array([f"{d.month}/{d.day}/{d.year}" for d in days], dtype=object)
+        minute = np.arange(24 * 60)
+        self.time_labels = _labels(2, 24)[minute // 60] + ':' + _labels(2, 60)[minute % 60]
+
+        # Daily transaction intensity
+        position = np.arange(n_days) / max(n_days - 1, 1)
+        weekly = 1 + weekly_seasonality * (WEEKLY_PROFILE[days.dayofweek.to_numpy()] - 1)
+        yearly = 1 + yearly_seasonality * np.cos(2 * np.pi * (days.dayofyear.to_numpy() - 350) / 365.25)
+        intensity = (1 + trend * position) * weekly * yearly
+        self.day_cdf = np.cumsum(intensity) / intensity.sum()
+
+        # Skewed product popularity and per-product price levels
+        rng = np.random.default_rng(seed)
+        self.products = np.array(product_names(n_products), dtype=object)
+        popularity = 1 / np.arange(1, n_products + 1) ** 0.8
+        self.product_cdf = np.cumsum(popularity) / popularity.sum()
+        self.base_price = np.exp(rng.normal(np.log(50), 0.4, n_products))
+
+    def _columns(self, n_rows, first_row, chunk_index):
+        """
+        Column values of one chunk
+
+        Text columns are returned as (codes, labels) pairs so each output
+        format can materialize them in the cheapest way; the invoice ids as
+        the three numeric parts of 'ddd-dd-dddd'.
+        """
+        rng = np.random.default_rng([self.seed, chunk_index])
+
+        day = np.searchsorted(self.day_cdf, rng.random(n_rows), side='right')
+        day = np.minimum(day, self.n_days - 1)
+        product = np.searchsorted(self.product_cdf, rng.random(n_rows), side='right')
+        product = np.minimum(product, len(self.products) - 1)
+        branch = rng.integers(0, len(BRANCH_CITIES), n_rows)
+        branches = list(BRANCH_CITIES)
+
+        unit_price = np.round(self.base_price[product] * rng.uniform(0.6, 1.6, n_rows), 2)
+        unit_price = np.clip(unit_price, 10, 100)
+        quantity = np.minimum(rng.geometric(0.2, n_rows), 10)
+        cogs = np.round(unit_price * quantity, 2)
+        tax = np.round(cogs * 0.05, 4)
+        # Shopping hours 10:00-20:59, busier in the evening
+        minutes = (10 * 60 + rng.triangular(0, 8 * 60, 11 * 60, n_rows)).astype(np.int64)
+
+        return {
+            'Invoice ID': _invoice_parts(np.arange(first_row, first_row + n_rows)),
+            'Branch': (branch, branches),
+            'City': (branch, [BRANCH_CITIES[b] for b in branches]),
+            'Customer type': ((rng.random(n_rows) < 0.5).astype(np.int8), ['Normal', 'Member']),
+            'Gender': ((rng.random(n_rows) < 0.5).astype(np.int8), ['Male', 'Female']),
+            'Product line': (product, self.products),
+            'Unit price': unit_price,
+            'Quantity': quantity,
+            'Tax 5%': tax,
+            'Total': cogs + tax,
+            'Date': (day, self.day_labels),
+            'Time': (minutes, self.time_labels),
+            'Payment': (rng.integers(0, len(PAYMENTS), n_rows), PAYMENTS),
+            'cogs': cogs,
+            'gross margin percentage': np.full(n_rows, 4.761904762),
+            'gross income': tax,
+            'Rating': np.round(rng.uniform(4, 10, n_rows), 1)
+        }
+
+    def chunk(self, n_rows, first_row=0, chunk_index=0):
+        """
+        Generate one chunk of transactions as a DataFrame
+
+        `first_row` offsets the invoice numbers so ids stay unique across
+        chunks; `chunk_index` selects the chunk's random stream.
+        """
+        columns = self._columns(n_rows, first_row, chunk_index)
+        data = {}
+        for name, values in columns.items():
+            if name == 'Invoice ID':
+                data[name] = _invoice_ids(*values)
+            elif isinstance(values, tuple):
+                codes, labels = values
+                data[name] = np.asarray(labels, dtype=object)[codes]
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+    def arrow_chunk(self, n_rows, first_row=0, chunk_index=0):
+        """Same chunk as `chunk`, built directly as a pyarrow Table of plain strings and numbers"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        columns = self._columns(n_rows, first_row, chunk_index)
+        arrays = {}
+        for name, values in columns.items():
+            if name == 'Invoice ID':
+                parts = [
+                    pa.array(_labels(width, 10 ** width), pa.string()).take(pa.array(part))
+                    for part, width in zip(values, (3, 2, 4))
+                ]
+                arrays[name] = pc.binary_join_element_wise(*parts, '-')
+            elif isinstance(values, tuple):
+                codes, labels = values
+                dictionary = pa.array(np.asarray(labels, dtype=object), pa.string())
+                arrays[name] = dictionary.take(pa.array(codes))
+            else:
+                arrays[name] = pa.array(values)
+        return pa.table(arrays)
+
+    def chunks(self, n_rows, chunk_size=1_000_000, arrow=False):
+        """Yield chunks of at most chunk_size rows until n_rows are produced"""
+        make_chunk = self.arrow_chunk if arrow else self.chunk
+        for chunk_index, first_row in enumerate(range(0, n_rows, chunk_size)):
+            yield make_chunk(min(chunk_size, n_rows - first_row), first_row, chunk_index)
+
+def generate_sales(n_rows, chunk_size=1_000_000, **params):
+    """Generate transactions in memory; params are passed to SalesGenerator"""
+    generator = SalesGenerator(**params)
+    chunks = list(generator.chunks(n_rows, chunk_size))
+    if len(chunks) == 1:
+        return chunks[0]
+    return pd.concat(chunks, ignore_index=True)
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def write_sales(filepath, n_rows, chunk_size=1_000_000, **params):
+    """
+    Stream transactions to a CSV or Parquet file chunk by chunk
+
+    Only one chunk is held in memory at a time. Parquet needs pyarrow; CSV
+    uses pyarrow's writer when installed and pandas otherwise.
+    Returns the number of rows written.
+    """
+    generator = SalesGenerator(**params)
+
+    if filepath.endswith('.parquet') or _has_pyarrow():
+        if filepath.endswith('.parquet'):
+            from pyarrow.parquet import ParquetWriter as Writer
+        else:
+            from pyarrow.csv import CSVWriter as Writer
+
+        writer = None
+        try:
+            for table in generator.chunks(n_rows, chunk_size, arrow=True):
+                if writer is None:
+                    writer = Writer(filepath, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(filepath, 'w', newline='') as f:
+            for chunk_index, df in enumerate(generator.chunks(n_rows, chunk_size)):
+                df.to_csv(f, header=chunk_index == 0, index=False)
+
+    return n_rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic supermarket sales")
+    parser.add_argument('output', help="Output file; .parquet or .csv")
+    parser.add_argument('--rows', type=float, default=1_000_000, help="Number of transactions (default: 1e6)")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000,
+                        help="Rows generated and written at a time (default: 1000000)")
+    parser.add_argument('--start', default='2019-01-01', help="First date (default: 2019-01-01)")
+    parser.add_argument('--days', type=int, default=365, help="Days of history (default: 365)")
+    parser.add_argument('--products', type=int, default=6, help="Number of product lines (default: 6)")
+    parser.add_argument('--trend', type=float, default=0.2,
+                        help="Volume growth over the history, 0.2 = +20%% (default: 0.2)")
+    parser.add_argument('--weekly-seasonality', type=float, default=1.0,
+                        help="Weekday pattern strength, 0 disables (default: 1.0)")
+    parser.add_argument('--yearly-seasonality', type=float, default=0.15,
+                        help="Yearly cycle amplitude (default: 0.15)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    n_rows = write_sales(
+        args.output, int(args.rows), args.chunk_size,
+        start=args.start,
+        n_days=args.days,
+        n_products=args.products,
+        trend=args.trend,
+        weekly_seasonality=args.weekly_seasonality,
+        yearly_seasonality=args.yearly_seasonality,
+        seed=args.seed
+    )
+    print(f"Wrote {n_rows:,} rows to {args.output} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
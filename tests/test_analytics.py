@@ -0,0 +1,61 @@
+"""The DuckDB analytics backend checked against the pandas one"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics import PandasBackend, DuckDBBackend, get_backend
+
+pytest.importorskip('duckdb')
+
+def sales(n=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2023-01-01', '2024-06-30', freq='D').strftime('%m/%d/%Y')
+    return pd.DataFrame({
+        'Date': rng.choice(dates, n),
+        'Product line': rng.choice(['Food', 'Health', 'Sports', "Men's wear"], n),
+        'Total': rng.gamma(2.0, 150.0, n).round(2),
+    })
+
+@pytest.fixture(params=['frame', 'parquet'])
+def backends(request, tmp_path):
+    df = sales()
+    if request.param == 'frame':
+        return PandasBackend(df), DuckDBBackend(df)
+    path = tmp_path / 'sales.parquet'
+    df.to_parquet(path, index=False)
+    return PandasBackend(df), DuckDBBackend(str(path))
+
+def test_columns_and_describe(backends):
+    expected, duck = backends
+    assert duck.columns() == expected.columns()
+    assert duck.describe('Total') == pytest.approx(expected.describe('Total'))
+    assert duck.nunique('Product line') == expected.nunique('Product line')
+
+def test_group_sum(backends):
+    expected, duck = backends
+    pd.testing.assert_series_equal(duck.group_sum('Product line', 'Total'),
+                                   expected.group_sum('Product line', 'Total'),
+                                   check_dtype=False, check_index_type=False)
+
+def test_daily_sum_and_monthly_mean(backends):
+    expected, duck = backends
+    daily = duck.daily_sum('Date', 'Total')
+    pd.testing.assert_frame_equal(daily, expected.daily_sum('Date', 'Total'), check_dtype=False)
+    assert len(daily) == pd.to_datetime(expected.df['Date'], format='%m/%d/%Y').nunique()
+    pd.testing.assert_series_equal(duck.monthly_mean('Date', 'Total'),
+                                   expected.monthly_mean('Date', 'Total'),
+                                   check_dtype=False, check_names=False, check_index_type=False)
+
+def test_unparseable_and_missing_dates_are_left_out():
+    df = pd.DataFrame({'Date': ['01/05/2024', 'soon', None, '01/05/2024'], 'Total': [1.0, 2.0, 4.0, 8.0]})
+    for backend in (PandasBackend(df), DuckDBBackend(df)):
+        assert backend.daily_sum('Date', 'Total')['Sales'].tolist() == [9.0]
+        assert backend.monthly_mean('Date', 'Total').to_dict() == {1: 4.5}
+
+def test_get_backend_by_size(tmp_path):
+    df = sales(100)
+    assert get_backend(df).name == 'pandas'
+    assert get_backend(df, large_rows=100).name == 'duckdb'
+    path = tmp_path / 'sales.parquet'
+    df.to_parquet(path, index=False)
+    assert get_backend(str(path)).name == 'duckdb'
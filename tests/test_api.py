@@ -0,0 +1,63 @@
+"""Forecasting API requests and validation, through the ASGI app in-process"""
+import io
+
+import numpy as np
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+from starlette.testclient import TestClient
+
+from api import create_app
+from model import forecast_batch, pad_series
+
+SERIES = [float(value) for value in 100 + 10 * np.sin(np.arange(60))]
+
+@pytest.fixture(scope='module')
+def client():
+    with TestClient(create_app(workers=1)) as client:
+        yield client
+
+def test_health(client):
+    assert client.get('/health').json() == {'status': 'ok'}
+
+def test_forecast_matches_forecast_batch(client):
+    response = client.post('/forecast', json={'series': [SERIES, SERIES[:30]], 'periods': 7, 'method': 'linear_trend'})
+    assert response.status_code == 200
+    expected = forecast_batch(pad_series([np.array(SERIES), np.array(SERIES[:30])]), 7, method='linear_trend')
+    np.testing.assert_allclose(response.json()['forecast'], expected)
+
+def test_confidence_and_trend(client):
+    body = client.post('/forecast/confidence', json={'series': SERIES, 'confidence_level': 0.99}).json()
+    assert body['confidence_level'] == 0.99
+    assert np.all(np.array(body['lower_bound']) <= np.array(body['upper_bound']))
+    assert len(client.post('/trend', json={'series': [SERIES, SERIES]}).json()['slope']) == 2
+
+def test_arrow_stream_with_query_parameters(client):
+    pa = pytest.importorskip('pyarrow')
+    sink = io.BytesIO()
+    table = pa.table({'a': SERIES, 'b': SERIES})
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = client.post('/forecast?periods=5', content=sink.getvalue(),
+                           headers={'content-type': 'application/vnd.apache.arrow.stream'})
+    assert response.status_code == 200
+    assert np.array(response.json()['forecast']).shape == (2, 5)
+
+@pytest.mark.parametrize('periods', [7.9, 7.0, True, '7.5', 'seven', None, [7], 0, 3651, -1])
+def test_invalid_periods_are_rejected(client, periods):
+    response = client.post('/forecast', json={'series': SERIES, 'periods': periods})
+    assert response.status_code == 400
+    assert 'periods' in response.json()['error']
+
+def test_overflowing_periods_are_rejected(client):
+    # Python's json parses 1e400 as inf
+    response = client.post('/forecast', content=b'{"series": [1, 2, 3], "periods": 1e400}',
+                           headers={'content-type': 'application/json'})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('body', [{'series': []}, {'series': ['a']}, {'series': SERIES, 'method': 'magic'},
+                                  {'series': SERIES, 'confidence_level': 0.5}])
+def test_invalid_bodies_are_rejected(client, body):
+    path = '/forecast/confidence' if 'confidence_level' in body else '/forecast'
+    assert client.post(path, json=body).status_code == 400
@@ -0,0 +1,33 @@
+"""The Streamlit app driven headlessly with AppTest"""
+import pytest
+from streamlit.testing.v1 import AppTest
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setenv('MARKET_MAVEN_DATA_FILE', 'supermarket_sales.csv')
+    monkeypatch.delenv('MARKET_MAVEN_STORE', raising=False)
+    at = AppTest.from_file('../app.py', default_timeout=60).run()
+    assert not at.exception
+    return at
+
+def test_forecast_settings_apply_on_submit(app):
+    app.selectbox[0].select("📈 Forecast").run()
+    settings = {widget.label: widget for widget in app.selectbox}
+    settings['Forecast Period'].select('Next 7 days')
+    settings['Smoothing Method'].select('Holt-Winters').run()
+    # The form holds the changes until it is submitted
+    assert 'forecast' not in app.session_state
+
+    next(button for button in app.button if button.label == '🔮 Generate Forecast').click().run()
+    assert not app.exception
+    assert len(app.session_state.forecast) == 7
+    assert (app.session_state.forecast >= 0).all()
+
+    # Changing a setting afterwards keeps the forecast until the next submit
+    {widget.label: widget for widget in app.selectbox}['Forecast Period'].select('Next 30 days').run()
+    assert app.session_state.forecast_period == 7
+
+@pytest.mark.parametrize('page', ["🏠 Home", "💡 Insights", "📊 Analytics", "ℹ️ About"])
+def test_pages_render(app, page):
+    app.selectbox[0].select(page).run()
+    assert not app.exception
@@ -0,0 +1,55 @@
+"""ForecastBatcher results per caller, checked against unbatched forecasts"""
+import threading
+
+import numpy as np
+import pytest
+
+from batching import ForecastBatcher
+from model import forecast_with_confidence_batch, pad_series, trend_analysis_batch
+
+def series(seed, n):
+    return 100 + np.random.default_rng(seed).normal(0, 10, n).cumsum()
+
+@pytest.fixture
+def batcher():
+    batcher = ForecastBatcher(max_wait=0.05, max_batch_size=1000)
+    yield batcher
+    batcher.close()
+
+def test_concurrent_requests_share_a_batch(batcher):
+    inputs = [series(seed, 30 + seed) for seed in range(12)]
+    results = [None] * len(inputs)
+    def request(i):
+        results[i] = batcher.forecast(inputs[i], 7, method='linear_trend', timeout=30)
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = forecast_with_confidence_batch(pad_series(inputs), 7, method='linear_trend')['forecast']
+    np.testing.assert_allclose(np.array(results), expected)
+    assert batcher.stats['requests'] == 12
+    assert batcher.stats['batches'] < 12
+
+def test_requests_with_different_parameters_are_not_mixed(batcher):
+    y = series(0, 40)
+    moving = batcher.submit('forecast', (5, 'moving_average', 0.95), [y])
+    trend = batcher.submit('forecast', (3, 'linear_trend', 0.99), [y, y])
+    slopes = batcher.submit('trend', (), [y])
+    assert moving.result(30)['forecast'].shape == (1, 5)
+    result = trend.result(30)
+    assert result['forecast'].shape == (2, 3)
+    np.testing.assert_allclose(
+        result['upper_bound'],
+        forecast_with_confidence_batch(pad_series([y, y]), 3, confidence_level=0.99, method='linear_trend')['upper_bound']
+    )
+    np.testing.assert_allclose(slopes.result(30)['slope'], trend_analysis_batch(pad_series([y]))['slope'])
+
+def test_errors_reach_every_caller(batcher):
+    # Malformed parameters fail inside the batch call
+    future = batcher.submit('forecast', (5,), [series(1, 20)])
+    with pytest.raises(ValueError):
+        future.result(30)
+    # The dispatcher keeps serving later requests
+    assert batcher.forecast(series(2, 20), 4, timeout=30).shape == (4,)
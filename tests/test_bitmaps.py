@@ -0,0 +1,52 @@
+"""RowBitmap set operations checked against boolean masks"""
+import numpy as np
+import pytest
+
+from bitmaps import CHUNK_SIZE, RowBitmap
+
+N_ROWS = 5 * CHUNK_SIZE + 123
+
+def random_mask(seed):
+    # Densities per chunk on both sides of the array/bitmap container cut-off
+    rng = np.random.default_rng(seed)
+    densities = np.repeat(rng.choice([0.0, 0.01, 0.05, 0.3, 1.0], 6), CHUNK_SIZE)[:N_ROWS]
+    return rng.random(N_ROWS) < densities
+
+def rows(mask):
+    return np.flatnonzero(mask)
+
+@pytest.mark.parametrize('seed', range(6))
+def test_operations_match_masks(seed):
+    a, b = random_mask(seed), random_mask(seed + 100)
+    left, right = RowBitmap.from_mask(a), RowBitmap.from_mask(b)
+    np.testing.assert_array_equal(left.to_rows(), rows(a))
+    np.testing.assert_array_equal((left & right).to_rows(), rows(a & b))
+    np.testing.assert_array_equal((left | right).to_rows(), rows(a | b))
+    np.testing.assert_array_equal((left - right).to_rows(), rows(a & ~b))
+    np.testing.assert_array_equal((right - left).to_rows(), rows(b & ~a))
+    assert len(left & right) == (a & b).sum()
+    probe = np.arange(0, N_ROWS, 7)
+    np.testing.assert_array_equal(left.contains(probe), a[probe])
+
+def test_from_rows_matches_from_mask():
+    mask = random_mask(3)
+    np.testing.assert_array_equal(RowBitmap.from_rows(rows(mask)).to_rows(), RowBitmap.from_mask(mask).to_rows())
+
+def test_disjoint_dense_sets():
+    even = np.arange(N_ROWS) % 2 == 0
+    left, right = RowBitmap.from_mask(even), RowBitmap.from_mask(~even)
+    assert len(left & right) == 0
+    assert (left & right).to_rows().size == 0
+    assert len((left & right).keys) == 0
+    assert len(left - left) == 0
+    np.testing.assert_array_equal((left | right).to_rows(), np.arange(N_ROWS))
+    np.testing.assert_array_equal((left - right).to_rows(), rows(even))
+
+def test_empty_sets():
+    empty = RowBitmap()
+    full = RowBitmap.from_mask(np.ones(N_ROWS, dtype=bool))
+    assert len(empty & full) == 0
+    assert len(full - full) == 0
+    np.testing.assert_array_equal((empty | full).to_rows(), np.arange(N_ROWS))
+    np.testing.assert_array_equal((full - empty).to_rows(), np.arange(N_ROWS))
+    assert not empty.contains([0, 1]).any()
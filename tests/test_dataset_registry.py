@@ -0,0 +1,54 @@
+"""DatasetRegistry: one parse per content, isolated views, eviction"""
+import threading
+import time
+
+import pandas as pd
+
+from dataset_registry import DatasetRegistry, content_id
+
+def frame():
+    return pd.DataFrame({'Product line': ['Food', 'Sports', 'Food'], 'Total': [1.0, 2.0, 3.0]})
+
+def test_identical_bytes_are_parsed_once():
+    registry = DatasetRegistry()
+    calls = []
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return frame(), {'rows': 3}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_or_load(b'data', loader))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert {dataset_id for dataset_id, _ in results} == {content_id(b'data')}
+    assert registry.stats == {'hits': 3, 'loads': 1, 'evictions': 0}
+    assert registry.metadata(content_id(b'data')) == {'rows': 3}
+
+def test_views_do_not_change_the_cached_dataset():
+    registry = DatasetRegistry()
+    dataset_id, view = registry.get_or_load(b'data', frame)
+    view.loc[0, 'Total'] = 100.0
+    view['Extra'] = 1
+    cached = registry.get(dataset_id)
+    pd.testing.assert_frame_equal(cached, frame())
+
+def test_variants_are_separate_datasets():
+    registry = DatasetRegistry()
+    first, _ = registry.get_or_load(b'book', frame, variant='Sheet1')
+    second, _ = registry.get_or_load(b'book', lambda: frame().head(1), variant='Sheet2')
+    assert first != second
+    assert len(registry.get(second)) == 1
+
+def test_least_recently_used_is_evicted():
+    size = int(frame().memory_usage(deep=True).sum())
+    registry = DatasetRegistry(max_bytes=2 * size)
+    a, _ = registry.get_or_load(b'a', frame)
+    b, _ = registry.get_or_load(b'b', frame)
+    registry.get(a)
+    registry.get_or_load(b'c', frame)
+    assert registry.get(b) is None
+    assert registry.get(a) is not None
+    assert registry.stats['evictions'] == 1
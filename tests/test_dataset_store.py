@@ -0,0 +1,98 @@
+"""DatasetStore appends, windowed reads and aggregates checked against pandas"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_store import DatasetStore
+
+def batch(seed, start, days, n=2_000):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Invoice ID': [f"{seed}-{i}" for i in range(n)],
+        'Branch': rng.choice(['A', 'B', 'C'], n),
+        'Product line': rng.choice(['Food', 'Sports', 'Health'], n),
+        'Date': (pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days, n), unit='D')).strftime('%Y-%m-%d'),
+        'Total': rng.gamma(2.0, 100.0, n)
+    })
+
+@pytest.fixture
+def history():
+    return [batch(1, '2024-01-01', 60), batch(2, '2024-03-01', 45), batch(3, '2024-04-10', 5)]
+
+@pytest.fixture
+def store(tmp_path, history):
+    store = DatasetStore(str(tmp_path / 'store'), partition_cols=['Branch'])
+    for i, df in enumerate(history):
+        assert store.append(df, batch_id=f"batch-{i}") == len(df)
+    return store
+
+def sort_rows(df):
+    return df.sort_values('Invoice ID').reset_index(drop=True)
+
+def test_read_returns_every_row(store, history):
+    expected = pd.concat(history, ignore_index=True)
+    assert store.rows == len(expected)
+    pd.testing.assert_frame_equal(sort_rows(store.read()), sort_rows(expected), check_dtype=False)
+
+def test_reopened_store_and_repeated_batch(store, history):
+    reopened = DatasetStore(store.root)
+    assert reopened.version == store.version
+    assert reopened.append(history[0], batch_id='batch-0') == 0
+    assert reopened.rows == store.rows
+
+@pytest.mark.parametrize('start, end', [('2024-02-15', '2024-03-10'), ('2024-04-12', None), (None, '2024-01-03')])
+def test_window_matches_pandas(store, history, start, end):
+    all_rows = pd.concat(history, ignore_index=True)
+    days = pd.to_datetime(all_rows['Date'])
+    mask = pd.Series(True, index=all_rows.index)
+    if start:
+        mask &= days >= start
+    if end:
+        mask &= days <= end
+    expected = all_rows[mask]
+    pd.testing.assert_frame_equal(sort_rows(store.read(start=start, end=end)), sort_rows(expected), check_dtype=False)
+    backend = store.backend(start, end)
+    assert backend.describe('Total')['sum'] == pytest.approx(expected['Total'].sum())
+    assert backend.group_sum('Product line', 'Total').to_dict() == pytest.approx(
+        expected.groupby('Product line')['Total'].sum().to_dict())
+
+def test_plan_prunes_parts(store):
+    assert len(store.plan('2024-04-10', '2024-04-14')) < len(store.plan())
+
+def test_where_on_partition_column(store, history):
+    expected = pd.concat(history, ignore_index=True).query("Branch == 'B'")
+    pd.testing.assert_frame_equal(sort_rows(store.read(where={'Branch': ['B']})), sort_rows(expected), check_dtype=False)
+
+def test_date_range_of_a_batch(store):
+    assert store.date_range('batch-2') == (pd.Timestamp('2024-04-10'), pd.Timestamp('2024-04-14'))
+    assert store.date_range('missing') is None
+
+def test_store_without_dates(tmp_path):
+    store = DatasetStore(str(tmp_path / 'store'))
+    df = pd.DataFrame({'Product line': ['Food', 'Sports', 'Food'], 'Total': [1.0, 2.0, 3.0]})
+    store.append(df)
+    assert store.manifest['date_col'] is None
+    assert store.date_range() is None
+    pd.testing.assert_frame_equal(store.read(), df)
+    pd.testing.assert_frame_equal(store.read(start='2024-01-01', end='2024-01-31'), df)
+    assert store.backend().describe('Total')['sum'] == 6.0
+
+def test_unwindowed_read_keeps_undated_rows(tmp_path):
+    store = DatasetStore(str(tmp_path / 'store'))
+    df = pd.DataFrame({'Date': ['2024-01-01', 'not a date', '2024-01-03'], 'Total': [1.0, 2.0, 3.0]})
+    store.append(df)
+    assert len(store.read()) == 3
+    assert store.backend().describe('Total')['count'] == 3
+    assert store.read(start='2024-01-01')['Total'].tolist() == [1.0, 3.0]
+
+def test_reader_in_another_process_sees_appends(store, history):
+    reader = DatasetStore(store.root)
+    stale = DatasetStore(store.root)
+    for seed in range(4, 9):
+        store.append(batch(seed, '2024-05-01', 3, n=100))
+    assert stale.version < store.version
+    # Its version's files have expired; it moves to the latest ones
+    assert stale.aggregates()['rows'].sum() == store.rows
+    assert reader.refresh().version == store.version
+    assert len(reader.read()) == store.rows
+    assert reader.sketch() is not None
@@ -0,0 +1,76 @@
+"""FilterIndex selections and cube answers checked against pandas masks"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterIndex
+
+@pytest.fixture(scope='module')
+def sales():
+    # Large enough for dense (bitmap) containers; every branch is in one city
+    rng = np.random.default_rng(0)
+    n = 200_000
+    branch = rng.choice(['A', 'B', 'C'], n, p=[0.5, 0.3, 0.2])
+    df = pd.DataFrame({
+        'Branch': branch,
+        'City': pd.Series(branch).map({'A': 'Yangon', 'B': 'Naypyitaw', 'C': 'Mandalay'}),
+        'Payment': rng.choice(['Cash', 'Card', 'Ewallet'], n),
+        'Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 90, n), unit='D'),
+        'Total': rng.gamma(2.0, 100.0, n),
+        'Invoice ID': np.arange(n).astype(str)
+    })
+    df.loc[rng.random(n) < 0.01, 'Payment'] = None
+    return df
+
+@pytest.fixture(scope='module')
+def index(sales):
+    return FilterIndex(sales, ['Branch', 'City', 'Payment'], 'Date', 'Total')
+
+def mask_for(df, filters, start=None, end=None):
+    mask = pd.Series(True, index=df.index)
+    for col, values in filters.items():
+        if values:
+            mask &= df[col].isin(values)
+    if start is not None:
+        mask &= df['Date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['Date'] <= pd.Timestamp(end)
+    return mask.to_numpy()
+
+CASES = [
+    ({'Branch': ['A']}, None, None),
+    ({'Branch': ['A', 'C'], 'Payment': ['Cash']}, None, None),
+    ({'Branch': ['A'], 'City': ['Mandalay']}, None, None),  # disjoint
+    ({'Branch': ['A'], 'City': ['Yangon'], 'Payment': ['Card', 'Ewallet']}, None, None),
+    ({'Payment': ['Cash']}, '2024-02-01', '2024-02-10'),
+    ({'Branch': ['B'], 'City': ['Yangon']}, '2024-01-05', None),  # disjoint and dated
+    ({}, '2024-03-01', '2024-03-31'),
+    ({'Branch': ['Z']}, None, None),  # value not in the data
+]
+
+@pytest.mark.parametrize('filters, start, end', CASES)
+def test_select_and_count_match_pandas(sales, index, filters, start, end):
+    expected = np.flatnonzero(mask_for(sales, filters, start, end))
+    np.testing.assert_array_equal(index.select(filters, start, end), expected)
+    assert index.count(filters, start, end) == len(expected)
+
+@pytest.mark.parametrize('filters, start, end', CASES)
+def test_backend_matches_pandas(sales, index, filters, start, end):
+    matching = sales[mask_for(sales, filters, start, end)]
+    backend = index.backend(sales, filters, start, end)
+    assert backend.describe('Total')['count'] == len(matching)
+    assert backend.describe('Total')['sum'] == pytest.approx(matching['Total'].sum())
+    by_branch = backend.group_sum('Branch', 'Total')
+    expected = matching.groupby('Branch')['Total'].sum()
+    assert by_branch.to_dict() == pytest.approx(expected.to_dict())
+    daily = backend.daily_sum('Date', 'Total')
+    assert daily['Sales'].sum() == pytest.approx(matching['Total'].sum())
+    # Not in the cube: answered from the selected rows
+    assert backend.nunique('Invoice ID') == matching['Invoice ID'].nunique()
+
+def test_unfiltered_select_is_none(index):
+    assert index.select({'Branch': []}) is None
+
+def test_rows_for_and_counts(sales, index):
+    np.testing.assert_array_equal(index.rows_for('Branch', ['A', 'C']), np.flatnonzero(sales['Branch'].isin(['A', 'C'])))
+    assert index.counts('Payment') == sales['Payment'].value_counts().to_dict()
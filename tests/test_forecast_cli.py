@@ -0,0 +1,61 @@
+"""forecast_cli end to end on small files, checked against the batch forecaster"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_utils import pivot_series
+from forecast_cli import main
+from model import forecast_batch
+from synthetic_data import generate_sales
+
+@pytest.fixture(scope='module')
+def sales():
+    return generate_sales(2_000, seed=3, n_days=60)
+
+@pytest.fixture(scope='module')
+def sales_csv(tmp_path_factory, sales):
+    path = tmp_path_factory.mktemp('cli') / 'sales.csv'
+    sales.to_csv(path, index=False)
+    return str(path)
+
+def test_forecast_per_product_line(tmp_path, sales_csv, sales):
+    output = str(tmp_path / 'out.csv')
+    assert main([sales_csv, '-o', output, '--horizon', '7', '--method', 'linear_trend']) == 0
+    result = pd.read_csv(output)
+    products = sorted(sales['Product line'].unique())
+    assert sorted(result['Product line'].unique()) == products
+    assert len(result) == 7 * len(products)
+    assert (result['Lower_Bound'] <= result['Forecast']).all() and (result['Forecast'] <= result['Upper_Bound']).all()
+
+    series = pivot_series(sales, ['Product line'], 'Date', 'Total')
+    expected = forecast_batch(series.to_numpy(), 7, method='linear_trend')
+    first = result.groupby('Product line', sort=True)['Forecast'].first()
+    np.testing.assert_allclose(first.to_numpy(), expected[:, 0])
+
+def test_overall_series_to_parquet(tmp_path, sales_csv):
+    output = str(tmp_path / 'out.parquet')
+    assert main([sales_csv, '-o', output, '--overall', '--horizon', '5']) == 0
+    assert len(pd.read_parquet(output)) == 5
+
+@pytest.mark.parametrize('sheet', ['1', 'Sales'])
+def test_sheet_by_position_or_name(tmp_path, sales, sheet):
+    workbook = tmp_path / 'book.xlsx'
+    with pd.ExcelWriter(workbook) as writer:
+        pd.DataFrame({'Note': ['cover sheet']}).to_excel(writer, sheet_name='Cover', index=False)
+        sales.head(300).to_excel(writer, sheet_name='Sales', index=False)
+    output = str(tmp_path / 'out.csv')
+    assert main([str(workbook), '--sheet', sheet, '-o', output, '--horizon', '3']) == 0
+    assert len(pd.read_csv(output)) == 3 * sales.head(300)['Product line'].nunique()
+
+def test_copies_of_one_file_warn_instead_of_failing(tmp_path, sales_csv, capsys):
+    copies = []
+    for name in ('a.csv', 'b.csv', 'c.csv'):
+        (tmp_path / name).write_bytes(open(sales_csv, 'rb').read())
+        copies.append(str(tmp_path / name))
+    output = str(tmp_path / 'out.csv')
+    assert main(copies + ['-o', output]) == 0
+    assert "duplicate values in 'Invoice ID'" in capsys.readouterr().err
+
+def test_missing_columns_fail(tmp_path, sales_csv, capsys):
+    assert main([sales_csv, '-o', str(tmp_path / 'out.csv'), '--group-by', 'Region']) == 1
+    assert "columns not found" in capsys.readouterr().err
@@ -0,0 +1,76 @@
+"""Stage records, totals and exported metrics"""
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import instrumentation
+from instrumentation import track, instrument
+
+@pytest.fixture(autouse=True)
+def clean_records():
+    instrumentation.reset()
+    yield
+    instrumentation.set_memory_tracing(False)
+    instrumentation.reset()
+
+def test_track_and_instrument_record_each_call():
+    @instrument()
+    def double(x):
+        return 2 * x
+
+    assert double(3) == 6
+    with track('load'):
+        pass
+    with pytest.raises(ValueError):
+        with track('load'):
+            raise ValueError
+
+    stages = [record['stage'] for record in instrumentation.get_records()]
+    assert stages == [f"{__name__}.test_track_and_instrument_record_each_call.<locals>.double", 'load', 'load']
+    totals = instrumentation.summarize()['load']
+    assert totals['count'] == 2
+    assert totals['failures'] == 1
+    assert totals['max_peak_memory_bytes'] is None
+    assert instrumentation.get_records('lo') == instrumentation.get_records()[1:]
+
+def test_nested_peaks_are_reported_to_the_enclosing_stage():
+    instrumentation.set_memory_tracing(True)
+    with track('outer'):
+        with track('inner'):
+            block = np.ones(4_000_000)
+            del block
+    totals = instrumentation.summarize()
+    # 32 MB allocated inside both stages
+    assert totals['inner']['max_peak_memory_bytes'] >= 32_000_000
+    assert totals['outer']['max_peak_memory_bytes'] >= totals['inner']['max_peak_memory_bytes']
+
+def test_totals_from_many_threads():
+    def work():
+        for _ in range(100):
+            with track('query'):
+                pass
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert instrumentation.summarize()['query']['count'] == 800
+
+def test_exports(tmp_path):
+    with track('render "page"'):
+        pass
+    prometheus = instrumentation.to_prometheus()
+    assert 'market_maven_stage_calls_total{stage="render \\"page\\""} 1' in prometheus
+    assert 'stage_max_peak_memory_bytes{' not in prometheus
+
+    path = tmp_path / 'metrics.prom'
+    instrumentation.write_metrics_file(str(path))
+    assert path.read_text() == prometheus
+    path = tmp_path / 'metrics.jsonl'
+    instrumentation.write_metrics_file(str(path))
+    assert [json.loads(line)['stage'] for line in path.read_text().splitlines()] == ['render "page"']
+    # Only the final files are left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['metrics.jsonl', 'metrics.prom']
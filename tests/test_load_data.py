@@ -0,0 +1,90 @@
+"""load_data on single files, several files and compressed files, checked against pandas"""
+import bz2
+import gzip
+import importlib.util
+import zipfile
+
+import pandas as pd
+import pytest
+
+from data_utils import load_data, expand_paths, StreamingValidator
+from synthetic_data import generate_sales
+
+@pytest.fixture(scope='module')
+def sales():
+    return generate_sales(3_000, seed=5)
+
+@pytest.fixture(scope='module')
+def exports(tmp_path_factory, sales):
+    directory = tmp_path_factory.mktemp('exports')
+    sales.iloc[:1_000].to_csv(directory / 'day1.csv', index=False)
+    sales.iloc[1_000:].to_csv(directory / 'day2.csv', index=False)
+    return directory
+
+def expected_csv(df, tmp_path):
+    df.to_csv(tmp_path / 'expected.csv', index=False)
+    return pd.read_csv(tmp_path / 'expected.csv')
+
+def test_single_csv_matches_pandas(exports):
+    pd.testing.assert_frame_equal(load_data(str(exports / 'day1.csv')), pd.read_csv(exports / 'day1.csv'))
+
+def test_file_name_with_glob_characters(tmp_path, sales):
+    path = tmp_path / 'sales [2024].csv'
+    sales.to_csv(path, index=False)
+    assert len(load_data(str(path))) == len(sales)
+    assert expand_paths(str(path)) == [str(path)]
+
+@pytest.mark.parametrize('source', ['glob', 'directory', 'list'])
+def test_several_files_are_concatenated(exports, sales, tmp_path, source):
+    paths = {
+        'glob': str(exports / 'day*.csv'),
+        'directory': str(exports),
+        'list': [str(exports / 'day1.csv'), str(exports / 'day2.csv')]
+    }[source]
+    pd.testing.assert_frame_equal(load_data(paths), expected_csv(sales, tmp_path))
+
+def test_mismatched_schemas_raise(tmp_path, sales):
+    sales.to_csv(tmp_path / 'a.csv', index=False)
+    sales.drop(columns=['Branch']).to_csv(tmp_path / 'b.csv', index=False)
+    with pytest.raises(ValueError, match="missing"):
+        load_data(str(tmp_path / '*.csv'))
+
+def test_missing_glob_raises(tmp_path):
+    with pytest.raises(ValueError):
+        load_data(str(tmp_path / 'nothing-*.csv'))
+
+def write_compressed(path, content):
+    name = path.name
+    if name.endswith('.gz'):
+        path.write_bytes(gzip.compress(content))
+    elif name.endswith('.bz2'):
+        path.write_bytes(bz2.compress(content))
+    elif name.endswith('.zip'):
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('sales.csv', content)
+    else:
+        import zstandard
+        path.write_bytes(zstandard.ZstdCompressor().compress(content))
+
+@pytest.mark.parametrize('extension', [
+    '.csv.gz', '.csv.bz2', '.zip',
+    pytest.param('.csv.zst', marks=pytest.mark.skipif(
+        importlib.util.find_spec('zstandard') is None, reason="zstandard not installed"))
+])
+def test_compressed_csv_matches_pandas(tmp_path, sales, extension):
+    path = tmp_path / f'sales{extension}'
+    write_compressed(path, sales.to_csv(index=False).encode())
+    validator = StreamingValidator()
+    df = load_data(str(path), validator=validator)
+    pd.testing.assert_frame_equal(df, expected_csv(sales, tmp_path))
+    assert validator.rows == len(sales)
+
+def test_prepared_arrow_file_is_mapped(tmp_path, sales):
+    from data_utils import save_prepared, load_prepared_sketch
+    path = str(tmp_path / 'sales.arrow')
+    save_prepared(sales, path)
+    df = load_data(path)
+    pd.testing.assert_frame_equal(df, sales)
+    # Numeric columns are the mapped file's memory, not private copies
+    assert not df['Total'].to_numpy().flags.writeable
+    assert load_prepared_sketch(path).describe('Total')['count'] == len(sales)
@@ -0,0 +1,75 @@
+"""Batched forecasts checked against per-series references, and Holt-Winters on awkward series"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from model import holt_winters_batch, forecast_batch, forecast_with_confidence_batch, pad_series
+
+METHODS = ['moving_average', 'exponential', 'linear_trend', 'holt_winters', 'holt_winters_multiplicative']
+
+def weekly_series(n, seed=0):
+    t = np.arange(n)
+    return 100 + 0.5 * t + 10 * np.sin(2 * np.pi * t / 7) + np.random.default_rng(seed).normal(0, 1, n)
+
+@pytest.mark.parametrize('method', METHODS)
+def test_padded_rows_forecast_like_the_series_alone(method):
+    series = [weekly_series(120), np.random.default_rng(1).gamma(2.0, 50.0, 400), weekly_series(9, seed=2)]
+    batched = forecast_batch(pad_series(series), 14, method=method)
+    for row, y in enumerate(series):
+        np.testing.assert_allclose(batched[row], forecast_batch(y[np.newaxis, :], 14, method=method)[0],
+                                   rtol=1e-9, atol=1e-9)
+
+def test_simple_methods_match_pandas_and_numpy():
+    y = weekly_series(120)
+    exponential = pd.Series(y).ewm(alpha=0.3, adjust=False).mean().iloc[-1]
+    np.testing.assert_allclose(forecast_batch(y[np.newaxis, :], 5, method='exponential')[0], exponential)
+
+    slope, intercept = np.polyfit(np.arange(120), y, 1)
+    np.testing.assert_allclose(forecast_batch(y[np.newaxis, :], 5, method='linear_trend')[0],
+                               intercept + slope * np.arange(120, 125))
+
+    recent_trend = (y[-1] - y[-10]) / 10
+    np.testing.assert_allclose(forecast_batch(y[np.newaxis, :], 5, method='moving_average')[0],
+                               y[-30:].mean() + recent_trend * np.arange(5))
+
+def test_holt_winters_follows_trend_and_season():
+    y = weekly_series(140)
+    t = np.arange(140, 154)
+    truth = 100 + 0.5 * t + 10 * np.sin(2 * np.pi * t / 7)
+    error = {method: np.abs(forecast_batch(y[np.newaxis, :], 14, method=method)[0] - truth).mean()
+             for method in ['moving_average', 'linear_trend', 'holt_winters']}
+    assert error['holt_winters'] < 3
+    assert error['holt_winters'] < min(error['moving_average'], error['linear_trend'])
+
+def test_confidence_bounds_use_the_sample_std():
+    series = [weekly_series(60), weekly_series(20, seed=3)]
+    result = forecast_with_confidence_batch(pad_series(series), 7, confidence_level=0.99)
+    for row, y in enumerate(series):
+        margin = 2.58 * pd.Series(y).std()
+        np.testing.assert_allclose(result['upper_bound'][row], result['forecast'][row] + margin)
+        np.testing.assert_allclose(result['lower_bound'][row], np.maximum(result['forecast'][row] - margin, 0))
+
+def test_multiplicative_long_series_stays_finite():
+    # Long noisy series used to diverge for some grid combinations, and the
+    # NaN error of those won the argmin
+    rng = np.random.default_rng(0)
+    y = rng.gamma(2.0, 150.0, 200_000)
+    result = holt_winters_batch(y[np.newaxis, :], 30, seasonal='multiplicative')
+    assert np.isfinite(result['forecast']).all()
+    assert np.isfinite(result['sse']).all()
+    assert result['forecast'].max() < 10 * y.max()
+
+def test_multiplicative_series_with_zeros_are_fitted_additively():
+    rng = np.random.default_rng(1)
+    Y = np.where(rng.random((6, 365)) < 0.8, 0.0, rng.gamma(2.0, 100.0, (6, 365)))
+    Y[0] = rng.gamma(2.0, 100.0, 365)  # one strictly positive series stays multiplicative
+    multiplicative = forecast_batch(Y, 14, method='holt_winters_multiplicative')
+    additive = forecast_batch(Y, 14, method='holt_winters')
+    assert np.isfinite(multiplicative).all()
+    assert multiplicative.max() < 10 * Y.max()
+    np.testing.assert_allclose(multiplicative[1:], additive[1:])
+
+def test_all_zero_and_empty_series():
+    Y = np.array([[0.0] * 30, [np.nan] * 30])
+    forecast = forecast_batch(Y, 7, method='holt_winters_multiplicative')
+    np.testing.assert_array_equal(forecast, 0.0)
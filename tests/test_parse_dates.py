@@ -0,0 +1,40 @@
+"""parse_dates checked against pd.to_datetime with the matching format"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_utils import parse_dates, infer_date_format
+
+DAYS = pd.Series(pd.date_range('2023-01-01', periods=400, freq='D'))
+
+@pytest.mark.parametrize('date_format', ['%m/%d/%Y', '%Y-%m-%d', '%d.%m.%Y', '%Y-%m-%d %H:%M:%S'])
+def test_formats_match_to_datetime(date_format):
+    # Repeated values, as in transaction data: each distinct one is parsed once
+    strings = DAYS.dt.strftime(date_format).sample(5_000, replace=True, random_state=0).reset_index(drop=True)
+    assert infer_date_format(strings) == date_format
+    pd.testing.assert_series_equal(parse_dates(strings), pd.to_datetime(strings, format=date_format),
+                                   check_dtype=False)
+
+def test_day_first_is_told_apart_by_the_data():
+    strings = pd.Series(['13/01/2024', '02/01/2024', '25/12/2023'])
+    assert infer_date_format(strings) == '%d/%m/%Y'
+    assert parse_dates(strings).tolist() == [pd.Timestamp('2024-01-13'), pd.Timestamp('2024-01-02'),
+                                             pd.Timestamp('2023-12-25')]
+
+def test_missing_and_unparseable_values_are_nat():
+    strings = pd.Series(['1/5/2019', None, 'not a date', '3/8/2019'], index=[10, 11, 12, 13], name='Date')
+    dates = parse_dates(strings)
+    assert dates.index.tolist() == [10, 11, 12, 13]
+    assert dates.name == 'Date'
+    assert dates.isna().tolist() == [False, True, True, False]
+    assert dates[13] == pd.Timestamp('2019-03-08')
+
+def test_time_column_is_added():
+    dates = parse_dates(pd.Series(['1/5/2019', '1/5/2019']), pd.Series(['13:08', '1:30 PM']))
+    assert dates.tolist() == [pd.Timestamp('2019-01-05 13:08'), pd.Timestamp('2019-01-05 13:30')]
+
+def test_datetime_and_explicit_format_inputs():
+    pd.testing.assert_series_equal(parse_dates(DAYS), DAYS)
+    strings = pd.Series(['2024|03|01'])
+    assert parse_dates(strings, date_format='%Y|%m|%d')[0] == pd.Timestamp('2024-03-01')
+    assert np.isnat(parse_dates(pd.Series([], dtype=object)).to_numpy()).all()
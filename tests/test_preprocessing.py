@@ -0,0 +1,83 @@
+"""Categorical encoders and the preprocessing pipeline checked against pandas"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_utils import CategoricalEncoder, PreprocessingPipeline, detect_columns, make_encoder, preprocess_dynamic
+
+TRAIN = pd.Series(['Food', 'Sports', None, 'Food', 'Health'])
+SCORE = pd.Series(['Health', 'Toys', 'Food', None])
+
+def test_ordinal_codes_follow_first_appearance():
+    encoder = CategoricalEncoder('ordinal').fit(TRAIN)
+    np.testing.assert_array_equal(encoder.transform(TRAIN), [0, 1, -1, 0, 2])
+    # Unseen and missing values are -1
+    np.testing.assert_array_equal(encoder.transform(SCORE), [2, -1, 0, -1])
+
+def test_onehot_matches_get_dummies():
+    encoder = CategoricalEncoder('onehot').fit(TRAIN)
+    matrix = encoder.transform(SCORE).toarray()
+    expected = pd.get_dummies(SCORE).reindex(columns=list(encoder.categories_), fill_value=False)
+    np.testing.assert_array_equal(matrix, expected.to_numpy(dtype=np.float32))
+    assert encoder.feature_names('Product line') == ['Product line=Food', 'Product line=Sports', 'Product line=Health']
+
+def test_hash_buckets_are_consistent():
+    encoder = CategoricalEncoder('hash', n_features=8).fit(TRAIN)
+    matrix = encoder.transform(pd.Series(['Food', 'Food', 'Toys', None])).toarray()
+    assert matrix.shape == (4, 8)
+    np.testing.assert_array_equal(matrix.sum(axis=1), [1, 1, 1, 0])
+    np.testing.assert_array_equal(matrix[0], matrix[1])
+    assert encoder.categories_ is None
+
+def test_auto_switches_on_cardinality():
+    small = pd.Series(['a', 'b'] * 10)
+    large = pd.Series([f"sku-{i}" for i in range(100)])
+    assert make_encoder(small, 'auto', max_onehot_categories=5).strategy == 'onehot'
+    assert make_encoder(large, 'auto', max_onehot_categories=5).strategy == 'hash'
+
+def test_unknown_strategy_raises():
+    with pytest.raises(ValueError):
+        CategoricalEncoder('target')
+
+def sales(seed, n=200):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Invoice ID': [f"{seed}-{i}" for i in range(n)],
+        'Date': pd.Series(pd.date_range('2024-01-01', periods=n, freq='D')).dt.strftime('%m/%d/%Y'),
+        'Product line': rng.choice(['Food', 'Sports', 'Health'], n).astype(object),
+        'Quantity': rng.integers(1, 10, n),
+        'Total': rng.gamma(2.0, 100.0, n)
+    })
+
+def test_pipeline_features():
+    df = sales(0)
+    X, y = PreprocessingPipeline.from_data(df).fit_transform(df)
+    assert list(X.columns) == ['Product line', 'Quantity', 'Year', 'Month', 'DayOfWeek', 'Quarter']
+    dates = pd.to_datetime(df['Date'], format='%m/%d/%Y')
+    np.testing.assert_array_equal(X['Month'], dates.dt.month)
+    np.testing.assert_array_equal(X['DayOfWeek'], dates.dt.dayofweek)
+    pd.testing.assert_series_equal(y, df['Total'])
+
+def test_pipeline_scores_new_batches_consistently(tmp_path):
+    train = sales(0)
+    pipeline = PreprocessingPipeline.from_data(train, encoding='onehot').fit(train)
+    pipeline.save(tmp_path / 'pipeline.joblib')
+    loaded = PreprocessingPipeline.load(tmp_path / 'pipeline.joblib')
+
+    batch = sales(1, n=20)
+    batch.loc[0, 'Product line'] = 'Toys'  # unseen category: an all-zero row
+    batch = batch.drop(columns=['Quantity'])  # missing column: filled with 0
+    X, _ = loaded.transform(batch)
+    assert X.shape == (20, len(pipeline.feature_cols))
+    dense = pd.DataFrame(X.toarray(), columns=pipeline.feature_cols)
+    assert (dense['Quantity'] == 0).all()
+    onehot = [col for col in pipeline.feature_cols if col.startswith('Product line=')]
+    assert dense.loc[0, onehot].sum() == 0
+    assert (dense.loc[1:, onehot].sum(axis=1) == 1).all()
+
+def test_preprocess_dynamic_reuses_encoders():
+    train, score = sales(0), sales(1, n=30)
+    columns = detect_columns(train)
+    _, _, encoders, _ = preprocess_dynamic(train, *columns)
+    X, _, _, _ = preprocess_dynamic(score, *columns, encoders=encoders)
+    np.testing.assert_array_equal(X['Product line'], encoders['Product line'].transform(score['Product line']))
@@ -0,0 +1,37 @@
+"""Rerun profiling, one profiled session at a time"""
+import marshal
+
+from profiling import RerunProfiler, profiling_requested
+
+def busy_loop():
+    return sum(i * i for i in range(200_000))
+
+def test_profile_of_a_rerun():
+    profiler = RerunProfiler()
+    assert profiler.start()
+    busy_loop()
+    result = profiler.stop(limit=5)
+
+    assert len(result['hotspots']) <= 5
+    # The .prof bytes are the raw pstats table that snakeviz and pstats load
+    assert 'busy_loop' in [name for (_, _, name) in marshal.loads(result['prof'])]
+    own = [row['own_seconds'] for row in result['hotspots']]
+    assert own == sorted(own, reverse=True)
+
+def test_second_session_runs_unprofiled():
+    first, second = RerunProfiler(), RerunProfiler()
+    assert first.start()
+    assert not second.start()
+    assert second.stop() is None
+    first.stop()
+    # Released again once the first rerun is done
+    assert second.start()
+    second.stop()
+
+def test_profiling_requested(monkeypatch):
+    monkeypatch.delenv('MARKET_MAVEN_PROFILE', raising=False)
+    assert not profiling_requested()
+    assert profiling_requested({'profile': '1'})
+    assert not profiling_requested({'profile': '0'})
+    monkeypatch.setenv('MARKET_MAVEN_PROFILE', '1')
+    assert profiling_requested()
@@ -0,0 +1,48 @@
+"""read_excel_fast gives the same frame as pd.read_excel with either engine"""
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_utils
+from data_utils import read_excel_fast, excel_sheet_names
+
+ENGINES = [
+    pytest.param(True, id='calamine', marks=pytest.mark.skipif(
+        not data_utils._has_calamine(), reason="python-calamine not installed")),
+    pytest.param(False, id='openpyxl')
+]
+
+@pytest.fixture(scope='module')
+def workbook(tmp_path_factory):
+    path = tmp_path_factory.mktemp('excel') / 'sales.xlsx'
+    rng = np.random.default_rng(0)
+    sales = pd.DataFrame({
+        'Date': pd.date_range('2024-01-01', periods=50, freq='D'),
+        'Timestamp': pd.date_range('2024-01-01 09:30', periods=50, freq='7h'),
+        'Product line': rng.choice(['Food', 'Sports'], 50),
+        'Quantity': rng.integers(1, 10, 50),
+        'Total': rng.gamma(2.0, 100.0, 50).round(2)
+    })
+    sales.loc[3, 'Date'] = pd.NaT
+    sales.loc[5, 'Total'] = np.nan
+    with pd.ExcelWriter(path) as writer:
+        sales.to_excel(writer, sheet_name='Sales', index=False)
+        pd.DataFrame({'Note': ['second sheet'], 'Day': [datetime.date(2024, 5, 1)]}).to_excel(
+            writer, sheet_name='Notes', index=False)
+    return str(path)
+
+@pytest.mark.parametrize('calamine', ENGINES)
+@pytest.mark.parametrize('sheet', [0, 'Sales', 1, 'Notes'])
+def test_matches_read_excel(workbook, monkeypatch, calamine, sheet):
+    monkeypatch.setattr(data_utils, '_has_calamine', lambda: calamine)
+    pd.testing.assert_frame_equal(read_excel_fast(workbook, sheet), pd.read_excel(workbook, sheet_name=sheet))
+
+@pytest.mark.parametrize('calamine', ENGINES)
+def test_file_object_and_sheet_names(workbook, monkeypatch, calamine):
+    monkeypatch.setattr(data_utils, '_has_calamine', lambda: calamine)
+    with open(workbook, 'rb') as f:
+        assert excel_sheet_names(f) == ['Sales', 'Notes']
+        df = read_excel_fast(f, 'Notes')
+    assert df['Day'].dtype == 'datetime64[us]'
@@ -0,0 +1,75 @@
+"""Sketches checked against exact pandas answers"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from sketches import HyperLogLog, QuantileSketch, DatasetSketch
+
+def sales(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Invoice ID': [f"{seed}-{i}" for i in range(n)],
+        'Product line': rng.choice(['Food', 'Health', 'Sports', 'Travel'], n),
+        'Quantity': rng.integers(1, 11, n),
+        'Total': rng.gamma(2.0, 150.0, n),
+    })
+
+@pytest.mark.parametrize('n', [0, 10, 1_000, 200_000])
+def test_distinct_count_within_a_few_percent(n):
+    values = pd.Series(np.arange(n) % max(n // 2, 1)).astype(str)
+    exact = values.nunique()
+    assert HyperLogLog().update(values).count() == pytest.approx(exact, rel=0.03, abs=1)
+
+def test_quantiles_within_one_percent_of_rank():
+    values = np.random.default_rng(1).lognormal(3, 1, 300_000)
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 30):
+        sketch.update(chunk)
+    qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(qs)) / len(values)
+    assert np.abs(ranks - qs).max() < 0.01
+    assert sketch.quantile(0) == values.min()
+    assert sketch.quantile(1) == values.max()
+    assert sketch.mean() == pytest.approx(values.mean())
+    assert sketch.std() == pytest.approx(pd.Series(values).std())
+
+def test_empty_and_missing_values():
+    sketch = QuantileSketch().update(pd.Series([None, 'x', np.nan]))
+    assert sketch.n == 0
+    assert np.isnan(sketch.quantile(0.5))
+    assert np.isnan(sketch.quantile([0.1, 0.9])).all()
+    assert np.isnan(sketch.mean())
+
+def test_dataset_sketch_matches_pandas():
+    df = sales(50_000, 0)
+    sketch = DatasetSketch()
+    for start in range(0, len(df), 8_192):
+        sketch.update(df.iloc[start:start + 8_192])
+
+    assert sketch.distinct_cols == ['Invoice ID', 'Product line', 'Quantity']
+    assert sketch.numeric_cols == ['Quantity', 'Total']
+    assert sketch.nunique('Product line') == 4
+    assert sketch.nunique('Invoice ID') == pytest.approx(len(df), rel=0.03)
+    assert sketch.nunique('Total') is None
+    assert sketch.quantile('Unknown', 0.5) is None
+
+    described = sketch.describe('Total')
+    assert described['count'] == len(df)
+    assert described['sum'] == pytest.approx(df['Total'].sum())
+    assert described['mean'] == pytest.approx(df['Total'].mean())
+    assert described['std'] == pytest.approx(df['Total'].std())
+
+def test_merge_equals_sketching_the_combined_data():
+    first, second = sales(20_000, 1), sales(30_000, 2)
+    merged = DatasetSketch().update(first).merge(DatasetSketch().update(second))
+    combined = pd.concat([first, second], ignore_index=True)
+
+    assert merged.rows == len(combined)
+    assert merged.nunique('Invoice ID') == pytest.approx(combined['Invoice ID'].nunique(), rel=0.03)
+    assert merged.describe('Total')['sum'] == pytest.approx(combined['Total'].sum())
+    median = merged.quantile('Total', 0.5)
+    assert (combined['Total'] <= median).mean() == pytest.approx(0.5, abs=0.01)
+
+def test_merging_different_precisions_is_rejected():
+    with pytest.raises(ValueError):
+        HyperLogLog(12).merge(HyperLogLog(14))
@@ -0,0 +1,42 @@
+"""StreamingValidator checks against pandas on the same rows"""
+import numpy as np
+import pandas as pd
+
+from data_utils import StreamingValidator
+
+def validate(chunks):
+    validator = StreamingValidator(id_col='Invoice ID')
+    for chunk in chunks:
+        validator.update(chunk)
+    return validator
+
+def frame(ids):
+    return pd.DataFrame({'Invoice ID': ids, 'Total': np.arange(len(ids), dtype=float)})
+
+def test_duplicates_match_pandas_across_chunks():
+    rng = np.random.default_rng(0)
+    ids = pd.Series(rng.integers(0, 5_000, 20_000)).astype(str)
+    validator = validate(frame(ids[i:i + 700].to_numpy()) for i in range(0, len(ids), 700))
+    assert validator.duplicate_ids == len(ids) - ids.nunique()
+
+def test_chunk_of_only_duplicates_then_more_ids():
+    validator = validate([frame(['a', 'b']), frame(['a', 'b', 'a']), frame(['c', 'a'])])
+    assert validator.duplicate_ids == 4
+    errors, warnings = validator.report()
+    assert errors == []
+    assert "4 duplicate values in 'Invoice ID'" in warnings
+
+def test_chunk_of_only_null_ids_then_more_ids():
+    validator = validate([frame([None, None]), frame(['a', None]), frame([None]), frame(['a', 'b'])])
+    assert validator.duplicate_ids == 1
+
+def test_same_file_twice():
+    chunk = frame([f"id-{i}" for i in range(100)])
+    validator = validate([chunk, chunk, chunk])
+    assert validator.duplicate_ids == 200
+
+def test_mixed_text_reports_values_sampled():
+    validator = StreamingValidator()
+    validator.update(pd.DataFrame({'Total': [str(i) for i in range(20)] + ['n/a'], 'Quantity': range(21)}))
+    _, warnings = validator.report()
+    assert "Column 'Total' looks numeric but 1 of 21 sampled values are not numbers" in warnings
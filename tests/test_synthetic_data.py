@@ -0,0 +1,49 @@
+"""The synthetic sales generator against the shape of the sample data"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_utils import detect_columns, parse_dates
+from synthetic_data import SalesGenerator, generate_sales, write_sales
+
+SAMPLE = pd.read_csv('supermarket_sales.csv', nrows=50)
+
+def test_same_columns_and_formats_as_the_sample():
+    df = generate_sales(10_000, chunk_size=3_000, seed=1)
+    assert list(df.columns) == list(SAMPLE.columns)
+    assert detect_columns(df)[:3] == detect_columns(SAMPLE)[:3]
+    assert df['Invoice ID'].is_unique
+    assert df['Invoice ID'].str.fullmatch(r'\d{3}-\d{2}-\d{4}').all()
+    assert parse_dates(df['Date']).notna().all()
+    assert df['Quantity'].between(1, 10).all()
+    assert np.allclose(df['Total'], df['cogs'] + df['Tax 5%'])
+
+def test_reproducible_for_the_same_seed_and_chunking():
+    first = generate_sales(5_000, chunk_size=2_000, seed=3)
+    pd.testing.assert_frame_equal(first, generate_sales(5_000, chunk_size=2_000, seed=3))
+    assert not first.equals(generate_sales(5_000, chunk_size=2_000, seed=4))
+
+def test_trend_and_weekly_seasonality():
+    df = generate_sales(200_000, n_days=364, trend=1.0, yearly_seasonality=0, seed=0)
+    dates = parse_dates(df['Date'])
+    halves = (dates < pd.Timestamp('2019-07-01')).value_counts()
+    # Volume grows linearly from 1 to 2, so the halves are 0.625 and 0.875 of it
+    assert halves[False] / halves[True] == pytest.approx(1.4, rel=0.03)
+    weekdays = dates.dt.dayofweek.value_counts()
+    assert weekdays.idxmax() == 5
+
+def test_arrow_chunk_matches_pandas_chunk():
+    pytest.importorskip('pyarrow')
+    generator = SalesGenerator(n_products=9, seed=2)
+    expected = generator.chunk(2_000, first_row=500, chunk_index=1)
+    table = generator.arrow_chunk(2_000, first_row=500, chunk_index=1)
+    pd.testing.assert_frame_equal(table.to_pandas(), expected, check_dtype=False)
+    assert expected['Product line'].nunique() == 9
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_written_files_load_back(tmp_path, suffix):
+    path = str(tmp_path / f"sales{suffix}")
+    assert write_sales(path, 7_000, chunk_size=2_500, seed=5) == 7_000
+    loaded = pd.read_parquet(path) if suffix == '.parquet' else pd.read_csv(path, dtype={'Time': str})
+    pd.testing.assert_frame_equal(loaded, generate_sales(7_000, chunk_size=2_500, seed=5),
+                                  check_dtype=False)
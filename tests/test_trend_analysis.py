@@ -0,0 +1,52 @@
+"""Batched trend analysis and series pivoting checked against per-series results"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_utils import pivot_series
+from model import trend_analysis, trend_analysis_batch, pad_series
+
+def test_batch_matches_trend_analysis():
+    rng = np.random.default_rng(0)
+    series = [np.arange(n) * slope + rng.normal(100, 5, n)
+              for n, slope in [(365, 0.5), (90, -1.0), (30, 0.0), (5, 2.0)]]
+    series.append(np.full(20, 7.0))
+    result = trend_analysis_batch(pad_series(series))
+
+    for row, y in enumerate(series):
+        expected = trend_analysis(pd.Series(y))
+        assert result['slope'][row] == pytest.approx(expected['slope'], abs=1e-9)
+        assert result['intercept'][row] == pytest.approx(expected['intercept'])
+        assert result['change_rate'][row] == pytest.approx(expected['change_rate'], abs=1e-9)
+    assert result['trend'][:2].tolist() == ['increasing', 'decreasing']
+
+def test_short_and_empty_rows():
+    assert trend_analysis_batch(np.zeros((2, 0)))['trend'].tolist() == ['insufficient_data'] * 2
+    result = trend_analysis_batch(pad_series([[1.0, 2.0], [], [0.0, 0.0, 0.0]]))
+    assert result['trend'].tolist() == ['insufficient_data', 'insufficient_data', 'stable']
+    assert result['slope'].tolist() == [0.0, 0.0, 0.0]
+    assert result['change_rate'][2] == 0.0
+
+def test_pivot_series_matches_pivot_table():
+    df = pd.DataFrame({
+        'Date': ['1/1/2024', '1/1/2024', '1/3/2024', '1/4/2024', 'bad', '1/4/2024'],
+        'Product line': ['Food', 'Food', 'Food', 'Health', 'Food', 'Health'],
+        'Branch': ['A', 'A', 'B', 'A', 'A', 'A'],
+        'Total': [1.0, 2.0, 4.0, 8.0, 16.0, 32.0],
+    })
+    table = pivot_series(df, ['Product line', 'Branch'], 'Date', 'Total')
+
+    expected = df.assign(Date=pd.to_datetime(df['Date'], format='%m/%d/%Y', errors='coerce')).pivot_table(
+        index=['Product line', 'Branch'], columns='Date', values='Total', aggfunc='sum', fill_value=0)
+    # Days without any sales are kept as zero columns
+    expected = expected.reindex(columns=pd.date_range('2024-01-01', '2024-01-04'), fill_value=0)
+    pd.testing.assert_frame_equal(table, expected, check_names=False, check_column_type=False,
+                                  check_dtype=False, check_freq=False)
+
+def test_pivot_series_monthly_with_times():
+    df = pd.DataFrame({'Date': ['1/31/2024', '2/1/2024', '2/1/2024'], 'Time': ['23:00', '00:30', '13:00'],
+                       'Series': 'All', 'Total': [1.0, 2.0, 4.0]})
+    assert pivot_series(df, ['Series'], 'Date', 'Total', freq='M').loc['All'].tolist() == [1.0, 6.0]
+    hourly = pivot_series(df, ['Series'], 'Date', 'Total', freq='h', time_col='Time')
+    assert hourly.shape == (1, 15)
+    assert hourly.loc['All', pd.Timestamp('2024-02-01 00:00')] == 2.0